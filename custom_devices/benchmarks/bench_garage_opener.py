@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+"""Benchmarks for the jgl_garage_switch integration.
+
+Runs GarageSwitch, StateTracker and the trigger path against an in-process
+benchmark hass and prints the results as JSON, so runs from different
+commits can be diffed or compared by a script.
+
+Usage:
+    python bench_garage_opener.py [--output results.json]
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import platform
+import subprocess
+import time
+import tracemalloc
+from typing import Any
+
+# bench_hass also puts custom_devices/ on sys.path for the imports below
+from bench_hass import (
+    BenchSwitchService,
+    async_add_entity,
+    async_create_bench_hass,
+    async_remove_entity,
+    async_stop_bench_hass,
+)
+from homeassistant.const import CONF_NAME, EVENT_STATE_CHANGED, STATE_OFF, STATE_ON
+from homeassistant.const import __version__ as HA_VERSION
+from homeassistant.core import Event, HomeAssistant, callback
+
+from garage_opener import async_get_domain_data
+from garage_opener.const import CONF_STATE_SENSOR, CONF_TRIGGER_SWITCH, DATA_DISPATCHER
+from garage_opener.switch import GarageSwitch
+
+DEFAULT_DOOR_COUNTS = (1, 10, 100, 1000)
+
+
+def _summarize(samples_ns: list[int]) -> dict[str, float]:
+    """Return latency percentiles in microseconds."""
+    ordered = sorted(samples_ns)
+    count = len(ordered)
+
+    def percentile(fraction: float) -> float:
+        index = min(count - 1, int(fraction * count))
+        return ordered[index] / 1000
+
+    return {
+        "samples": count,
+        "mean_us": sum(ordered) / count / 1000,
+        "p50_us": percentile(0.50),
+        "p95_us": percentile(0.95),
+        "p99_us": percentile(0.99),
+        "max_us": ordered[-1] / 1000,
+    }
+
+
+async def _async_add_doors(hass: HomeAssistant, count: int) -> list[GarageSwitch]:
+    """Create count garage doors with their trigger switches and sensors."""
+    async_get_domain_data(hass)
+    switches = []
+    for index in range(count):
+        trigger_switch = f"switch.bench_trigger_{index}"
+        state_sensor = f"binary_sensor.bench_contact_{index}"
+        hass.states.async_set(trigger_switch, STATE_OFF)
+        hass.states.async_set(state_sensor, STATE_OFF)
+        entity = GarageSwitch(
+            hass,
+            {
+                CONF_NAME: f"Bench Garage {index}",
+                CONF_TRIGGER_SWITCH: trigger_switch,
+                CONF_STATE_SENSOR: state_sensor,
+            },
+        )
+        await async_add_entity(hass, entity, f"switch.bench_garage_{index}")
+        switches.append(entity)
+    return switches
+
+
+async def _async_remove_doors(switches: list[GarageSwitch]) -> None:
+    """Remove doors created by _async_add_doors."""
+    for entity in switches:
+        await async_remove_entity(entity)
+
+
+async def bench_state_latency(iterations: int) -> dict[str, Any]:
+    """Measure the time from a sensor state change to the entity state write."""
+    hass = await async_create_bench_hass()
+    switches = await _async_add_doors(hass, 1)
+    entity_id = switches[0].entity_id
+    state_sensor = "binary_sensor.bench_contact_0"
+
+    written: asyncio.Future[int] | None = None
+
+    @callback
+    def _async_on_state_changed(event: Event) -> None:
+        if event.data["entity_id"] == entity_id and written and not written.done():
+            written.set_result(time.perf_counter_ns())
+
+    unsub = hass.bus.async_listen(EVENT_STATE_CHANGED, _async_on_state_changed)
+
+    samples = []
+    for index in range(iterations):
+        written = hass.loop.create_future()
+        started = time.perf_counter_ns()
+        hass.states.async_set(state_sensor, STATE_ON if index % 2 == 0 else STATE_OFF)
+        samples.append(await written - started)
+
+    unsub()
+    await _async_remove_doors(switches)
+    await async_stop_bench_hass(hass)
+    return {"name": "sensor_to_state_write", **_summarize(samples)}
+
+
+async def bench_trigger_throughput(door_count: int, rounds: int) -> dict[str, Any]:
+    """Measure trigger throughput with door_count configured doors."""
+    hass = await async_create_bench_hass()
+    service = BenchSwitchService(hass)
+    switches = await _async_add_doors(hass, door_count)
+    dispatcher = async_get_domain_data(hass)[DATA_DISPATCHER]
+
+    started = time.perf_counter()
+    for _ in range(rounds):
+        for entity in switches:
+            await entity.async_turn_on()
+        # Let the round finish so the next one is not collapsed as duplicates
+        while dispatcher.get_stats()["in_flight"]:
+            await asyncio.sleep(0)
+    elapsed = time.perf_counter() - started
+
+    await _async_remove_doors(switches)
+    await async_stop_bench_hass(hass)
+    triggers = door_count * rounds
+    return {
+        "name": "trigger_throughput",
+        "doors": door_count,
+        "triggers": triggers,
+        "service_calls": service.calls,
+        "elapsed_s": elapsed,
+        "triggers_per_s": triggers / elapsed,
+    }
+
+
+async def bench_memory_per_entity(door_count: int) -> dict[str, Any]:
+    """Measure the memory allocated per configured door."""
+    hass = await async_create_bench_hass()
+    async_get_domain_data(hass)
+
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    switches = await _async_add_doors(hass, door_count)
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+
+    allocated = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+
+    await _async_remove_doors(switches)
+    await async_stop_bench_hass(hass)
+    return {
+        "name": "memory_per_entity",
+        "doors": door_count,
+        "bytes_total": allocated,
+        "bytes_per_entity": allocated / door_count,
+    }
+
+
+def _git_commit() -> str | None:
+    """Return the current git commit, if any."""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            capture_output=True,
+            check=True,
+            text=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def async_run(args: argparse.Namespace) -> dict[str, Any]:
+    """Run every benchmark and collect the results."""
+    results = [await bench_state_latency(args.iterations)]
+    for door_count in args.doors:
+        results.append(await bench_trigger_throughput(door_count, args.rounds))
+    results.append(await bench_memory_per_entity(max(args.doors)))
+    return {
+        "suite": "jgl_garage_switch",
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "homeassistant": HA_VERSION,
+        "results": results,
+    }
+
+
+def main() -> None:
+    """Parse arguments, run the benchmarks and emit JSON."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=1000,
+                        help="Sensor changes for the latency benchmark")
+    parser.add_argument("--rounds", type=int, default=10,
+                        help="Triggers per door for the throughput benchmark")
+    parser.add_argument("--doors", type=lambda value: [int(v) for v in value.split(",")],
+                        default=list(DEFAULT_DOOR_COUNTS),
+                        help="Comma separated door counts (default: 1,10,100,1000)")
+    parser.add_argument("--output", help="Write JSON results to this file")
+    args = parser.parse_args()
+
+    report = asyncio.run(async_run(args))
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            file.write(output + "\n")
+    print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""Lightweight in-process Home Assistant for benchmarking custom integrations.
+
+The benchmark hass is a bare ``HomeAssistant`` core: state machine, event bus
+and service registry only. No integrations, HTTP server or recorder are
+loaded, so it starts in milliseconds and measurements only cover the code
+under test.
+"""
+from __future__ import annotations
+
+import logging
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+from homeassistant.core import HomeAssistant, ServiceCall
+from homeassistant.helpers import restore_state
+from homeassistant.helpers.entity import Entity
+
+# Make the integrations in custom_devices/ importable as packages
+CUSTOM_DEVICES_DIR = Path(__file__).resolve().parent.parent
+if str(CUSTOM_DEVICES_DIR) not in sys.path:
+    sys.path.insert(0, str(CUSTOM_DEVICES_DIR))
+
+
+class BenchSwitchService:
+    """Stand-in for the switch domain services.
+
+    Registers switch.turn_on / switch.turn_off and counts the calls, so the
+    trigger path has a real service to call.
+    """
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        """Initialize and register the switch services."""
+        self.hass = hass
+        self.calls = 0
+        hass.services.async_register("switch", "turn_on", self._async_handle)
+        hass.services.async_register("switch", "turn_off", self._async_handle)
+
+    async def _async_handle(self, call: ServiceCall) -> None:
+        """Count a service call."""
+        self.calls += 1
+
+
+async def async_create_bench_hass() -> HomeAssistant:
+    """Create a bare HomeAssistant core for benchmarking."""
+    # Entities are attached without an entity platform on purpose
+    logging.getLogger("homeassistant.helpers.entity").setLevel(logging.ERROR)
+    config_dir = tempfile.mkdtemp(prefix="bench_hass_")
+    hass = HomeAssistant(config_dir)
+    await restore_state.async_load(hass)
+    return hass
+
+
+async def async_add_entity(hass: HomeAssistant, entity: Entity, entity_id: str) -> None:
+    """Attach an entity to hass without an entity platform."""
+    entity.hass = hass
+    entity.entity_id = entity_id
+    await entity.async_added_to_hass()
+
+
+async def async_remove_entity(entity: Entity) -> None:
+    """Detach an entity added with async_add_entity."""
+    await entity.async_will_remove_from_hass()
+
+
+async def async_stop_bench_hass(hass: HomeAssistant) -> None:
+    """Stop a benchmark hass and remove its config directory."""
+    await hass.async_stop(force=True)
+    shutil.rmtree(hass.config.config_dir, ignore_errors=True)
@@ -1,27 +1,70 @@
 """The Momentary Garage Switch integration."""
 from __future__ import annotations
 
+import asyncio
 import logging
-from typing import Any
+from typing import TYPE_CHECKING, Any
 
 import voluptuous as vol
 
-from homeassistant.config_entries import ConfigEntry
-from homeassistant.const import CONF_NAME, Platform
-from homeassistant.core import HomeAssistant, ServiceCall
-from homeassistant.helpers import discovery
+from homeassistant.config_entries import SOURCE_IMPORT, ConfigEntry
+from homeassistant.const import (
+    ATTR_ENTITY_ID,
+    CONF_NAME,
+    ENTITY_MATCH_ALL,
+    EVENT_HOMEASSISTANT_STOP,
+    Platform,
+)
+from homeassistant.core import (
+    Event,
+    HomeAssistant,
+    ServiceCall,
+    ServiceResponse,
+    SupportsResponse,
+    callback,
+)
 import homeassistant.helpers.config_validation as cv
+from homeassistant.helpers.service import async_extract_referenced_entity_ids
 from homeassistant.helpers.typing import ConfigType
 
 from .const import (
     DOMAIN,
     CONF_TRIGGER_SWITCH,
     CONF_STATE_SENSOR,
-    SERVICE_TRIGGER
+    CONF_DEBOUNCE,
+    CONF_DIAGNOSTIC_SENSORS,
+    CONF_MOMENTARY_DURATION,
+    CONF_TRAVEL_TIME,
+    DATA_DISPATCHER,
+    DATA_OPERATION_HISTORY,
+    DATA_SWITCHES,
+    DATA_TRACKER_REGISTRY,
+    DATA_TRIGGER_STATS,
+    DEFAULT_DEBOUNCE,
+    DEFAULT_MAX_CONCURRENT_TRIGGERS,
+    DEFAULT_MOMENTARY_DURATION,
+    DEFAULT_TRAVEL_TIME,
+    SERVICE_GET_HISTORY,
+    SERVICE_TRIGGER,
+    ATTR_CONFIRM,
+    ATTR_LIMIT,
+    ATTR_TIMEOUT,
+)
+from .helpers import (
+    OperationHistory,
+    StateTrackerRegistry,
+    SwitchHandler,
+    TriggerDispatcher,
+    TriggerStats,
 )
 
+if TYPE_CHECKING:
+    from .switch import GarageSwitch
+
 _LOGGER = logging.getLogger(__name__)
 
+PLATFORMS = [Platform.SWITCH, Platform.SENSOR]
+
 # Configuration schema
 CONFIG_SCHEMA = vol.Schema(
     {
@@ -33,6 +76,19 @@ CONFIG_SCHEMA = vol.Schema(
                         vol.Required(CONF_NAME): cv.string,
                         vol.Required(CONF_TRIGGER_SWITCH): cv.entity_id,
                         vol.Required(CONF_STATE_SENSOR): cv.entity_id,
+                        vol.Optional(
+                            CONF_TRAVEL_TIME, default=DEFAULT_TRAVEL_TIME
+                        ): cv.positive_float,
+                        vol.Optional(
+                            CONF_MOMENTARY_DURATION,
+                            default=DEFAULT_MOMENTARY_DURATION,
+                        ): vol.All(cv.positive_float, vol.Range(max=10)),
+                        vol.Optional(
+                            CONF_DEBOUNCE, default=DEFAULT_DEBOUNCE
+                        ): cv.positive_float,
+                        vol.Optional(
+                            CONF_DIAGNOSTIC_SENSORS, default=False
+                        ): cv.boolean,
                     }
                 )
             ],
@@ -42,59 +98,188 @@ CONFIG_SCHEMA = vol.Schema(
 )
 
 
+@callback
+def async_get_domain_data(hass: HomeAssistant) -> dict[str, Any]:
+    """Return the integration data, creating the shared helpers once."""
+    if DOMAIN in hass.data:
+        return hass.data[DOMAIN]
+
+    # Shared dispatcher for every garage switch of the integration
+    dispatcher = TriggerDispatcher(
+        hass, SwitchHandler(hass), DEFAULT_MAX_CONCURRENT_TRIGGERS
+    )
+
+    async def async_shutdown_dispatcher(event: Event) -> None:
+        """Cancel in-flight triggers on shutdown."""
+        await dispatcher.async_shutdown()
+
+    hass.bus.async_listen_once(EVENT_HOMEASSISTANT_STOP, async_shutdown_dispatcher)
+
+    hass.data[DOMAIN] = {
+        DATA_DISPATCHER: dispatcher,
+        # Single state change subscription for every tracked sensor
+        DATA_TRACKER_REGISTRY: StateTrackerRegistry(hass),
+        # Door unique ID -> statistics, shared by the switch and its sensors
+        DATA_TRIGGER_STATS: {},
+        # Door unique ID -> recent operations, kept across entity reloads
+        DATA_OPERATION_HISTORY: {},
+        # Door unique ID -> switch entity, while it is added to hass
+        DATA_SWITCHES: {},
+    }
+    return hass.data[DOMAIN]
+
+
+def door_unique_id(name: str) -> str:
+    """Return the unique ID of the garage switch with this name."""
+    return f"{DOMAIN}_{name.lower().replace(' ', '_')}"
+
+
+@callback
+def async_get_trigger_stats(hass: HomeAssistant, unique_id: str) -> TriggerStats:
+    """Return the trigger statistics of a door, creating them once."""
+    all_stats = async_get_domain_data(hass)[DATA_TRIGGER_STATS]
+    if (stats := all_stats.get(unique_id)) is None:
+        stats = all_stats[unique_id] = TriggerStats()
+    return stats
+
+
+@callback
+def async_get_operation_history(
+    hass: HomeAssistant, unique_id: str
+) -> OperationHistory:
+    """Return the operation history of a door, creating it once."""
+    all_history = async_get_domain_data(hass)[DATA_OPERATION_HISTORY]
+    if (history := all_history.get(unique_id)) is None:
+        history = all_history[unique_id] = OperationHistory()
+    return history
+
+
 async def async_setup(hass: HomeAssistant, config: ConfigType) -> bool:
     """Set up the Jgl Garage Switch component."""
-    if DOMAIN not in config:
-        return True
-
     _LOGGER.debug("Setting up %s integration", DOMAIN)
 
     # Initialize domain data
-    if DOMAIN not in hass.data:
-        hass.data[DOMAIN] = {}
+    async_get_domain_data(hass)
 
-    # Store config in hass.data for the switch platform to access
-    hass.data[DOMAIN]["config"] = config[DOMAIN]
+    # Doors configured in YAML are imported as config entries, one per door
+    for door_config in config.get(DOMAIN, []):
+        hass.async_create_task(
+            hass.config_entries.flow.async_init(
+                DOMAIN, context={"source": SOURCE_IMPORT}, data=door_config
+            )
+        )
 
-    # Load the switch platform
-    await discovery.async_load_platform(
-        hass,
-        Platform.SWITCH,
-        DOMAIN,
-        {},
-        config,
-    )
+    # Doors deleted from YAML would otherwise keep running from their import
+    imported = {
+        door_unique_id(door_config[CONF_NAME]) for door_config in config.get(DOMAIN, [])
+    }
+    for entry in hass.config_entries.async_entries(DOMAIN):
+        if entry.source == SOURCE_IMPORT and entry.unique_id not in imported:
+            _LOGGER.info(
+                "Removing garage door '%s', it is no longer in configuration.yaml",
+                entry.title,
+            )
+            hass.async_create_task(hass.config_entries.async_remove(entry.entry_id))
 
     # Register services
-    async def async_trigger_service(call: ServiceCall) -> None:
-        """Handle trigger service call."""
-        entity_id = call.data.get("entity_id")
-        if entity_id:
-            # Find the corresponding switch entity and trigger it
-            switch_entity = hass.states.get(entity_id)
-            if switch_entity:
-                await hass.services.async_call(
-                    Platform.SWITCH,
-                    "turn_on",
-                    {"entity_id": entity_id},
-                    blocking=True,
+    async def async_trigger_service(call: ServiceCall) -> ServiceResponse:
+        """Trigger every targeted door at once and report each outcome."""
+        switches = async_get_target_switches(hass, call)
+        results = await asyncio.gather(
+            *(
+                switch.async_trigger_and_wait(
+                    call.data[ATTR_CONFIRM], call.data.get(ATTR_TIMEOUT), call.context
                 )
+                for switch in switches
+            )
+        )
+        return {
+            "doors": {
+                switch.entity_id: result for switch, result in zip(switches, results)
+            }
+        }
 
     hass.services.async_register(
         DOMAIN,
         SERVICE_TRIGGER,
         async_trigger_service,
-        vol.Schema({vol.Required("entity_id"): cv.entity_id}),
+        cv.make_entity_service_schema(
+            {
+                vol.Optional(ATTR_CONFIRM, default=False): cv.boolean,
+                vol.Optional(ATTR_TIMEOUT): cv.positive_float,
+            }
+        ),
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+
+    @callback
+    def async_get_history_service(call: ServiceCall) -> ServiceResponse:
+        """Return the recent operations of every targeted door."""
+        return {
+            "doors": {
+                switch.entity_id: switch.async_get_history(call.data.get(ATTR_LIMIT))
+                for switch in async_get_target_switches(hass, call)
+            }
+        }
+
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_GET_HISTORY,
+        async_get_history_service,
+        cv.make_entity_service_schema(
+            {vol.Optional(ATTR_LIMIT): vol.All(vol.Coerce(int), vol.Range(min=1))}
+        ),
+        supports_response=SupportsResponse.ONLY,
     )
 
     return True
 
 
+@callback
+def async_get_target_switches(
+    hass: HomeAssistant, call: ServiceCall
+) -> list[GarageSwitch]:
+    """Resolve the targets of a service call to the garage switch entities.
+
+    Entity IDs, devices, areas and ``all`` are matched against the switches
+    of this integration directly, without a round trip through the switch
+    domain services. Targets that are not garage switches are ignored.
+    """
+    switches = async_get_domain_data(hass)[DATA_SWITCHES].values()
+    if call.data.get(ATTR_ENTITY_ID) == ENTITY_MATCH_ALL:
+        return list(switches)
+
+    selected = async_extract_referenced_entity_ids(hass, call)
+    entity_ids = selected.referenced | selected.indirectly_referenced
+    return [switch for switch in switches if switch.entity_id in entity_ids]
+
+
+@callback
+def async_get_door_config(entry: ConfigEntry) -> dict[str, Any]:
+    """Return the door configuration of an entry, options taking precedence."""
+    return {**entry.data, **entry.options}
+
+
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
-    """Set up from a config entry (for future config flow support)."""
+    """Set up one garage door from a config entry."""
+    async_get_domain_data(hass)
+    await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
+    entry.async_on_unload(entry.add_update_listener(async_reload_entry))
     return True
 
 
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
-    """Unload a config entry."""
-    return True
\ No newline at end of file
+    """Unload one garage door, leaving the other doors untouched."""
+    return await hass.config_entries.async_unload_platforms(entry, PLATFORMS)
+
+
+async def async_reload_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Reload a garage door after its options changed."""
+    await hass.config_entries.async_reload(entry.entry_id)
+
+
+async def async_remove_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Forget the trigger statistics and history of a deleted garage door."""
+    if DOMAIN in hass.data:
+        hass.data[DOMAIN][DATA_TRIGGER_STATS].pop(entry.unique_id, None)
+        hass.data[DOMAIN][DATA_OPERATION_HISTORY].pop(entry.unique_id, None)
@@ -0,0 +1,143 @@
+"""Config flow for Momentary Garage Switch integration."""
+from __future__ import annotations
+
+from typing import Any
+
+import voluptuous as vol
+
+from homeassistant import config_entries
+from homeassistant.const import CONF_NAME
+from homeassistant.core import callback
+from homeassistant.data_entry_flow import FlowResult
+from homeassistant.helpers import selector
+
+from . import door_unique_id
+from .const import (
+    DOMAIN,
+    CONF_TRIGGER_SWITCH,
+    CONF_STATE_SENSOR,
+    CONF_DEBOUNCE,
+    CONF_DIAGNOSTIC_SENSORS,
+    CONF_MOMENTARY_DURATION,
+    CONF_TRAVEL_TIME,
+    DEFAULT_DEBOUNCE,
+    DEFAULT_MOMENTARY_DURATION,
+    DEFAULT_TRAVEL_TIME,
+)
+
+
+def _door_schema(defaults: dict[str, Any]) -> dict[vol.Marker, Any]:
+    """Return the form fields of the door settings that can be changed later."""
+    return {
+        vol.Required(
+            CONF_TRIGGER_SWITCH, default=defaults.get(CONF_TRIGGER_SWITCH, vol.UNDEFINED)
+        ): selector.EntitySelector(
+            selector.EntitySelectorConfig(domain=["switch", "input_boolean"])
+        ),
+        vol.Required(
+            CONF_STATE_SENSOR, default=defaults.get(CONF_STATE_SENSOR, vol.UNDEFINED)
+        ): selector.EntitySelector(
+            selector.EntitySelectorConfig(domain=["binary_sensor", "input_boolean"])
+        ),
+        vol.Required(
+            CONF_TRAVEL_TIME, default=defaults.get(CONF_TRAVEL_TIME, DEFAULT_TRAVEL_TIME)
+        ): selector.NumberSelector(
+            selector.NumberSelectorConfig(
+                min=1,
+                max=300,
+                step=0.5,
+                unit_of_measurement="s",
+                mode=selector.NumberSelectorMode.BOX,
+            )
+        ),
+        vol.Required(
+            CONF_MOMENTARY_DURATION,
+            default=defaults.get(CONF_MOMENTARY_DURATION, DEFAULT_MOMENTARY_DURATION),
+        ): selector.NumberSelector(
+            selector.NumberSelectorConfig(
+                min=0,
+                max=10,
+                step=0.05,
+                unit_of_measurement="s",
+                mode=selector.NumberSelectorMode.BOX,
+            )
+        ),
+        vol.Required(
+            CONF_DEBOUNCE, default=defaults.get(CONF_DEBOUNCE, DEFAULT_DEBOUNCE)
+        ): selector.NumberSelector(
+            selector.NumberSelectorConfig(
+                min=0,
+                max=10,
+                step=0.1,
+                unit_of_measurement="s",
+                mode=selector.NumberSelectorMode.BOX,
+            )
+        ),
+        vol.Required(
+            CONF_DIAGNOSTIC_SENSORS, default=defaults.get(CONF_DIAGNOSTIC_SENSORS, False)
+        ): selector.BooleanSelector(),
+    }
+
+
+class GarageSwitchConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
+    """Add one garage door per config entry."""
+
+    VERSION = 1
+
+    async def async_step_user(
+        self, user_input: dict[str, Any] | None = None
+    ) -> FlowResult:
+        """Ask for the door name and its entities."""
+        if user_input is not None:
+            await self.async_set_unique_id(door_unique_id(user_input[CONF_NAME]))
+            self._abort_if_unique_id_configured()
+            return self.async_create_entry(
+                title=user_input[CONF_NAME], data=user_input
+            )
+
+        return self.async_show_form(
+            step_id="user",
+            data_schema=vol.Schema(
+                {vol.Required(CONF_NAME): selector.TextSelector(), **_door_schema({})}
+            ),
+        )
+
+    async def async_step_import(self, import_config: dict[str, Any]) -> FlowResult:
+        """Import a door from configuration.yaml, updating an earlier import."""
+        await self.async_set_unique_id(door_unique_id(import_config[CONF_NAME]))
+        self._abort_if_unique_id_configured(updates=import_config)
+        return self.async_create_entry(
+            title=import_config[CONF_NAME], data=import_config
+        )
+
+    @staticmethod
+    @callback
+    def async_get_options_flow(
+        config_entry: config_entries.ConfigEntry,
+    ) -> config_entries.OptionsFlow:
+        """Return the options flow of a door."""
+        return GarageSwitchOptionsFlow()
+
+
+class GarageSwitchOptionsFlow(config_entries.OptionsFlow):
+    """Change the entities and timing of one garage door."""
+
+    if not hasattr(config_entries.OptionsFlow, "config_entry"):
+        # Provided by Home Assistant 2024.11 and later, which rejects
+        # assigning it; older versions only know the entry ID as the handler
+        @property
+        def config_entry(self) -> config_entries.ConfigEntry:
+            """Return the config entry of the door being changed."""
+            return self.hass.config_entries.async_get_entry(self.handler)
+
+    async def async_step_init(
+        self, user_input: dict[str, Any] | None = None
+    ) -> FlowResult:
+        """Show the current door settings for editing."""
+        if user_input is not None:
+            return self.async_create_entry(title="", data=user_input)
+
+        current = {**self.config_entry.data, **self.config_entry.options}
+        return self.async_show_form(
+            step_id="init", data_schema=vol.Schema(_door_schema(current))
+        )
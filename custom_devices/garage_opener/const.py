@@ -10,9 +10,37 @@ DOMAIN = "jgl_garage_switch"
 CONF_TRIGGER_SWITCH = "trigger_switch"
 CONF_STATE_SENSOR = "state_sensor"
 CONF_MOMENTARY_DURATION = "momentary_duration"
+CONF_TRAVEL_TIME = "travel_time"
+CONF_DIAGNOSTIC_SENSORS = "diagnostic_sensors"
+CONF_DEBOUNCE = "debounce"
+
+# Door travel
+DEFAULT_TRAVEL_TIME = 15.0
+
+# Seconds the trigger switch is held on, 0 when the device releases itself
+DEFAULT_MOMENTARY_DURATION = 0.0
+
+# Seconds a new sensor state must hold before it is reported
+DEFAULT_DEBOUNCE = 0.0
+
+# Trigger dispatcher
+DEFAULT_MAX_CONCURRENT_TRIGGERS = 4
+
+# hass.data keys
+DATA_DISPATCHER = "dispatcher"
+DATA_TRACKER_REGISTRY = "tracker_registry"
+DATA_TRIGGER_STATS = "trigger_stats"
+DATA_SWITCHES = "switches"
+DATA_OPERATION_HISTORY = "operation_history"
 
 # Service names
 SERVICE_TRIGGER = "trigger"
+SERVICE_GET_HISTORY = "get_history"
+
+# Service fields
+ATTR_CONFIRM = "confirm"
+ATTR_TIMEOUT = "timeout"
+ATTR_LIMIT = "limit"
 
 # Icons
 ICON_GARAGE_OPEN = "mdi:garage-open"
@@ -0,0 +1,22 @@
+"""Diagnostics support for Momentary Garage Switch integration."""
+from __future__ import annotations
+
+from typing import Any
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+
+from . import async_get_domain_data
+from .const import DATA_DISPATCHER, DATA_SWITCHES
+
+
+async def async_get_config_entry_diagnostics(
+    hass: HomeAssistant, entry: ConfigEntry
+) -> dict[str, Any]:
+    """Return the trigger statistics of the entry's door and the dispatcher."""
+    domain_data = async_get_domain_data(hass)
+    switch = domain_data[DATA_SWITCHES].get(entry.unique_id)
+    return {
+        "door": switch.async_get_diagnostics() if switch is not None else None,
+        "dispatcher": domain_data[DATA_DISPATCHER].get_stats(),
+    }
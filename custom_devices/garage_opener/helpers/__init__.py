@@ -1,5 +1,18 @@
 """Helper classes for the Momentary Garage Switch integration."""
+from .door_state_machine import DoorStateMachine
+from .operation_history import Operation, OperationHistory
 from .switch_handler import SwitchHandler
-from .state_tracker import StateTracker
+from .state_tracker import StateTracker, StateTrackerRegistry
+from .trigger_dispatcher import TriggerDispatcher
+from .trigger_stats import TriggerStats
 
-__all__ = ["SwitchHandler", "StateTracker"]
+__all__ = [
+    "DoorStateMachine",
+    "Operation",
+    "OperationHistory",
+    "SwitchHandler",
+    "StateTracker",
+    "StateTrackerRegistry",
+    "TriggerDispatcher",
+    "TriggerStats",
+]
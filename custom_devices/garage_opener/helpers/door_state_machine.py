@@ -0,0 +1,179 @@
+"""Optimistic garage door travel state machine for Home Assistant integrations."""
+from __future__ import annotations
+
+import logging
+import time
+from datetime import datetime
+from typing import Callable
+
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
+from homeassistant.helpers.event import async_call_later
+
+_LOGGER = logging.getLogger(__name__)
+
+DOOR_CLOSED = "closed"
+DOOR_OPENING = "opening"
+DOOR_OPEN = "open"
+DOOR_CLOSING = "closing"
+DOOR_STOPPED = "stopped"
+
+# Predicted state after a trigger, by current state
+_NEXT_STATE = {
+    DOOR_CLOSED: DOOR_OPENING,
+    DOOR_OPEN: DOOR_CLOSING,
+    DOOR_OPENING: DOOR_STOPPED,
+    DOOR_CLOSING: DOOR_STOPPED,
+}
+
+# Sensor state that confirms a travel
+_TRAVEL_END = {
+    DOOR_OPENING: DOOR_OPEN,
+    DOOR_CLOSING: DOOR_CLOSED,
+}
+
+
+class DoorStateMachine:
+    """Predict door travel from triggers and confirm it from a sensor.
+
+    A trigger moves the door to its predicted transition immediately
+    (closed -> opening, open -> closing, moving -> stopped, stopped -> the
+    reverse of the last travel). A sensor reading confirms or corrects the
+    prediction. If the sensor does not confirm within the travel time, the
+    door is reported as stopped (obstructed).
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        travel_time: float,
+        callback_func: Callable[[str], None],
+        travel_callback: Callable[[float | None], None] | None = None,
+    ) -> None:
+        """Initialize the state machine.
+
+        Args:
+            hass: Home Assistant instance
+            travel_time: Seconds the door takes to fully open or close
+            callback_func: Function to call with the new door state
+            travel_callback: Function to call when a predicted travel ends,
+                with the seconds until the sensor confirmed it or None if
+                it was never confirmed
+        """
+        self.hass = hass
+        self.travel_time = travel_time
+        self._callback = callback_func
+        self._travel_callback = travel_callback
+        self._state: str | None = None
+        self._confirmed_state: str | None = None
+        self._last_travel = DOOR_CLOSING
+        self._travel_started: float | None = None
+        self._unsub_timeout: CALLBACK_TYPE | None = None
+
+    @property
+    def state(self) -> str | None:
+        """Return the current door state, None until the sensor reports."""
+        return self._state
+
+    @property
+    def is_moving(self) -> bool:
+        """Return True while a predicted transition is pending."""
+        return self._state in (DOOR_OPENING, DOOR_CLOSING)
+
+    @callback
+    def async_trigger(self) -> None:
+        """Apply the predicted transition for a trigger."""
+        if self._state is None:
+            return
+
+        if self._state == DOOR_STOPPED:
+            next_state = (
+                DOOR_CLOSING if self._last_travel == DOOR_OPENING else DOOR_OPENING
+            )
+        else:
+            next_state = _NEXT_STATE[self._state]
+
+        self._cancel_timeout()
+        if next_state in (DOOR_OPENING, DOOR_CLOSING):
+            self._last_travel = next_state
+            self._travel_started = time.monotonic()
+            self._unsub_timeout = async_call_later(
+                self.hass, self.travel_time, self._async_travel_timeout
+            )
+        else:
+            # Stopped mid-travel, there is nothing left to confirm
+            self._travel_started = None
+        self._set_state(next_state)
+
+    @callback
+    def async_trigger_failed(self) -> None:
+        """Roll back a prediction whose trigger never reached the door."""
+        self._cancel_timeout()
+        self._travel_started = None
+        if self._confirmed_state is not None:
+            self._set_state(self._confirmed_state)
+
+    @callback
+    def async_sensor_update(
+        self, is_open: bool, changed_at: float | None = None
+    ) -> None:
+        """Confirm or correct the door state from the sensor.
+
+        A change that first appeared before the trigger, e.g. one still in
+        the sensor's debounce window when the door was triggered, is not the
+        outcome of the travel: the prediction stays until a later change
+        confirms it or the travel times out.
+
+        Args:
+            is_open: True if the sensor reports open, False if closed
+            changed_at: Monotonic time the sensor state first appeared, which
+                is before this call when the sensor is debounced; now when
+                omitted
+        """
+        self._confirmed_state = DOOR_OPEN if is_open else DOOR_CLOSED
+        if changed_at is None:
+            changed_at = time.monotonic()
+        if self._travel_started is not None and changed_at < self._travel_started:
+            _LOGGER.debug("Ignoring a sensor change from before the trigger")
+            return
+
+        self._cancel_timeout()
+        if self._travel_started is not None and self._confirmed_state == _TRAVEL_END.get(self._state):
+            self._async_travel_done(changed_at - self._travel_started)
+        self._travel_started = None
+        self._set_state(self._confirmed_state)
+
+    @callback
+    def _async_travel_timeout(self, _now: datetime) -> None:
+        """Report the door as stopped when travel was never confirmed."""
+        self._unsub_timeout = None
+        self._async_travel_done(None)
+        self._travel_started = None
+        _LOGGER.warning(
+            "Door did not confirm %s within %s seconds, reporting it as stopped",
+            self._state,
+            self.travel_time,
+        )
+        self._set_state(DOOR_STOPPED)
+
+    def _async_travel_done(self, latency: float | None) -> None:
+        """Report the outcome of a predicted travel."""
+        if self._travel_callback is not None:
+            self._travel_callback(latency)
+
+    def _set_state(self, state: str) -> None:
+        """Store a new state and notify the callback if it changed."""
+        if state == self._state:
+            return
+        self._state = state
+        self._callback(state)
+
+    def _cancel_timeout(self) -> None:
+        """Cancel a pending travel timeout."""
+        if self._unsub_timeout is not None:
+            self._unsub_timeout()
+            self._unsub_timeout = None
+
+    @callback
+    def async_cleanup(self) -> None:
+        """Cancel pending timers."""
+        self._cancel_timeout()
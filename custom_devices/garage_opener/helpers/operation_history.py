@@ -0,0 +1,122 @@
+"""Fixed-size door operation history for Home Assistant integrations."""
+from __future__ import annotations
+
+from typing import Any
+
+from homeassistant.core import Context
+from homeassistant.util import dt as dt_util
+
+DEFAULT_HISTORY_SIZE = 50
+
+# Who asked for an operation, from the context of the request
+SOURCE_AUTOMATION = "automation"
+SOURCE_USER = "user"
+SOURCE_SYSTEM = "system"
+
+# Outcomes that are not a sensor state
+OUTCOME_FAILED = "failed"
+
+
+def operation_source(context: Context | None) -> str:
+    """Return the source of an operation requested with this context.
+
+    Automations and scripts run with a parent context, a frontend or API
+    call carries the user.
+    """
+    if context is None:
+        return SOURCE_SYSTEM
+    if context.parent_id is not None:
+        return SOURCE_AUTOMATION
+    if context.user_id is not None:
+        return SOURCE_USER
+    return SOURCE_SYSTEM
+
+
+class Operation:
+    """One trigger of a door and how it ended.
+
+    `confirmed_state` is None while the operation is pending, the sensor
+    state ("open"/"closed") that followed the trigger, "stopped" if the
+    sensor never confirmed the travel or "failed" if the trigger switch
+    could not be pulsed. `latency` is the seconds from the trigger to the
+    sensor confirmation.
+    """
+
+    __slots__ = ("triggered_at", "source", "confirmed_state", "latency")
+
+    def __init__(self, triggered_at: float, source: str) -> None:
+        """Initialize a pending operation.
+
+        Args:
+            triggered_at: POSIX timestamp of the trigger
+            source: Who requested the trigger
+        """
+        self.triggered_at = triggered_at
+        self.source = source
+        self.confirmed_state: str | None = None
+        self.latency: float | None = None
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the operation for service responses and diagnostics."""
+        return {
+            "triggered_at": dt_util.utc_from_timestamp(self.triggered_at).isoformat(),
+            "source": self.source,
+            "confirmed_state": self.confirmed_state,
+            "latency": self.latency,
+        }
+
+
+class OperationHistory:
+    """Ring buffer of the most recent operations of one door.
+
+    The slots are allocated once; recording overwrites the oldest
+    operation and reading the latest one is O(1), without touching the
+    recorder database.
+    """
+
+    def __init__(self, size: int = DEFAULT_HISTORY_SIZE) -> None:
+        """Initialize the history.
+
+        Args:
+            size: Number of operations kept
+        """
+        self._slots: list[Operation | None] = [None] * size
+        self._next = 0
+        self._count = 0
+
+    def __len__(self) -> int:
+        """Return the number of operations kept."""
+        return self._count
+
+    @property
+    def size(self) -> int:
+        """Return the capacity of the history."""
+        return len(self._slots)
+
+    def record(self, triggered_at: float, source: str) -> Operation:
+        """Store a new pending operation, replacing the oldest when full.
+
+        Returns:
+            The operation, to be completed once its outcome is known
+        """
+        operation = Operation(triggered_at, source)
+        self._slots[self._next] = operation
+        self._next = (self._next + 1) % len(self._slots)
+        self._count = min(self._count + 1, len(self._slots))
+        return operation
+
+    def latest(self) -> Operation | None:
+        """Return the most recent operation."""
+        if not self._count:
+            return None
+        return self._slots[self._next - 1]
+
+    def recent(self, limit: int | None = None) -> list[Operation]:
+        """Return up to `limit` operations, newest first."""
+        count = self._count if limit is None else min(limit, self._count)
+        size = len(self._slots)
+        return [self._slots[(self._next - 1 - index) % size] for index in range(count)]
+
+    def as_list(self, limit: int | None = None) -> list[dict[str, Any]]:
+        """Return recent operations for service responses and diagnostics."""
+        return [operation.as_dict() for operation in self.recent(limit)]
@@ -1,25 +1,115 @@
 """Reusable state tracking from binary sensor for Home Assistant integrations."""
 from __future__ import annotations
 
+import asyncio
 import logging
+import time
+from datetime import datetime
+from functools import partial
 from typing import Callable
 
-from homeassistant.const import STATE_ON, STATE_OFF, STATE_UNAVAILABLE, STATE_UNKNOWN
-from homeassistant.core import HomeAssistant, State, callback
+from homeassistant.const import (
+    EVENT_STATE_CHANGED,
+    STATE_ON,
+    STATE_OFF,
+    STATE_UNAVAILABLE,
+    STATE_UNKNOWN,
+)
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, State, callback
 from homeassistant.helpers.event import (
     EventStateChangedData,
+    async_call_later,
     async_track_state_change_event,
 )
 from homeassistant.helpers.typing import EventType
 
 _LOGGER = logging.getLogger(__name__)
 
+# Minimum seconds between unavailable/unknown warnings for one sensor
+WARNING_INTERVAL = 300.0
+
+
+class StateTrackerRegistry:
+    """Single state change subscription shared by many StateTracker instances.
+
+    The registry listens once for state changes and dispatches each event to
+    the trackers registered for its entity ID through a dict lookup. The
+    lookup also runs as the event filter, so state changes of untracked
+    entities never reach the handler. Trackers can be added and removed
+    without rebuilding the subscription.
+    """
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        """Initialize the tracker registry.
+
+        Args:
+            hass: Home Assistant instance
+        """
+        self.hass = hass
+        self._trackers: dict[str, tuple[StateTracker, ...]] = {}
+        self._unsub_listener: Callable[[], None] | None = None
+
+    @callback
+    def async_add(self, tracker: StateTracker) -> None:
+        """Register a tracker for its sensor entity."""
+        entity_id = tracker.sensor_entity_id
+        self._trackers[entity_id] = self._trackers.get(entity_id, ()) + (tracker,)
+
+        if self._unsub_listener is None:
+            _LOGGER.debug("Subscribing to state changes for tracked sensors")
+            self._unsub_listener = self.hass.bus.async_listen(
+                EVENT_STATE_CHANGED,
+                self._async_state_changed,
+                event_filter=self._async_is_tracked,
+                run_immediately=True,
+            )
+
+    @callback
+    def async_remove(self, tracker: StateTracker) -> None:
+        """Unregister a tracker."""
+        entity_id = tracker.sensor_entity_id
+        remaining = tuple(
+            registered
+            for registered in self._trackers.get(entity_id, ())
+            if registered is not tracker
+        )
+        if remaining:
+            self._trackers[entity_id] = remaining
+        else:
+            self._trackers.pop(entity_id, None)
+
+        if not self._trackers and self._unsub_listener is not None:
+            _LOGGER.debug("No tracked sensors left, unsubscribing")
+            self._unsub_listener()
+            self._unsub_listener = None
+
+    @property
+    def tracked_entity_ids(self) -> list[str]:
+        """Return the entity IDs covered by the subscription."""
+        return list(self._trackers)
+
+    @callback
+    def _async_is_tracked(self, event: EventType[EventStateChangedData]) -> bool:
+        """Return True if a tracker is registered for the changed entity."""
+        return event.data["entity_id"] in self._trackers
+
+    @callback
+    def _async_state_changed(self, event: EventType[EventStateChangedData]) -> None:
+        """Dispatch a state change to the trackers of its entity."""
+        for tracker in self._trackers.get(event.data["entity_id"], ()):
+            tracker.async_state_changed(event)
+
 
 class StateTracker:
     """Reusable state tracking from binary sensor.
     
     This class monitors a binary sensor and provides state change callbacks.
     Can be reused across different integrations that need to track sensor states.
+
+    With a debounce window, a new sensor state is only reported once it has
+    held for the whole window. Every flap restarts the window and a flap back
+    to the reported state drops the pending one, so a bouncing contact or a
+    sensor dropping in and out results in at most one callback.
     """
 
     def __init__(
@@ -27,6 +117,8 @@ class StateTracker:
         hass: HomeAssistant,
         sensor_entity_id: str,
         callback_func: Callable[[bool], None],
+        registry: StateTrackerRegistry | None = None,
+        debounce: float = 0.0,
     ) -> None:
         """Initialize the state tracker.
         
@@ -34,12 +126,30 @@ class StateTracker:
             hass: Home Assistant instance
             sensor_entity_id: Entity ID of the binary sensor to track
             callback_func: Function to call when state changes (receives bool: True=on, False=off)
+            registry: Shared registry to subscribe through; the tracker
+                subscribes on its own when omitted
+            debounce: Seconds a new state must hold before it is reported,
+                0 to report every change immediately
         """
         self.hass = hass
+        self._registry = registry
         self.sensor_entity_id = sensor_entity_id
         self._callback = callback_func
         self._current_state: bool | None = None
+        # Last on/off state, kept while the sensor is unavailable so a sensor
+        # coming back in the same state is not taken for a transition
+        self._known_state: bool | None = None
         self._unsub_state_listener: Callable[[], None] | None = None
+        # Set and replaced on every transition, so waiters need no polling
+        self._transition = asyncio.Event()
+        self._last_transition: float | None = None
+        self._debounce = debounce
+        self._pending_state: bool | None = None
+        self._pending_since = 0.0
+        self._unsub_debounce: CALLBACK_TYPE | None = None
+        self._suppressed_flaps = 0
+        self._last_warning: float | None = None
+        self._suppressed_warnings = 0
 
     async def async_setup(self) -> None:
         """Setup event listeners for state changes."""
@@ -49,9 +159,13 @@ class StateTracker:
         await self._update_current_state()
 
         # Subscribe to state changes
-        self._unsub_state_listener = async_track_state_change_event(
-            self.hass, [self.sensor_entity_id], self._async_state_changed
-        )
+        if self._registry is not None:
+            self._registry.async_add(self)
+            self._unsub_state_listener = partial(self._registry.async_remove, self)
+        else:
+            self._unsub_state_listener = async_track_state_change_event(
+                self.hass, [self.sensor_entity_id], self.async_state_changed
+            )
 
     async def _update_current_state(self) -> None:
         """Update the current state from the sensor."""
@@ -60,29 +174,80 @@ class StateTracker:
             new_state = self._parse_state(state)
             if new_state != self._current_state:
                 self._current_state = new_state
-                if self._callback and new_state is not None:
-                    self._callback(new_state)
+                if new_state is not None:
+                    self._known_state = new_state
+                    if self._callback:
+                        self._callback(new_state)
 
     @callback
-    def _async_state_changed(self, event: EventType[EventStateChangedData]) -> None:
-        """Handle state changes from the binary sensor."""
+    def async_state_changed(self, event: EventType[EventStateChangedData]) -> None:
+        """Handle a state change of the binary sensor."""
         new_state = event.data["new_state"]
         if new_state is None:
             return
 
         parsed_state = self._parse_state(new_state)
-        
-        if parsed_state != self._current_state:
-            _LOGGER.debug(
-                "State changed for %s: %s -> %s",
-                self.sensor_entity_id,
-                self._current_state,
-                parsed_state,
-            )
-            self._current_state = parsed_state
-            
-            if self._callback and parsed_state is not None:
-                self._callback(parsed_state)
+        if self._debounce <= 0:
+            self._async_commit(parsed_state, time.monotonic())
+            return
+
+        if parsed_state == self._current_state:
+            # Flapped back before the window ended, nothing to report
+            if self._unsub_debounce is not None:
+                self._suppressed_flaps += 1
+                self._cancel_debounce()
+            return
+
+        if self._unsub_debounce is not None:
+            if parsed_state == self._pending_state:
+                # Attribute-only update of the pending state
+                return
+            self._suppressed_flaps += 1
+            self._cancel_debounce()
+
+        self._pending_state = parsed_state
+        self._pending_since = time.monotonic()
+        self._unsub_debounce = async_call_later(
+            self.hass, self._debounce, self._async_debounce_done
+        )
+
+    @callback
+    def _async_debounce_done(self, _now: datetime) -> None:
+        """Report the pending state once it held for the whole window."""
+        self._unsub_debounce = None
+        self._async_commit(self._pending_state, self._pending_since)
+
+    @callback
+    def _async_commit(self, parsed_state: bool | None, since: float) -> None:
+        """Report a state that differs from the last known one."""
+        if parsed_state == self._current_state:
+            return
+
+        _LOGGER.debug(
+            "State changed for %s: %s -> %s",
+            self.sensor_entity_id,
+            self._current_state,
+            parsed_state,
+        )
+        self._current_state = parsed_state
+        if parsed_state is None or parsed_state == self._known_state:
+            # Unavailable, or back from unavailable without having moved
+            return
+
+        previous, self._known_state = self._known_state, parsed_state
+        if previous is not None:
+            self._last_transition = since
+            self._transition.set()
+            self._transition = asyncio.Event()
+
+        if self._callback:
+            self._callback(parsed_state)
+
+    def _cancel_debounce(self) -> None:
+        """Drop the pending state."""
+        if self._unsub_debounce is not None:
+            self._unsub_debounce()
+            self._unsub_debounce = None
 
     def _parse_state(self, state: State) -> bool | None:
         """Parse state object to boolean.
@@ -94,15 +259,54 @@ class StateTracker:
             True if on/open, False if off/closed, None if unavailable/unknown
         """
         if state.state in (STATE_UNAVAILABLE, STATE_UNKNOWN):
-            _LOGGER.warning(
-                "Sensor %s is %s",
-                self.sensor_entity_id,
-                state.state,
-            )
+            self._warn_not_reporting(state.state)
             return None
         
         return state.state == STATE_ON
 
+    def _warn_not_reporting(self, state: str) -> None:
+        """Warn about an unavailable or unknown sensor, rate limited."""
+        now = time.monotonic()
+        if self._last_warning is not None and now - self._last_warning < WARNING_INTERVAL:
+            self._suppressed_warnings += 1
+            return
+
+        if self._suppressed_warnings:
+            _LOGGER.warning(
+                "Sensor %s is %s (%d similar warnings suppressed)",
+                self.sensor_entity_id,
+                state,
+                self._suppressed_warnings,
+            )
+        else:
+            _LOGGER.warning("Sensor %s is %s", self.sensor_entity_id, state)
+        self._last_warning = now
+        self._suppressed_warnings = 0
+
+    @property
+    def suppressed_flaps(self) -> int:
+        """Return the number of state changes dropped by the debounce window."""
+        return self._suppressed_flaps
+
+    @callback
+    def async_next_transition(self) -> asyncio.Event:
+        """Return an event that is set on the next on/off transition.
+
+        Take the event before starting the action that should cause the
+        transition, so a transition that happens before waiting is not missed.
+        """
+        return self._transition
+
+    @property
+    def last_transition(self) -> float | None:
+        """Return the monotonic time of the last on/off transition."""
+        return self._last_transition
+
+    @property
+    def known_state(self) -> bool | None:
+        """Return the last on/off state, kept while the sensor is unavailable."""
+        return self._known_state
+
     def get_current_state(self) -> bool | None:
         """Get current sensor state.
         
@@ -123,6 +327,7 @@ class StateTracker:
 
     async def async_cleanup(self) -> None:
         """Clean up state listeners."""
+        self._cancel_debounce()
         if self._unsub_state_listener:
             _LOGGER.debug("Cleaning up state tracker for %s", self.sensor_entity_id)
             self._unsub_state_listener()
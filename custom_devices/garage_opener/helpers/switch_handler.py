@@ -3,7 +3,6 @@ from __future__ import annotations
 
 import asyncio
 import logging
-from typing import Any
 
 from homeassistant.const import Platform, SERVICE_TURN_ON, SERVICE_TURN_OFF
 from homeassistant.core import HomeAssistant
@@ -16,7 +15,9 @@ class SwitchHandler:
     """Switch handler.
     
     This class provides a generic way to trigger a switch pulse
-    (always turn on) for any Home Assistant switch entity.
+    (always turn on) for any Home Assistant switch entity. With a duration,
+    the switch is turned off again at a monotonic deadline, for relays that
+    do not release on their own.
     """
 
     def __init__(self, hass: HomeAssistant) -> None:
@@ -26,15 +27,16 @@ class SwitchHandler:
             hass: Home Assistant instance
         """
         self.hass = hass
-        self._active_tasks: set[asyncio.Task[Any]] = set()
 
     async def trigger(
-        self, entity_id: str
+        self, entity_id: str, duration: float = 0.0
     ) -> bool:
         """Turn on entity.
         
         Args:
             entity_id: The entity ID of the switch to trigger
+            duration: Seconds to hold the switch on before turning it off,
+                0 to leave turning off to the device
             
         Returns:
             bool: True if successful, False if there was an error
@@ -46,6 +48,10 @@ class SwitchHandler:
             if not self.hass.states.get(entity_id):
                 raise HomeAssistantError(f"Entity {entity_id} not found")
             
+            # The pulse is timed from sending turn on, so the hold time
+            # includes the turn on round trip instead of adding to it
+            pressed = self.hass.loop.time()
+
             # Turn on the switch
             await self.hass.services.async_call(
                 Platform.SWITCH,
@@ -53,7 +59,8 @@ class SwitchHandler:
                 {"entity_id": entity_id},
                 blocking=True,
             )
-
+            if duration > 0:
+                await self._async_release(entity_id, pressed, duration)
 
             _LOGGER.debug("Trigger switch %s completed successfully", entity_id)
             return True
@@ -69,26 +76,30 @@ class SwitchHandler:
             )
             return False
 
-    async def trigger_nonblocking(
-        self, entity_id: str
+    async def _async_release(
+        self, entity_id: str, pressed: float, duration: float
     ) -> None:
-        """Trigger switch without blocking.
-        
-        Creates a background task to handle the pulse.
-        
+        """Turn the switch off duration after it was pressed.
+
         Args:
-            entity_id: The entity ID of the switch to trigger
+            entity_id: The entity ID of the switch to release
+            pressed: Loop time at which turning the switch on was requested
+            duration: Seconds to hold the switch on
         """
-        task = asyncio.create_task(self.trigger(entity_id))
-        self._active_tasks.add(task)
-        task.add_done_callback(self._active_tasks.discard)
-
-    async def cleanup(self) -> None:
-        """Cancel all active momentary tasks."""
-        if self._active_tasks:
-            _LOGGER.debug("Cancelling %d active momentary tasks", len(self._active_tasks))
-            for task in self._active_tasks:
-                task.cancel()
-            # Wait for all tasks to complete
-            await asyncio.gather(*self._active_tasks, return_exceptions=True)
-            self._active_tasks.clear()
+        loop = self.hass.loop
+        try:
+            await asyncio.sleep(max(0.0, pressed + duration - loop.time()))
+        finally:
+            # Never leave the relay on, also when the trigger is cancelled
+            await self.hass.services.async_call(
+                Platform.SWITCH,
+                SERVICE_TURN_OFF,
+                {"entity_id": entity_id},
+                blocking=True,
+            )
+            _LOGGER.debug(
+                "Switch %s released after %.3f s (requested %.3f s)",
+                entity_id,
+                loop.time() - pressed,
+                duration,
+            )
@@ -0,0 +1,123 @@
+"""Shared trigger dispatcher for Home Assistant integrations."""
+from __future__ import annotations
+
+import asyncio
+import logging
+from typing import Any
+
+from homeassistant.core import HomeAssistant, callback
+
+from .switch_handler import SwitchHandler
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class TriggerDispatcher:
+    """Integration-wide dispatcher for switch triggers.
+
+    One dispatcher is shared by every entity of an integration. Triggers to
+    the same switch are serialized: a repeat trigger while an earlier one is
+    still in flight is collapsed into the running one. The number of switches
+    triggered at the same time is capped.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        switch_handler: SwitchHandler,
+        max_concurrent: int,
+    ) -> None:
+        """Initialize the trigger dispatcher.
+
+        Args:
+            hass: Home Assistant instance
+            switch_handler: Handler used to perform each trigger
+            max_concurrent: Maximum number of switches triggered at once
+        """
+        self.hass = hass
+        self._switch_handler = switch_handler
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+        self._in_flight: dict[str, asyncio.Task[bool]] = {}
+        self._running = 0
+        self._dropped_duplicates = 0
+
+    @callback
+    def async_trigger(
+        self, entity_id: str, duration: float = 0.0
+    ) -> asyncio.Task[bool]:
+        """Schedule a trigger for a switch.
+
+        Args:
+            entity_id: The entity ID of the switch to trigger
+            duration: Seconds to hold the switch on, 0 to only turn it on
+
+        Returns:
+            The task running the trigger. If a trigger for the same switch is
+            already in flight, that task is returned and no new one is started.
+        """
+        if (task := self._in_flight.get(entity_id)) is not None:
+            self._dropped_duplicates += 1
+            _LOGGER.debug(
+                "Trigger for %s already in flight, dropping duplicate", entity_id
+            )
+            return task
+
+        task = self.hass.async_create_task(self._async_run(entity_id, duration))
+        self._in_flight[entity_id] = task
+        task.add_done_callback(lambda done: self._async_task_done(entity_id, done))
+        return task
+
+    @callback
+    def async_is_in_flight(self, entity_id: str) -> bool:
+        """Return True if a trigger for the switch is still in flight."""
+        return entity_id in self._in_flight
+
+    async def _async_run(self, entity_id: str, duration: float) -> bool:
+        """Run a trigger once a concurrency slot is free."""
+        async with self._semaphore:
+            self._running += 1
+            try:
+                return await self._switch_handler.trigger(entity_id, duration)
+            finally:
+                self._running -= 1
+
+    @callback
+    def _async_task_done(self, entity_id: str, task: asyncio.Task[bool]) -> None:
+        """Forget a finished trigger."""
+        if self._in_flight.get(entity_id) is task:
+            del self._in_flight[entity_id]
+
+    @property
+    def queue_depth(self) -> int:
+        """Return the number of triggers waiting for a concurrency slot."""
+        return len(self._in_flight) - self._running
+
+    @property
+    def dropped_duplicates(self) -> int:
+        """Return the number of triggers collapsed into an in-flight one."""
+        return self._dropped_duplicates
+
+    def get_stats(self) -> dict[str, Any]:
+        """Return dispatcher counters."""
+        return {
+            "in_flight": len(self._in_flight),
+            "running": self._running,
+            "queue_depth": self.queue_depth,
+            "dropped_duplicates": self._dropped_duplicates,
+        }
+
+    async def async_cancel(self, entity_id: str) -> None:
+        """Cancel the in-flight trigger for a switch, if any."""
+        if (task := self._in_flight.get(entity_id)) is not None:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+    async def async_shutdown(self) -> None:
+        """Cancel all in-flight triggers."""
+        tasks = list(self._in_flight.values())
+        if tasks:
+            _LOGGER.debug("Cancelling %d in-flight triggers", len(tasks))
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+        self._in_flight.clear()
@@ -0,0 +1,119 @@
+"""Per-switch trigger statistics for Home Assistant integrations."""
+from __future__ import annotations
+
+import bisect
+import logging
+from collections import deque
+from typing import Any, Callable
+
+from homeassistant.core import CALLBACK_TYPE, callback
+
+_LOGGER = logging.getLogger(__name__)
+
+# Upper bounds in seconds of the trigger to confirmed state histogram
+LATENCY_BUCKETS = (0.5, 1.0, 2.0, 5.0, 10.0, 15.0, 20.0, 30.0, 60.0)
+DEFAULT_WINDOW = 100
+
+
+class TriggerStats:
+    """Trigger counters and a rolling latency histogram for one switch.
+
+    Counters cover the whole uptime. The latency histogram covers the last
+    `window` confirmed travels only, so a relay or door that starts to
+    degrade shows up instead of being averaged away.
+    """
+
+    def __init__(self, window: int = DEFAULT_WINDOW) -> None:
+        """Initialize the statistics.
+
+        Args:
+            window: Number of recent latencies kept in the histogram
+        """
+        self.triggers = 0
+        self.failed_triggers = 0
+        self.confirmed = 0
+        self.unconfirmed = 0
+        self.last_latency: float | None = None
+        self._latencies: deque[float] = deque(maxlen=window)
+        self._bucket_counts = [0] * (len(LATENCY_BUCKETS) + 1)
+        self._listeners: list[Callable[[], None]] = []
+
+    @callback
+    def async_add_listener(self, listener: Callable[[], None]) -> CALLBACK_TYPE:
+        """Call listener after every change, return a function to remove it."""
+        self._listeners.append(listener)
+
+        @callback
+        def remove_listener() -> None:
+            self._listeners.remove(listener)
+
+        return remove_listener
+
+    @callback
+    def async_record_trigger(self) -> None:
+        """Count a trigger request."""
+        self.triggers += 1
+        self._async_notify()
+
+    @callback
+    def async_record_failure(self) -> None:
+        """Count a trigger the switch handler could not perform."""
+        self.failed_triggers += 1
+        self._async_notify()
+
+    @callback
+    def async_record_travel(self, latency: float | None) -> None:
+        """Record the outcome of a predicted travel.
+
+        Args:
+            latency: Seconds from trigger to the sensor confirming the
+                travel, None if the sensor never confirmed it
+        """
+        if latency is None:
+            self.unconfirmed += 1
+        else:
+            self.confirmed += 1
+            self.last_latency = latency
+            if len(self._latencies) == self._latencies.maxlen:
+                self._bucket_counts[self._bucket(self._latencies[0])] -= 1
+            self._latencies.append(latency)
+            self._bucket_counts[self._bucket(latency)] += 1
+        self._async_notify()
+
+    @staticmethod
+    def _bucket(latency: float) -> int:
+        return bisect.bisect_left(LATENCY_BUCKETS, latency)
+
+    def percentile(self, fraction: float) -> float | None:
+        """Return a percentile of the recent latencies in seconds."""
+        if not self._latencies:
+            return None
+        ordered = sorted(self._latencies)
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the statistics for diagnostics."""
+        histogram = {
+            f"le_{bound:g}": count
+            for bound, count in zip(LATENCY_BUCKETS, self._bucket_counts)
+        }
+        histogram["le_inf"] = self._bucket_counts[-1]
+        return {
+            "triggers": self.triggers,
+            "failed_triggers": self.failed_triggers,
+            "confirmed": self.confirmed,
+            "unconfirmed": self.unconfirmed,
+            "last_latency": self.last_latency,
+            "latency": {
+                "window": self._latencies.maxlen,
+                "samples": len(self._latencies),
+                "p50": self.percentile(0.50),
+                "p95": self.percentile(0.95),
+                "max": max(self._latencies, default=None),
+                "histogram": histogram,
+            },
+        }
+
+    def _async_notify(self) -> None:
+        for listener in list(self._listeners):
+            listener()
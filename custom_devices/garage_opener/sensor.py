@@ -0,0 +1,121 @@
+"""Diagnostic sensor platform for Momentary Garage Switch integration."""
+from __future__ import annotations
+
+import logging
+from typing import Any, Callable, NamedTuple
+
+from homeassistant.components.sensor import (
+    SensorDeviceClass,
+    SensorEntity,
+    SensorStateClass,
+)
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import CONF_NAME, EntityCategory, UnitOfTime
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.device_registry import DeviceInfo
+from homeassistant.helpers.entity_platform import AddEntitiesCallback
+
+from . import async_get_door_config, async_get_trigger_stats, door_unique_id
+from .const import DOMAIN, CONF_DIAGNOSTIC_SENSORS
+from .helpers import TriggerStats
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class _SensorKind(NamedTuple):
+    """Static description of one diagnostic sensor."""
+
+    key: str
+    name: str
+    value_fn: Callable[[TriggerStats], Any]
+    state_class: SensorStateClass
+    duration: bool = False
+
+
+SENSOR_KINDS = (
+    _SensorKind(
+        "trigger_count",
+        "Trigger count",
+        lambda stats: stats.triggers,
+        SensorStateClass.TOTAL_INCREASING,
+    ),
+    _SensorKind(
+        "failed_triggers",
+        "Failed triggers",
+        lambda stats: stats.failed_triggers,
+        SensorStateClass.TOTAL_INCREASING,
+    ),
+    _SensorKind(
+        "trigger_latency_p50",
+        "Trigger latency p50",
+        lambda stats: stats.percentile(0.50),
+        SensorStateClass.MEASUREMENT,
+        duration=True,
+    ),
+    _SensorKind(
+        "trigger_latency_p95",
+        "Trigger latency p95",
+        lambda stats: stats.percentile(0.95),
+        SensorStateClass.MEASUREMENT,
+        duration=True,
+    ),
+)
+
+
+async def async_setup_entry(
+    hass: HomeAssistant,
+    entry: ConfigEntry,
+    async_add_entities: AddEntitiesCallback,
+) -> None:
+    """Set up the diagnostic sensors of a door that enables them."""
+    door_config = async_get_door_config(entry)
+    if not door_config.get(CONF_DIAGNOSTIC_SENSORS):
+        return
+
+    async_add_entities(
+        GarageDiagnosticSensor(hass, door_config[CONF_NAME], kind)
+        for kind in SENSOR_KINDS
+    )
+
+
+class GarageDiagnosticSensor(SensorEntity):
+    """Trigger statistic of one garage door.
+
+    The value is read from the door's TriggerStats, which notifies the
+    sensor after every trigger, failure and confirmed travel.
+    """
+
+    _attr_should_poll = False
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+
+    def __init__(self, hass: HomeAssistant, door_name: str, kind: _SensorKind) -> None:
+        """Initialize the diagnostic sensor.
+
+        Args:
+            hass: Home Assistant instance
+            door_name: Name of the garage switch the statistic belongs to
+            kind: Which statistic to expose
+        """
+        self.hass = hass
+        door_id = door_unique_id(door_name)
+        self._stats = async_get_trigger_stats(hass, door_id)
+        self._value_fn = kind.value_fn
+
+        self._attr_name = f"{door_name} {kind.name}"
+        self._attr_unique_id = f"{door_id}_{kind.key}"
+        self._attr_device_info = DeviceInfo(identifiers={(DOMAIN, door_id)})
+        self._attr_state_class = kind.state_class
+        if kind.duration:
+            self._attr_device_class = SensorDeviceClass.DURATION
+            self._attr_native_unit_of_measurement = UnitOfTime.SECONDS
+            self._attr_suggested_display_precision = 2
+
+    async def async_added_to_hass(self) -> None:
+        """Follow the statistics of the door."""
+        await super().async_added_to_hass()
+        self.async_on_remove(self._stats.async_add_listener(self.async_write_ha_state))
+
+    @property
+    def native_value(self) -> Any:
+        """Return the current value of the statistic."""
+        return self._value_fn(self._stats)
@@ -1,44 +1,68 @@
 """Switch platform for Momentary Garage Switch integration."""
 from __future__ import annotations
 
+import asyncio
 import logging
+import time
+from collections.abc import Mapping
+from types import MappingProxyType
 from typing import Any
 
 from homeassistant.components.switch import SwitchEntity
-from homeassistant.const import CONF_NAME
-from homeassistant.core import HomeAssistant
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import CONF_NAME, STATE_UNAVAILABLE
+from homeassistant.core import Context, HomeAssistant, State, callback
+from homeassistant.helpers.device_registry import DeviceInfo
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
+from homeassistant.helpers.event import (
+    EventStateChangedData,
+    async_track_state_change_event,
+)
 from homeassistant.helpers.restore_state import RestoreEntity
-from homeassistant.helpers.typing import ConfigType, DiscoveryInfoType
+from homeassistant.helpers.typing import EventType
 
 from .const import (
     DOMAIN,
     CONF_TRIGGER_SWITCH,
     CONF_STATE_SENSOR,
+    CONF_TRAVEL_TIME,
+    CONF_DEBOUNCE,
+    CONF_MOMENTARY_DURATION,
+    DATA_DISPATCHER,
+    DATA_SWITCHES,
+    DATA_TRACKER_REGISTRY,
+    DEFAULT_DEBOUNCE,
+    DEFAULT_MOMENTARY_DURATION,
+    DEFAULT_TRAVEL_TIME,
     ICON_GARAGE_OPEN,
     ICON_GARAGE_CLOSED,
 )
-from .helpers import SwitchHandler, StateTracker
+from . import (
+    async_get_door_config,
+    async_get_operation_history,
+    async_get_trigger_stats,
+    door_unique_id,
+)
+from .helpers import DoorStateMachine, Operation, StateTracker
+from .helpers.door_state_machine import (
+    DOOR_CLOSED,
+    DOOR_CLOSING,
+    DOOR_OPEN,
+    DOOR_STOPPED,
+)
+from .helpers.operation_history import OUTCOME_FAILED, operation_source
 
 _LOGGER = logging.getLogger(__name__)
 
-async def async_setup_platform(
+async def async_setup_entry(
     hass: HomeAssistant,
-    config: ConfigType,
+    entry: ConfigEntry,
     async_add_entities: AddEntitiesCallback,
-    discovery_info: DiscoveryInfoType | None = None,
 ) -> None:
-    """Set up the Garage Switch platform."""
-    if DOMAIN not in hass.data or "config" not in hass.data[DOMAIN]:
-        _LOGGER.error("Momentary Garage Switch not configured")
-        return
-
-    switches = []
-    for switch_config in hass.data[DOMAIN]["config"]:
-        switches.append(GarageSwitch(hass, switch_config))
-
-    async_add_entities(switches, update_before_add=True)
-    _LOGGER.debug("Added %d garage switches", len(switches))
+    """Set up the garage switch of a config entry."""
+    async_add_entities(
+        [GarageSwitch(hass, async_get_door_config(entry))], update_before_add=True
+    )
 
 
 class GarageSwitch(SwitchEntity, RestoreEntity):
@@ -46,10 +70,16 @@ class GarageSwitch(SwitchEntity, RestoreEntity):
     
     This switch entity displays the actual door state from a binary sensor
     and triggers a momentary pulse on the physical garage switch when toggled.
+    The predicted travel (opening/closing) is shown as soon as the door is
+    triggered and confirmed or corrected by the sensor.
     """
 
     _attr_should_poll = False
     _attr_assumed_state = False
+    # Static configuration attributes, kept out of every recorded state row
+    _unrecorded_attributes = frozenset(
+        {"trigger_switch", "state_sensor", "integration"}
+    )
 
     def __init__(self, hass: HomeAssistant, config: dict[str, Any]) -> None:
         """Initialize the Momentary Garage Switch.
@@ -62,15 +92,54 @@ class GarageSwitch(SwitchEntity, RestoreEntity):
         self._attr_name = config[CONF_NAME] # Name of the garage switch entity
         self._trigger_switch = config[CONF_TRIGGER_SWITCH] # Entity ID of the trigger switch 
         self._state_sensor = config[CONF_STATE_SENSOR] # Entity ID of the state binary sensor
+        self._momentary_duration = config.get(
+            CONF_MOMENTARY_DURATION, DEFAULT_MOMENTARY_DURATION
+        ) # Seconds to hold the trigger switch on, 0 if it releases itself
         
-        self._attr_unique_id = f"{DOMAIN}_{self._attr_name.lower().replace(' ', '_')}"
+        self._attr_unique_id = door_unique_id(self._attr_name)
+        self._attr_device_info = DeviceInfo(
+            identifiers={(DOMAIN, self._attr_unique_id)},
+            name=self._attr_name,
+        )
         self._attr_is_on: bool | None = None
         self._attr_available = True
+        # Follows the trigger switch, e.g. an MQTT switch whose device went
+        # offline, so a dead trigger shows up right away instead of as a
+        # door that never moves
+        self._trigger_available = False
+
+        # Attributes never change for a given display state, so build each
+        # mapping once and hand out the same immutable object on every write
+        self._static_attributes = MappingProxyType(
+            {
+                "trigger_switch": self._trigger_switch,
+                "state_sensor": self._state_sensor,
+                "integration": DOMAIN,
+            }
+        )
+        self._attributes_by_state: dict[str, Mapping[str, Any]] = {}
         
         # Initialize helper modules
-        self._switch_handler = SwitchHandler(hass)
+        self._dispatcher = hass.data[DOMAIN][DATA_DISPATCHER]
+        self._stats = async_get_trigger_stats(hass, self._attr_unique_id)
+        self._history = async_get_operation_history(hass, self._attr_unique_id)
+        # Last operation awaiting its outcome, with its monotonic start and
+        # the sensor state before it
+        self._pending_operation: Operation | None = None
+        self._pending_started = 0.0
+        self._pending_from: bool | None = None
         self._state_tracker = StateTracker(
-            hass, self._state_sensor, self._handle_state_update
+            hass,
+            self._state_sensor,
+            self._handle_state_update,
+            hass.data[DOMAIN][DATA_TRACKER_REGISTRY],
+            config.get(CONF_DEBOUNCE, DEFAULT_DEBOUNCE),
+        )
+        self._door = DoorStateMachine(
+            hass,
+            config.get(CONF_TRAVEL_TIME, DEFAULT_TRAVEL_TIME),
+            self._handle_door_state,
+            self._async_travel_done,
         )
 
     async def async_added_to_hass(self) -> None:
@@ -83,6 +152,15 @@ class GarageSwitch(SwitchEntity, RestoreEntity):
         
         # Setup state tracking
         await self._state_tracker.async_setup()
+        self._trigger_available = _is_trigger_available(
+            self.hass.states.get(self._trigger_switch)
+        )
+        self.async_on_remove(
+            async_track_state_change_event(
+                self.hass, [self._trigger_switch], self._async_trigger_switch_changed
+            )
+        )
+        self.hass.data[DOMAIN][DATA_SWITCHES][self._attr_unique_id] = self
         
         _LOGGER.info(
             "Garage Switch '%s' initialized (trigger: %s, sensor: %s)",
@@ -96,8 +174,10 @@ class GarageSwitch(SwitchEntity, RestoreEntity):
         await super().async_will_remove_from_hass()
         
         # Cleanup
+        self.hass.data[DOMAIN][DATA_SWITCHES].pop(self._attr_unique_id, None)
         await self._state_tracker.async_cleanup()
-        await self._switch_handler.cleanup()
+        await self._dispatcher.async_cancel(self._trigger_switch)
+        self._door.async_cleanup()
 
     def _handle_state_update(self, is_on: bool) -> None:
         """Handle state updates from the binary sensor.
@@ -105,30 +185,91 @@ class GarageSwitch(SwitchEntity, RestoreEntity):
         Args:
             is_on: True if sensor is on (door open), False if off (door closed)
         """
+        # Latency counts from when the state first appeared, not from the
+        # end of the debounce window
+        changed_at = self._state_tracker.last_transition
+        if changed_at is None:
+            changed_at = time.monotonic()
+        # The outcome of a trigger is the first change that began after it
+        # and moved the door away from where it was
+        if changed_at >= self._pending_started and is_on != self._pending_from:
+            self._async_complete_operation(
+                DOOR_OPEN if is_on else DOOR_CLOSED,
+                round(changed_at - self._pending_started, 3),
+            )
+        self._door.async_sensor_update(is_on, changed_at)
+
+    @callback
+    def _async_travel_done(self, latency: float | None) -> None:
+        """Record the outcome of a predicted travel."""
+        self._stats.async_record_travel(latency)
+        if latency is None:
+            self._async_complete_operation(DOOR_STOPPED, None)
+
+    @callback
+    def _async_complete_operation(
+        self, confirmed_state: str, latency: float | None
+    ) -> None:
+        """Store the outcome of the pending operation, if there is one."""
+        if (operation := self._pending_operation) is None:
+            return
+        self._pending_operation = None
+        operation.confirmed_state = confirmed_state
+        operation.latency = latency
+
+    def _handle_door_state(self, door_state: str) -> None:
+        """Handle door state changes from the state machine.
+
+        Args:
+            door_state: New door state (closed, opening, open, closing, stopped)
+        """
         _LOGGER.debug(
-            "State update for '%s': %s -> %s",
+            "Door state update for '%s': %s",
             self._attr_name,
-            self._attr_is_on,
-            is_on,
+            door_state,
         )
-        self._attr_is_on = is_on
-        self.schedule_update_ha_state()
+        self._attr_is_on = door_state not in (DOOR_CLOSED, DOOR_CLOSING)
+        # Called from the event loop, write directly instead of scheduling
+        self.async_write_ha_state()
+
+    @callback
+    def _async_trigger_switch_changed(
+        self, event: EventType[EventStateChangedData]
+    ) -> None:
+        """Follow the availability of the trigger switch."""
+        available = _is_trigger_available(event.data["new_state"])
+        if available == self._trigger_available:
+            return
+        self._trigger_available = available
+        if available:
+            _LOGGER.info("Trigger switch %s is available again", self._trigger_switch)
+        else:
+            _LOGGER.warning(
+                "Trigger switch %s of '%s' is unavailable",
+                self._trigger_switch,
+                self._attr_name,
+            )
+        self.async_write_ha_state()
 
     @property
     def available(self) -> bool:
-        """Return True if entity is available."""
-        return self._attr_available and self._attr_is_on is not None
+        """Return True if the door state is known and it can be triggered."""
+        return (
+            self._attr_available
+            and self._attr_is_on is not None
+            and self._trigger_available
+        )
 
     @property
-    def extra_state_attributes(self) -> dict[str, Any]:
+    def extra_state_attributes(self) -> Mapping[str, Any]:
         """Return extra state attributes."""
-        state_text = self._state_tracker.get_display_state()
-        return {
-            "state_text": state_text,
-            "trigger_switch": self._trigger_switch,
-            "state_sensor": self._state_sensor,
-            "integration": DOMAIN,
-        }
+        state_text = self._door.state or "unavailable"
+        if (attributes := self._attributes_by_state.get(state_text)) is None:
+            attributes = MappingProxyType(
+                {"state_text": state_text, **self._static_attributes}
+            )
+            self._attributes_by_state[state_text] = attributes
+        return attributes
 
     @property
     def device_class(self) -> str | None:
@@ -147,12 +288,10 @@ class GarageSwitch(SwitchEntity, RestoreEntity):
         This triggers a pulse on the physical garage switch,
         which will toggle the door state (open->close or close->open).
         """
-        _LOGGER.info("Triggering garage door via '%s'", self._name)
+        _LOGGER.info("Triggering garage door via '%s'", self._attr_name)
         
         # Trigger the trigger pulse (non-blocking)
-        await self._switch_handler.trigger_nonblocking(
-            self._trigger_switch
-        )
+        self._async_trigger(self._context)
 
     async def async_turn_off(self, **kwargs: Any) -> None:
         """Turn the switch off (trigger garage door).
@@ -160,12 +299,176 @@ class GarageSwitch(SwitchEntity, RestoreEntity):
         Since this is a toggle switch, turn_off does the same as turn_on:
         it triggers a momentary pulse to toggle the door state.
         """
-        _LOGGER.info("Triggering garage door via '%s'", self._name)
+        _LOGGER.info("Triggering garage door via '%s'", self._attr_name)
         
         # Trigger the momentary pulse (non-blocking)
-        await self._switch_handler.trigger_nonblocking(
-            self._trigger_switch
+        self._async_trigger(self._context)
+
+    async def async_trigger_and_wait(
+        self,
+        confirm: bool = False,
+        timeout: float | None = None,
+        context: Context | None = None,
+    ) -> dict[str, Any]:
+        """Trigger the door and wait until the trigger switch was pulsed.
+
+        Args:
+            confirm: Also wait until the state sensor reports a transition
+            timeout: Seconds to wait for the transition, the travel time
+                when omitted
+            context: Context of the request, recorded as its source
+
+        Returns:
+            The outcome of the trigger for the service response
+        """
+        if not self._trigger_available:
+            # Fail right away instead of pulsing a switch nobody listens to
+            # and waiting out the travel time
+            _LOGGER.warning(
+                "Not triggering '%s', trigger switch %s is unavailable",
+                self._attr_name,
+                self._trigger_switch,
+            )
+            return {
+                "success": False,
+                "collapsed": False,
+                "confirmed": False if confirm else None,
+                "latency": None,
+                "door_state": self._door.state,
+            }
+
+        transition = self._state_tracker.async_next_transition()
+        started = time.monotonic()
+        pre_trigger_state = self._state_tracker.known_state
+        collapsed = self._dispatcher.async_is_in_flight(self._trigger_switch)
+        task = self._async_trigger(context)
+        if not collapsed:
+            # Same start as the recorded operation, so both report one latency
+            started = self._pending_started
+        try:
+            # Shielded so a cancelled service call leaves the trigger running
+            success = await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if not task.cancelled():
+                raise
+            success = False
+
+        confirmed: bool | None = None
+        latency: float | None = None
+        if confirm:
+            confirmed = False
+            if success:
+                try:
+                    async with asyncio.timeout(timeout or self._door.travel_time):
+                        changed_at = await self._async_wait_moved(
+                            transition, started, pre_trigger_state
+                        )
+                except TimeoutError:
+                    _LOGGER.warning(
+                        "Sensor of '%s' reported no transition after the trigger",
+                        self._attr_name,
+                    )
+                else:
+                    confirmed = True
+                    latency = round(changed_at - started, 3)
+
+        return {
+            "success": success,
+            "collapsed": collapsed,
+            "confirmed": confirmed,
+            "latency": latency,
+            "door_state": self._door.state,
+        }
+
+    async def _async_wait_moved(
+        self, transition: asyncio.Event, started: float, pre_trigger_state: bool | None
+    ) -> float:
+        """Wait for a transition that began after the trigger.
+
+        Transitions that first appeared before the trigger, or that end in
+        the state the sensor had before it, do not confirm the trigger.
+
+        Returns:
+            The monotonic time the confirming transition first appeared
+        """
+        while True:
+            await transition.wait()
+            transition = self._state_tracker.async_next_transition()
+            changed_at = self._state_tracker.last_transition
+            if (
+                changed_at >= started
+                and self._state_tracker.known_state != pre_trigger_state
+            ):
+                return changed_at
+
+    @callback
+    def _async_trigger(self, context: Context | None) -> asyncio.Task[bool]:
+        """Dispatch a trigger and show the predicted travel right away.
+
+        Args:
+            context: Context of the request, recorded as its source
+
+        Returns:
+            The dispatcher task running the trigger
+        """
+        self._stats.async_record_trigger()
+        collapsed = self._dispatcher.async_is_in_flight(self._trigger_switch)
+        task = self._dispatcher.async_trigger(
+            self._trigger_switch, self._momentary_duration
+        )
+        if collapsed:
+            # The running trigger already moved the prediction
+            return task
+
+        # A trigger before the outcome of the previous one replaces it
+        self._async_complete_operation(DOOR_STOPPED, None)
+        self._pending_operation = operation = self._history.record(
+            time.time(), operation_source(context)
         )
+        self._pending_started = time.monotonic()
+        self._pending_from = self._state_tracker.known_state
+        self._door.async_trigger()
+        task.add_done_callback(
+            lambda task: self._async_trigger_done(task, operation)
+        )
+        return task
+
+    @callback
+    def _async_trigger_done(
+        self, task: asyncio.Task[bool], operation: Operation
+    ) -> None:
+        """Roll back the prediction if the trigger did not go through."""
+        if task.cancelled() or task.exception() is not None or not task.result():
+            self._stats.async_record_failure()
+            if operation is self._pending_operation:
+                self._pending_operation = None
+            operation.confirmed_state = OUTCOME_FAILED
+            self._door.async_trigger_failed()
+
+    @callback
+    def async_get_diagnostics(self) -> dict[str, Any]:
+        """Return the door configuration, state and trigger statistics."""
+        return {
+            "name": self._attr_name,
+            "entity_id": self.entity_id,
+            "trigger_switch": self._trigger_switch,
+            "state_sensor": self._state_sensor,
+            "travel_time": self._door.travel_time,
+            "momentary_duration": self._momentary_duration,
+            "door_state": self._door.state,
+            "trigger_available": self._trigger_available,
+            "sensor_flaps_suppressed": self._state_tracker.suppressed_flaps,
+            "trigger_in_flight": self._dispatcher.async_is_in_flight(
+                self._trigger_switch
+            ),
+            "stats": self._stats.as_dict(),
+            "history": self._history.as_list(),
+        }
+
+    @callback
+    def async_get_history(self, limit: int | None = None) -> list[dict[str, Any]]:
+        """Return the recent operations of the door, newest first."""
+        return self._history.as_list(limit)
 
     async def async_update(self) -> None:
         """Update the entity.
@@ -176,3 +479,8 @@ class GarageSwitch(SwitchEntity, RestoreEntity):
         # State updates are handled by the StateTracker callback
         # This method is here for compatibility but doesn't need to do anything
         pass
+
+
+def _is_trigger_available(state: State | None) -> bool:
+    """Return True if a trigger switch in this state can be pulsed."""
+    return state is not None and state.state != STATE_UNAVAILABLE
@@ -0,0 +1,60 @@
+"""Tests for the door travel state machine.
+
+Run from custom_devices/ with:
+    python -m unittest discover -s tests
+"""
+from __future__ import annotations
+
+import sys
+import time
+import unittest
+from pathlib import Path
+
+# bench_hass provides the bare hass and puts custom_devices/ on sys.path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "benchmarks"))
+
+from bench_hass import async_create_bench_hass, async_stop_bench_hass  # noqa: E402
+
+from garage_opener.helpers import DoorStateMachine  # noqa: E402
+from garage_opener.helpers.door_state_machine import (  # noqa: E402
+    DOOR_CLOSED,
+    DOOR_OPEN,
+    DOOR_OPENING,
+)
+
+
+class DoorStateMachineTest(unittest.IsolatedAsyncioTestCase):
+    """Confirming predicted travel from sensor changes."""
+
+    async def asyncSetUp(self) -> None:
+        self.hass = await async_create_bench_hass()
+        self.states: list[str] = []
+        self.travels: list[float | None] = []
+        self.door = DoorStateMachine(
+            self.hass, 30, self.states.append, self.travels.append
+        )
+        self.door.async_sensor_update(False)
+
+    async def asyncTearDown(self) -> None:
+        self.door.async_cleanup()
+        await async_stop_bench_hass(self.hass)
+
+    async def test_change_after_the_trigger_confirms_the_travel(self) -> None:
+        self.door.async_trigger()
+        self.door.async_sensor_update(True, time.monotonic())
+        self.assertEqual(self.states, [DOOR_CLOSED, DOOR_OPENING, DOOR_OPEN])
+        (latency,) = self.travels
+        self.assertGreaterEqual(latency, 0.0)
+
+    async def test_change_from_before_the_trigger_is_ignored(self) -> None:
+        # Still in the sensor's debounce window when the door was triggered
+        changed_at = time.monotonic()
+        self.door.async_trigger()
+        self.door.async_sensor_update(True, changed_at)
+        self.assertEqual(self.door.state, DOOR_OPENING)
+        self.assertEqual(self.travels, [])
+        self.assertTrue(self.door.is_moving)
+
+
+if __name__ == "__main__":
+    unittest.main()
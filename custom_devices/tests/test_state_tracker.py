@@ -0,0 +1,93 @@
+"""Tests for the binary sensor state tracker.
+
+Run from custom_devices/ with:
+    python -m unittest discover -s tests
+"""
+from __future__ import annotations
+
+import asyncio
+import sys
+import unittest
+from pathlib import Path
+
+# bench_hass provides the bare hass and puts custom_devices/ on sys.path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "benchmarks"))
+
+from bench_hass import async_create_bench_hass, async_stop_bench_hass  # noqa: E402
+from homeassistant.const import STATE_OFF, STATE_ON, STATE_UNAVAILABLE  # noqa: E402
+
+from garage_opener.helpers import StateTracker, StateTrackerRegistry  # noqa: E402
+
+SENSOR = "binary_sensor.garage_contact"
+
+
+class StateTrackerTest(unittest.IsolatedAsyncioTestCase):
+    """Transitions and callbacks of a tracker without debounce."""
+
+    debounce = 0.0
+
+    async def asyncSetUp(self) -> None:
+        self.hass = await async_create_bench_hass()
+        self.hass.states.async_set(SENSOR, STATE_OFF)
+        self.updates: list[bool] = []
+        self.tracker = StateTracker(
+            self.hass,
+            SENSOR,
+            self.updates.append,
+            StateTrackerRegistry(self.hass),
+            self.debounce,
+        )
+        await self.tracker.async_setup()
+
+    async def asyncTearDown(self) -> None:
+        await self.tracker.async_cleanup()
+        await async_stop_bench_hass(self.hass)
+
+    async def set_sensor(self, state: str) -> None:
+        """Change the sensor and wait out the debounce window."""
+        self.hass.states.async_set(SENSOR, state)
+        await self.hass.async_block_till_done()
+        if self.debounce:
+            await asyncio.sleep(self.debounce * 2)
+            await self.hass.async_block_till_done()
+
+    async def test_initial_state_is_reported(self) -> None:
+        self.assertEqual(self.updates, [False])
+        self.assertIsNone(self.tracker.last_transition)
+
+    async def test_transition(self) -> None:
+        transition = self.tracker.async_next_transition()
+        await self.set_sensor(STATE_ON)
+        self.assertTrue(transition.is_set())
+        self.assertIsNotNone(self.tracker.last_transition)
+        self.assertEqual(self.updates, [False, True])
+        self.assertEqual(self.tracker.get_display_state(), "open")
+
+    async def test_unavailable_and_back_in_the_same_state(self) -> None:
+        transition = self.tracker.async_next_transition()
+        await self.set_sensor(STATE_UNAVAILABLE)
+        self.assertEqual(self.tracker.get_display_state(), "unavailable")
+        await self.set_sensor(STATE_OFF)
+
+        self.assertFalse(transition.is_set())
+        self.assertIsNone(self.tracker.last_transition)
+        self.assertEqual(self.updates, [False])
+        self.assertEqual(self.tracker.get_display_state(), "closed")
+
+    async def test_unavailable_and_back_in_the_other_state(self) -> None:
+        transition = self.tracker.async_next_transition()
+        await self.set_sensor(STATE_UNAVAILABLE)
+        await self.set_sensor(STATE_ON)
+
+        self.assertTrue(transition.is_set())
+        self.assertEqual(self.updates, [False, True])
+
+
+class DebouncedStateTrackerTest(StateTrackerTest):
+    """The same cases with the unavailable state held past the window."""
+
+    debounce = 0.02
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,68 @@
+"""Tests for the momentary switch handler.
+
+Run from custom_devices/ with:
+    python -m unittest discover -s tests
+"""
+from __future__ import annotations
+
+import asyncio
+import sys
+import unittest
+from pathlib import Path
+
+# bench_hass provides the bare hass and puts custom_devices/ on sys.path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "benchmarks"))
+
+from bench_hass import async_create_bench_hass, async_stop_bench_hass  # noqa: E402
+from homeassistant.const import STATE_OFF  # noqa: E402
+from homeassistant.core import ServiceCall  # noqa: E402
+
+from garage_opener.helpers import SwitchHandler  # noqa: E402
+
+TRIGGER = "switch.garage_relay"
+# Seconds the turn on service call takes to return
+TURN_ON_DELAY = 0.1
+
+
+class SwitchHandlerTest(unittest.IsolatedAsyncioTestCase):
+    """Timing of momentary pulses."""
+
+    async def asyncSetUp(self) -> None:
+        self.hass = await async_create_bench_hass()
+        self.hass.states.async_set(TRIGGER, STATE_OFF)
+        self.calls: list[tuple[str, float]] = []
+        self.hass.services.async_register("switch", "turn_on", self._async_turn_on)
+        self.hass.services.async_register("switch", "turn_off", self._async_turn_off)
+        self.handler = SwitchHandler(self.hass)
+
+    async def asyncTearDown(self) -> None:
+        await async_stop_bench_hass(self.hass)
+
+    async def _async_turn_on(self, call: ServiceCall) -> None:
+        self.calls.append(("on", self.hass.loop.time()))
+        await asyncio.sleep(TURN_ON_DELAY)
+
+    async def _async_turn_off(self, call: ServiceCall) -> None:
+        self.calls.append(("off", self.hass.loop.time()))
+
+    async def test_hold_time_includes_the_turn_on_call(self) -> None:
+        self.assertTrue(await self.handler.trigger(TRIGGER, 0.3))
+        (_, turned_on), (_, turned_off) = self.calls
+        self.assertAlmostEqual(turned_off - turned_on, 0.3, delta=0.05)
+
+    async def test_slow_turn_on_releases_right_away(self) -> None:
+        self.assertTrue(await self.handler.trigger(TRIGGER, TURN_ON_DELAY / 2))
+        (_, turned_on), (_, turned_off) = self.calls
+        self.assertAlmostEqual(turned_off - turned_on, TURN_ON_DELAY, delta=0.05)
+
+    async def test_without_duration_the_switch_is_not_released(self) -> None:
+        self.assertTrue(await self.handler.trigger(TRIGGER))
+        self.assertEqual([action for action, _ in self.calls], ["on"])
+
+    async def test_missing_switch_fails(self) -> None:
+        self.assertFalse(await self.handler.trigger("switch.missing", 0.3))
+        self.assertEqual(self.calls, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+"""
+End-to-end latency benchmark for the garage opener daemon
+
+Starts src/main.py in-process against a loopback Mini_Broker with a
+simulated GPIO backend, fires command bursts at
+homeassistant/switch/<id>/set (or at the local control socket with
+--transport control) and reports percentile histograms (JSON) for:
+- command publish -> pulse start
+- command publish -> state publish received
+
+Usage:
+    python e2e_latency.py --doors 4 --bursts 20 --burst-size 5
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict, deque
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+SRC_DIR = os.path.join(BENCH_DIR, '..', 'src')
+sys.path.insert(0, SRC_DIR)
+
+import paho.mqtt.client as mqtt
+from control_socket_lib import Control_Client
+from mini_broker import Mini_Broker
+
+CONFIG_TEMPLATE = """
+mqtt:
+  broker: 127.0.0.1
+  username: bench
+  password: bench
+  port: {port}
+  keepalive: 60
+
+metrics:
+  port: 0
+  interval: 0
+
+device:
+  version: 1
+
+control:
+  socket: {control_socket}
+
+gpio:
+  backend: {backend}
+
+devices:
+{devices}
+"""
+
+
+def write_config(port, door_ids, backend, control_socket, pulse_ms, pulse_gap_ms):
+    """Write a daemon config pointing at the loopback broker"""
+    devices = "\n".join(
+        f"  - id: {door_id}\n    garage_door_pin: {index + 2}\n"
+        f"    pulse_duration: {pulse_ms / 1000}\n    pulse_gap: {pulse_gap_ms / 1000}"
+        for index, door_id in enumerate(door_ids)
+    )
+    handle, path = tempfile.mkstemp(prefix="genie_bench_", suffix=".yaml")
+    with os.fdopen(handle, 'w') as file:
+        file.write(CONFIG_TEMPLATE.format(
+            port=port, devices=devices, backend=backend, control_socket=control_socket,
+        ))
+    return path
+
+
+def summarize(samples):
+    """
+    Build a percentile histogram from latency samples
+
+    Args:
+        samples (list): Latencies in seconds
+
+    Returns:
+        dict: Percentiles and power-of-two microsecond buckets
+    """
+    if not samples:
+        return {"samples": 0}
+    ordered = sorted(samples)
+    count = len(ordered)
+
+    def percentile(fraction):
+        return ordered[min(count - 1, int(fraction * count))] * 1e6
+
+    buckets = defaultdict(int)
+    for sample in ordered:
+        bound = 1
+        while bound < sample * 1e6:
+            bound *= 2
+        buckets[bound] += 1
+
+    return {
+        "samples": count,
+        "mean_us": sum(ordered) / count * 1e6,
+        "p50_us": percentile(0.50),
+        "p90_us": percentile(0.90),
+        "p99_us": percentile(0.99),
+        "p999_us": percentile(0.999),
+        "max_us": ordered[-1] * 1e6,
+        "histogram_le_us": {str(bound): buckets[bound] for bound in sorted(buckets)},
+    }
+
+
+class Latency_Recorder:
+    """
+    Match commands to pulses and state publishes per door (both are FIFO)
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.pending_pulse = defaultdict(deque)
+        self.pending_state = defaultdict(deque)
+        self.pulse_start = []
+        self.state_publish = []
+        self.done = threading.Event()
+        self.expected = 0
+
+    def command_sent(self, door_id, sent_at):
+        with self.lock:
+            self.pending_pulse[door_id].append(sent_at)
+            self.pending_state[door_id].append(sent_at)
+
+    def pulse_started(self, door_id, started_at):
+        with self.lock:
+            if self.pending_pulse[door_id]:
+                self.pulse_start.append(started_at - self.pending_pulse[door_id].popleft())
+
+    def state_received(self, door_id, received_at):
+        with self.lock:
+            if self.pending_state[door_id]:
+                self.state_publish.append(received_at - self.pending_state[door_id].popleft())
+                if len(self.state_publish) >= self.expected:
+                    self.done.set()
+
+
+def instrument(door, recorder):
+    """Record pulse start times for a daemon door"""
+    genie_garage = door.genie_garage
+    door_id = door.ha_mqtt.device_id
+    original = genie_garage.start_pulse
+
+    def start_pulse():
+        recorder.pulse_started(door_id, time.perf_counter())
+        return original()
+
+    genie_garage.start_pulse = start_pulse
+
+
+def run(args):
+    broker = Mini_Broker().start()
+    door_ids = [f"bench_door_{index}" for index in range(args.doors)]
+    control_socket = os.path.join(tempfile.gettempdir(), f"genie_bench_{os.getpid()}.sock")
+    os.environ['genie_config_file'] = write_config(
+        broker.port, door_ids, args.backend, control_socket, args.pulse_ms, args.pulse_gap_ms,
+    )
+
+    import main as daemon
+
+    recorder = Latency_Recorder()
+    recorder.expected = args.doors * args.bursts * args.burst_size
+    for door in daemon.doors.values():
+        instrument(door, recorder)
+
+    # Observer: wait for every door's initial state, then time the rest
+    ready = set()
+    ready_event = threading.Event()
+
+    def on_state(client, userdata, msg):
+        door_id = msg.topic.split('/')[2]
+        if door_id not in ready:
+            ready.add(door_id)
+            if len(ready) == len(door_ids):
+                ready_event.set()
+            return
+        recorder.state_received(door_id, time.perf_counter())
+
+    observer = mqtt.Client()
+    observer.on_message = on_state
+    observer.connect('127.0.0.1', broker.port)
+    observer.subscribe('homeassistant/switch/+/state')
+    observer.loop_start()
+
+    daemon_thread = threading.Thread(target=daemon.main, name="daemon", daemon=True)
+    daemon_thread.start()
+    if not ready_event.wait(args.timeout):
+        raise RuntimeError("Daemon did not publish initial state in time")
+
+    if args.transport == 'control':
+        control = Control_Client(control_socket)
+
+        def send(door_id):
+            if not control.trigger(door_id):
+                raise RuntimeError(f"Control socket rejected {door_id}")
+    else:
+        commander = mqtt.Client()
+        commander.connect('127.0.0.1', broker.port)
+        commander.loop_start()
+
+        def send(door_id):
+            commander.publish(f"homeassistant/switch/{door_id}/set", "ON")
+
+    started = time.perf_counter()
+    for _ in range(args.bursts):
+        for door_id in door_ids:
+            for _ in range(args.burst_size):
+                recorder.command_sent(door_id, time.perf_counter())
+                send(door_id)
+        time.sleep(args.interval_ms / 1000)
+    completed = recorder.done.wait(args.timeout)
+    elapsed = time.perf_counter() - started
+
+    if args.transport == 'control':
+        control.close()
+    else:
+        commander.loop_stop()
+        commander.disconnect()
+    observer.loop_stop()
+    observer.disconnect()
+    daemon.shutdown()
+    daemon_thread.join(5)
+    broker.stop()
+    os.unlink(os.environ['genie_config_file'])
+    with contextlib.suppress(FileNotFoundError):
+        os.unlink(daemon.DISCOVERY_CACHE_FILE)
+
+    return {
+        "suite": "genie_garage_opener_e2e",
+        "doors": args.doors,
+        "transport": args.transport,
+        "commands": recorder.expected,
+        "completed": completed,
+        "elapsed_s": elapsed,
+        "pulse_ms": args.pulse_ms,
+        "pulse_gap_ms": args.pulse_gap_ms,
+        "command_to_pulse_start": summarize(recorder.pulse_start),
+        "command_to_state_publish": summarize(recorder.state_publish),
+        "daemon_metrics": daemon.metrics.summary(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end latency benchmark for the garage opener daemon")
+    parser.add_argument('--doors', type=int, default=4, help="Number of simulated doors")
+    parser.add_argument('--bursts', type=int, default=20, help="Number of command bursts")
+    parser.add_argument('--burst-size', type=int, default=5, help="Commands per door per burst")
+    parser.add_argument('--interval-ms', type=float, default=50, help="Pause between bursts")
+    parser.add_argument('--pulse-ms', type=float, default=1, help="Simulated pulse width")
+    parser.add_argument('--pulse-gap-ms', type=float, default=1, help="Release time between pulses of a door")
+    parser.add_argument('--backend', choices=['simulation', 'mock'], default='simulation',
+                        help="GPIO backend: virtual clock (simulation) or wall clock (mock)")
+    parser.add_argument('--transport', choices=['mqtt', 'control'], default='mqtt',
+                        help="Send commands through the broker or the local control socket")
+    parser.add_argument('--timeout', type=float, default=60, help="Seconds to wait for results")
+    parser.add_argument('--verbose', action='store_true', help="Keep the daemon output")
+    parser.add_argument('--output', help="Also write the JSON report to this file")
+    args = parser.parse_args()
+
+    if args.verbose:
+        report = run(args)
+    else:
+        with contextlib.redirect_stdout(io.StringIO()):
+            report = run(args)
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as file:
+            file.write(output + "\n")
+    print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,375 @@
+#!/usr/bin/env python3
+"""
+Virtual device fleet load generator for the garage opener protocol
+
+Spins up a fleet of virtual garage doors against a loopback Mini_Broker (or
+an external broker) and drives them the way Home Assistant would. Topics and
+discovery payloads come from HA_MQTT_Config, so the fleet speaks exactly the
+protocol of src/main.py:
+
+- every virtual Pi publishes the retained discovery config of its doors and
+  their initial state
+- commands on homeassistant/switch/<id>/set toggle the door and publish its
+  new state
+- doors also change state on their own, like a door sensor, at a
+  configurable rate
+
+Virtual doors answer commands immediately, so the latencies are the cost of
+the protocol and the broker, not of GPIO timing (see e2e_latency.py for
+that). The run is repeated for every fleet size and reports per step:
+- discovery time
+- state message throughput
+- percentile histograms (JSON) for command publish -> state received and
+  sensor transition -> state received
+
+Usage:
+    python fleet_load.py --devices 10,50,100,200 --duration 10
+"""
+
+import argparse
+import json
+import os
+import random
+import socket
+import sys
+import threading
+import time
+from collections import defaultdict, deque
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+SRC_DIR = os.path.join(BENCH_DIR, '..', 'src')
+sys.path.insert(0, SRC_DIR)
+
+import paho.mqtt.client as mqtt
+from e2e_latency import summarize
+from ha_mqqt_setup_lib import STATE_PAYLOADS, HA_MQTT_Config
+from mini_broker import Mini_Broker
+
+DEVICE_VERSION = 1
+DISCOVERY_WILDCARD = "homeassistant/switch/+/config"
+STATE_WILDCARD = "homeassistant/switch/+/state"
+
+
+def connect(client, host, port, nodelay):
+    """Connect a client, optionally with Nagle's algorithm turned off"""
+    client.connect(host, port)
+    if nodelay:
+        client.socket().setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+
+class Fleet_Recorder:
+    """
+    Match state messages to the command or transition that caused them
+
+    Commands of one door reach its virtual Pi in order, and state messages
+    of one door reach the observer in order, so both sides are FIFO per door.
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        # Door -> send times of commands the door has not answered yet
+        self.pending_commands = defaultdict(deque)
+        # Door -> (kind, origin time) of state messages not received yet
+        self.pending_states = defaultdict(deque)
+        self.command_to_state = []
+        self.transition_to_state = []
+        self.commands = 0
+        self.transitions = 0
+        self.received = 0
+        self.unmatched = 0
+        self.drained = threading.Event()
+
+    def command_sent(self, door_id, sent_at):
+        with self.lock:
+            self.commands += 1
+            self.drained.clear()
+            self.pending_commands[door_id].append(sent_at)
+
+    def command_answered(self, door_id):
+        """Called by a virtual Pi right before it publishes the new state"""
+        with self.lock:
+            if self.pending_commands[door_id]:
+                origin = self.pending_commands[door_id].popleft()
+                self.pending_states[door_id].append(('command', origin))
+
+    def transition_emitted(self, door_id, emitted_at):
+        with self.lock:
+            self.transitions += 1
+            self.drained.clear()
+            self.pending_states[door_id].append(('transition', emitted_at))
+
+    def state_received(self, door_id, received_at):
+        with self.lock:
+            if not self.pending_states[door_id]:
+                self.unmatched += 1
+                return
+            kind, origin = self.pending_states[door_id].popleft()
+            if kind == 'command':
+                self.command_to_state.append(received_at - origin)
+            else:
+                self.transition_to_state.append(received_at - origin)
+            self.received += 1
+            if self.received >= self.commands + self.transitions:
+                self.drained.set()
+
+
+class Virtual_Pi:
+    """
+    One simulated daemon driving several virtual doors over one connection
+    """
+    def __init__(self, index, door_ids, host, port, recorder, subscribe_mode, qos, nodelay):
+        """
+        Args:
+            index (int): Number of the Pi, used for its client id
+            door_ids (list): Device ids of its doors
+            host (str): Broker address
+            port (int): Broker port
+            recorder (Fleet_Recorder): Records answered commands and transitions
+            subscribe_mode (str): 'wildcard' subscribes to every command topic
+                like src/main.py, 'per-door' only to its own doors
+            qos (int): QoS of state publishes and command subscriptions
+            nodelay (bool): Turn off Nagle's algorithm on the connection
+        """
+        self.recorder = recorder
+        self.subscribe_mode = subscribe_mode
+        self.qos = qos
+        self.configs = [HA_MQTT_Config(door_id, DEVICE_VERSION) for door_id in door_ids]
+        self.doors_by_topic = {config.command_topic: config for config in self.configs}
+        self.states = {config.device_id: "OFF" for config in self.configs}
+        # Commands for doors of other Pis, delivered by the wildcard
+        self.ignored = 0
+        # Keeps the recorded order equal to the publish order
+        self.lock = threading.Lock()
+        self.client = mqtt.Client(client_id=f"fleet_pi_{index}")
+        self.client.on_connect = self.on_connect
+        self.client.on_message = self.on_message
+        connect(self.client, host, port, nodelay)
+
+    def start(self):
+        self.client.loop_start()
+
+    def stop(self):
+        self.client.loop_stop()
+        self.client.disconnect()
+
+    def on_connect(self, client, userdata, flags, rc):
+        if self.subscribe_mode == 'wildcard':
+            client.subscribe(HA_MQTT_Config.command_wildcard, qos=self.qos)
+        else:
+            client.subscribe([(config.command_topic, self.qos) for config in self.configs])
+        for config in self.configs:
+            client.publish(config.discovery_topic, config.get_discovery_payload(), qos=1, retain=True)
+            client.publish(config.state_topic, STATE_PAYLOADS[self.states[config.device_id]], qos=self.qos)
+
+    def on_message(self, client, userdata, msg):
+        config = self.doors_by_topic.get(msg.topic)
+        if config is None:
+            self.ignored += 1
+            return
+        with self.lock:
+            self.recorder.command_answered(config.device_id)
+            self._toggle(config)
+
+    def emit_transition(self, config):
+        """Change the state of a door as if its sensor saw it move"""
+        with self.lock:
+            self.recorder.transition_emitted(config.device_id, time.perf_counter())
+            self._toggle(config)
+
+    def _toggle(self, config):
+        state = "ON" if self.states[config.device_id] == "OFF" else "OFF"
+        self.states[config.device_id] = state
+        self.client.publish(config.state_topic, STATE_PAYLOADS[state], qos=self.qos)
+
+    def clear_discovery(self):
+        """Remove the retained discovery configs, so the broker ends up clean"""
+        for config in self.configs:
+            self.client.publish(config.discovery_topic, b"", qos=1, retain=True).wait_for_publish(5)
+
+
+class Observer:
+    """
+    Home Assistant stand-in: follows discovery and states, sends commands
+    """
+    def __init__(self, host, port, recorder, door_ids, qos, nodelay):
+        self.recorder = recorder
+        self.qos = qos
+        self.discovered = set()
+        self.ready = set()
+        self.expected = set(door_ids)
+        self.all_discovered = threading.Event()
+        self.all_ready = threading.Event()
+        self.client = mqtt.Client(client_id="fleet_observer")
+        self.client.on_message = self.on_message
+        connect(self.client, host, port, nodelay)
+        self.client.subscribe([(DISCOVERY_WILDCARD, 1), (STATE_WILDCARD, qos)])
+        self.client.loop_start()
+
+    def stop(self):
+        self.client.loop_stop()
+        self.client.disconnect()
+
+    def on_message(self, client, userdata, msg):
+        door_id = msg.topic.split('/')[2]
+        if msg.topic.endswith('/config'):
+            if msg.payload and door_id in self.expected:
+                self.discovered.add(door_id)
+                if len(self.discovered) == len(self.expected):
+                    self.all_discovered.set()
+            return
+        if door_id not in self.ready:
+            # Initial state of the door
+            self.ready.add(door_id)
+            if len(self.ready) == len(self.expected):
+                self.all_ready.set()
+            return
+        self.recorder.state_received(door_id, time.perf_counter())
+
+    def send_command(self, config):
+        self.recorder.command_sent(config.device_id, time.perf_counter())
+        self.client.publish(config.command_topic, "ON", qos=self.qos)
+
+
+def run_step(args, devices):
+    """
+    Run the load against one fleet size
+
+    Returns:
+        dict: Report of the step
+    """
+    broker = None
+    if args.broker:
+        host, _, port = args.broker.partition(':')
+        port = int(port or 1883)
+    else:
+        broker = Mini_Broker().start()
+        host, port = broker.host, broker.port
+
+    door_ids = [f"fleet_door_{index}" for index in range(devices)]
+    recorder = Fleet_Recorder()
+    observer = Observer(host, port, recorder, door_ids, args.qos, args.nodelay)
+
+    connect_started = time.perf_counter()
+    pis = [
+        Virtual_Pi(index, door_ids[start:start + args.doors_per_pi], host, port,
+                   recorder, args.subscribe, args.qos, args.nodelay)
+        for index, start in enumerate(range(0, devices, args.doors_per_pi))
+    ]
+    for pi in pis:
+        pi.start()
+    if not observer.all_discovered.wait(args.timeout) or not observer.all_ready.wait(args.timeout):
+        raise RuntimeError(f"Fleet of {devices} doors did not come up in time")
+    discovery_s = time.perf_counter() - connect_started
+
+    # Every event is a command or a sensor transition of a random door
+    doors = [(pi, config) for pi in pis for config in pi.configs]
+    command_rate = args.command_rate * devices
+    transition_rate = args.transition_rate * devices
+    total_rate = command_rate + transition_rate
+    broker_published = broker.published if broker is not None else None
+
+    started = time.perf_counter()
+    next_at = started
+    deadline = started + args.duration
+    while total_rate > 0:
+        next_at += random.expovariate(total_rate)
+        if next_at >= deadline:
+            break
+        delay = next_at - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        pi, config = random.choice(doors)
+        if random.random() * total_rate < command_rate:
+            observer.send_command(config)
+        else:
+            pi.emit_transition(config)
+    generated_s = time.perf_counter() - started
+    completed = recorder.drained.wait(args.timeout) if recorder.commands + recorder.transitions else True
+    elapsed = time.perf_counter() - started
+
+    for pi in pis:
+        pi.clear_discovery()
+        pi.stop()
+    observer.stop()
+    if broker is not None:
+        broker_published = broker.published - broker_published
+        broker.stop()
+
+    return {
+        "devices": devices,
+        "virtual_pis": len(pis),
+        "completed": completed,
+        "discovery_s": discovery_s,
+        "generated_s": generated_s,
+        "elapsed_s": elapsed,
+        "commands": recorder.commands,
+        "transitions": recorder.transitions,
+        "states_received": recorder.received,
+        "states_unmatched": recorder.unmatched,
+        "commands_ignored": sum(pi.ignored for pi in pis),
+        "offered_rate_per_s": total_rate,
+        "achieved_rate_per_s": (recorder.commands + recorder.transitions) / generated_s,
+        "state_throughput_per_s": recorder.received / elapsed,
+        "broker_publishes_per_s": broker_published / elapsed if broker_published is not None else None,
+        "command_to_state": summarize(recorder.command_to_state),
+        "transition_to_state": summarize(recorder.transition_to_state),
+    }
+
+
+def parse_sizes(value):
+    sizes = [int(size) for size in value.split(',') if size.strip()]
+    if not sizes or min(sizes) < 1:
+        raise argparse.ArgumentTypeError("expected a comma separated list of positive fleet sizes")
+    return sizes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Virtual device fleet load generator for the garage opener protocol")
+    parser.add_argument('--devices', type=parse_sizes, default=[10, 50, 100],
+                        help="Comma separated fleet sizes to run, one step each")
+    parser.add_argument('--doors-per-pi', type=int, default=4, help="Virtual doors sharing one MQTT connection")
+    parser.add_argument('--command-rate', type=float, default=0.5, help="Commands per door per second")
+    parser.add_argument('--transition-rate', type=float, default=0.5,
+                        help="Sensor transitions per door per second")
+    parser.add_argument('--duration', type=float, default=10, help="Seconds of load per step")
+    parser.add_argument('--qos', type=int, choices=[0, 1], default=1, help="QoS of commands and states")
+    parser.add_argument('--subscribe', choices=['wildcard', 'per-door'], default='wildcard',
+                        help="Command subscription of each virtual Pi: the daemon's wildcard, or only its own doors")
+    parser.add_argument('--nodelay', action='store_true',
+                        help="Set TCP_NODELAY on every client, paho leaves Nagle's algorithm on")
+    parser.add_argument('--broker', help="host[:port] of an external broker instead of the loopback one")
+    parser.add_argument('--seed', type=int, help="Seed for the random load")
+    parser.add_argument('--timeout', type=float, default=60, help="Seconds to wait for the fleet and the results")
+    parser.add_argument('--output', help="Also write the JSON report to this file")
+    args = parser.parse_args()
+    if args.doors_per_pi < 1:
+        parser.error("--doors-per-pi must be at least 1")
+    if args.seed is not None:
+        random.seed(args.seed)
+
+    steps = []
+    for devices in args.devices:
+        steps.append(run_step(args, devices))
+        print(f"{devices} doors: {steps[-1]['state_throughput_per_s']:.0f} states/s, "
+              f"command p99 {steps[-1]['command_to_state'].get('p99_us', 0):.0f} us", file=sys.stderr)
+
+    report = {
+        "suite": "genie_garage_opener_fleet",
+        "broker": args.broker or "loopback",
+        "doors_per_pi": args.doors_per_pi,
+        "subscribe": args.subscribe,
+        "qos": args.qos,
+        "nodelay": args.nodelay,
+        "command_rate": args.command_rate,
+        "transition_rate": args.transition_rate,
+        "duration_s": args.duration,
+        "steps": steps,
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as file:
+            file.write(output + "\n")
+    print(output)
+
+
+if __name__ == "__main__":
+    main()
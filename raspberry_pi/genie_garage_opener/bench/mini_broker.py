@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+"""
+Minimal loopback MQTT broker for benchmarks
+
+Implements just enough of MQTT 3.1.1 for the garage opener daemon and the
+benchmark clients: CONNECT with Last Will and persistent sessions, PUBLISH
+at QoS 0/1, retained messages, SUBSCRIBE/UNSUBSCRIBE with + and #
+wildcards, PINGREQ and DISCONNECT. No authentication, disk persistence or
+QoS 2.
+"""
+
+import asyncio
+import struct
+import threading
+
+CONNECT = 1
+CONNACK = 2
+PUBLISH = 3
+PUBACK = 4
+SUBSCRIBE = 8
+SUBACK = 9
+UNSUBSCRIBE = 10
+UNSUBACK = 11
+PINGREQ = 12
+PINGRESP = 13
+DISCONNECT = 14
+
+
+def topic_matches(topic_filter, topic):
+    """Return True if an MQTT topic filter matches a topic"""
+    filter_parts = topic_filter.split('/')
+    topic_parts = topic.split('/')
+    for index, part in enumerate(filter_parts):
+        if part == '#':
+            return True
+        if index >= len(topic_parts):
+            return False
+        if part != '+' and part != topic_parts[index]:
+            return False
+    return len(filter_parts) == len(topic_parts)
+
+
+def _encode_length(length):
+    encoded = bytearray()
+    while True:
+        byte = length % 128
+        length //= 128
+        if length:
+            byte |= 0x80
+        encoded.append(byte)
+        if not length:
+            return bytes(encoded)
+
+
+def _encode_string(value):
+    return struct.pack('!H', len(value)) + value
+
+
+def _read_string(data, offset):
+    (length,) = struct.unpack_from('!H', data, offset)
+    offset += 2
+    return data[offset:offset + length], offset + length
+
+
+class _Session:
+    def __init__(self, broker, writer):
+        self.broker = broker
+        self.writer = writer
+        self.client_id = ''
+        self.clean_session = True
+        self.subscriptions = {}
+        self.will = None
+        self.next_packet_id = 1
+
+    def send(self, packet_type, flags, body):
+        self.writer.write(bytes([(packet_type << 4) | flags]) + _encode_length(len(body)) + body)
+
+    def deliver(self, topic, payload, qos, retain):
+        body = _encode_string(topic)
+        if qos:
+            body += struct.pack('!H', self.next_packet_id)
+            self.next_packet_id = self.next_packet_id % 0xFFFF + 1
+        self.send(PUBLISH, (qos << 1) | int(retain), body + payload)
+
+
+class Mini_Broker:
+    """
+    Loopback MQTT broker running on its own event loop thread
+    """
+    def __init__(self, host='127.0.0.1', port=0):
+        """
+        Initialize the broker
+
+        Args:
+            host (str): Address to bind
+            port (int): Port to bind, 0 picks a free port
+        """
+        self.host = host
+        self.port = port
+        self.sessions = set()
+        self.retained = {}
+        # client id -> (subscriptions, queued QoS 1 messages) of offline
+        # clients that connected without a clean session
+        self.offline_sessions = {}
+        self.published = 0
+        self.loop = None
+        self.server = None
+        self.thread = None
+        self._ready = threading.Event()
+
+    def start(self):
+        """Start the broker thread and wait until it is listening"""
+        self.thread = threading.Thread(target=self._run, name="mini-broker", daemon=True)
+        self.thread.start()
+        self._ready.wait()
+        return self
+
+    def stop(self):
+        """Stop the broker"""
+        if self.loop is not None:
+            asyncio.run_coroutine_threadsafe(self._shutdown(), self.loop).result()
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self.thread.join()
+
+    async def _shutdown(self):
+        # Let every client handler finish before the loop goes away
+        self.server.close()
+        for session in list(self.sessions):
+            session.writer.transport.abort()
+        current = asyncio.current_task()
+        await asyncio.gather(*(task for task in asyncio.all_tasks() if task is not current),
+                             return_exceptions=True)
+
+    def drop_clients(self):
+        """Close every client connection, as if the broker restarted"""
+        def drop():
+            for session in list(self.sessions):
+                session.writer.transport.abort()
+        self.loop.call_soon_threadsafe(drop)
+
+    def _run(self):
+        self.loop = asyncio.new_event_loop()
+        self.server = self.loop.run_until_complete(
+            asyncio.start_server(self._handle_client, self.host, self.port)
+        )
+        self.port = self.server.sockets[0].getsockname()[1]
+        self._ready.set()
+        try:
+            self.loop.run_forever()
+        finally:
+            self.server.close()
+            self.loop.close()
+
+    def route(self, topic, payload, qos, retain):
+        """Store retained messages and forward a publish to subscribers"""
+        self.published += 1
+        if retain:
+            if payload:
+                self.retained[topic] = (payload, qos)
+            else:
+                self.retained.pop(topic, None)
+        for session in self.sessions:
+            granted = None
+            for topic_filter, sub_qos in session.subscriptions.items():
+                if topic_matches(topic_filter, topic):
+                    granted = max(granted or 0, sub_qos)
+            if granted is not None:
+                session.deliver(topic.encode(), payload, min(qos, granted), False)
+        if qos:
+            for subscriptions, queued in self.offline_sessions.values():
+                if any(sub_qos and topic_matches(topic_filter, topic)
+                       for topic_filter, sub_qos in subscriptions.items()):
+                    queued.append((topic, payload))
+
+    async def _handle_client(self, reader, writer):
+        session = _Session(self, writer)
+        clean = False
+        try:
+            while True:
+                header = await reader.readexactly(1)
+                length = 0
+                multiplier = 1
+                while True:
+                    (byte,) = await reader.readexactly(1)
+                    length += (byte & 0x7F) * multiplier
+                    multiplier *= 128
+                    if not byte & 0x80:
+                        break
+                body = await reader.readexactly(length)
+                packet_type = header[0] >> 4
+                flags = header[0] & 0x0F
+
+                if packet_type == CONNECT:
+                    self._on_connect(session, body)
+                elif packet_type == PUBLISH:
+                    self._on_publish(session, flags, body)
+                elif packet_type == SUBSCRIBE:
+                    self._on_subscribe(session, body)
+                elif packet_type == UNSUBSCRIBE:
+                    self._on_unsubscribe(session, body)
+                elif packet_type == PINGREQ:
+                    session.send(PINGRESP, 0, b'')
+                elif packet_type == DISCONNECT:
+                    clean = True
+                    break
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            if session in self.sessions:
+                self.sessions.discard(session)
+                if not session.clean_session:
+                    self.offline_sessions[session.client_id] = (session.subscriptions, [])
+            if not clean and session.will is not None:
+                self.route(*session.will)
+            writer.close()
+
+    def _on_connect(self, session, body):
+        _protocol, offset = _read_string(body, 0)
+        offset += 1  # protocol level
+        connect_flags = body[offset]
+        offset += 3  # flags + keepalive
+        client_id, offset = _read_string(body, offset)
+        session.client_id = client_id.decode()
+        if connect_flags & 0x04:
+            will_topic, offset = _read_string(body, offset)
+            will_payload, offset = _read_string(body, offset)
+            will_qos = (connect_flags >> 3) & 0x03
+            will_retain = bool(connect_flags & 0x20)
+            session.will = (will_topic.decode(), will_payload, min(will_qos, 1), will_retain)
+        session.clean_session = bool(connect_flags & 0x02)
+        stored = self.offline_sessions.pop(session.client_id, None)
+        if session.clean_session or stored is None:
+            session.send(CONNACK, 0, b'\x00\x00')
+            queued = []
+        else:
+            session.subscriptions, queued = stored
+            session.send(CONNACK, 0, b'\x01\x00')
+        self.sessions.add(session)
+        for topic, payload in queued:
+            session.deliver(topic.encode(), payload, 1, False)
+
+    def _on_publish(self, session, flags, body):
+        qos = (flags >> 1) & 0x03
+        retain = bool(flags & 0x01)
+        topic, offset = _read_string(body, 0)
+        if qos:
+            packet_id = body[offset:offset + 2]
+            offset += 2
+            session.send(PUBACK, 0, packet_id)
+        self.route(topic.decode(), body[offset:], min(qos, 1), retain)
+
+    def _on_subscribe(self, session, body):
+        packet_id = body[:2]
+        offset = 2
+        granted = bytearray()
+        new_filters = []
+        while offset < len(body):
+            topic_filter, offset = _read_string(body, offset)
+            qos = min(body[offset], 1)
+            offset += 1
+            session.subscriptions[topic_filter.decode()] = qos
+            new_filters.append((topic_filter.decode(), qos))
+            granted.append(qos)
+        session.send(SUBACK, 0, packet_id + bytes(granted))
+        for topic, (payload, retained_qos) in self.retained.items():
+            for topic_filter, qos in new_filters:
+                if topic_matches(topic_filter, topic):
+                    session.deliver(topic.encode(), payload, min(qos, retained_qos), True)
+                    break
+
+    def _on_unsubscribe(self, session, body):
+        packet_id = body[:2]
+        offset = 2
+        while offset < len(body):
+            topic_filter, offset = _read_string(body, offset)
+            session.subscriptions.pop(topic_filter.decode(), None)
+        session.send(UNSUBACK, 0, packet_id)
+
+
+if __name__ == "__main__":
+    broker = Mini_Broker(port=1883).start()
+    print(f"Mini broker listening on {broker.host}:{broker.port}")
+    try:
+        broker.thread.join()
+    except KeyboardInterrupt:
+        broker.stop()
@@ -0,0 +1,449 @@
+#!/usr/bin/env python3
+"""
+Configuration for the garage opener
+
+config.yaml is parsed and validated once into an immutable Config_Snapshot.
+Config_Watcher polls the file and hands every new valid snapshot to a
+callback, so changes apply without restarting the daemon.
+"""
+
+import os
+import re
+import socket
+import threading
+
+from dotenv import load_dotenv
+from pyaml_env import parse_config
+
+from genie_wall_console_lib import DEFAULT_PULSE_DURATION, DEFAULT_PULSE_GAP
+from gpio_backend_lib import BACKENDS
+from log_lib import (
+    COMPONENTS as LOG_COMPONENTS, DEFAULT_FORMAT as DEFAULT_LOG_FORMAT, DEFAULT_LEVEL as DEFAULT_LOG_LEVEL,
+    DEFAULT_QUEUE_SIZE as DEFAULT_LOG_QUEUE_SIZE, FORMATS as LOG_FORMATS, LEVELS as LOG_LEVELS, get_logger,
+)
+
+DEFAULT_PORT = 1883
+# The broker sends the Last Will after 1.5 keepalives without a packet
+DEFAULT_KEEPALIVE = 15
+DEFAULT_HEARTBEAT_INTERVAL = 10.0
+DEFAULT_BOUNCE_TIME = 0.05
+DEFAULT_RECONNECT_MIN_DELAY = 1.0
+DEFAULT_RECONNECT_MAX_DELAY = 60.0
+DEFAULT_OUTBOX_SIZE = 100
+DEFAULT_METRICS_HOST = '127.0.0.1'
+DEFAULT_METRICS_PORT = 9464
+DEFAULT_METRICS_INTERVAL = 60.0
+
+# BCM numbering of the GPIO pins on the 40-pin header
+MAX_GPIO_PIN = 27
+
+# Door ids and versions become MQTT topic levels and unique ids
+_DOOR_ID = re.compile(r'^[A-Za-z0-9_-]+$')
+
+LOGGER = get_logger('config')
+
+
+class Config_Error(ValueError):
+    """
+    Raised when config.yaml is missing or invalid
+    """
+
+
+class _Frozen:
+    """
+    Base for immutable __slots__ records
+    """
+    __slots__ = ()
+
+    def __init__(self, **fields):
+        for name in self.__slots__:
+            object.__setattr__(self, name, fields[name])
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __eq__(self, other):
+        return type(self) is type(other) and all(
+            getattr(self, name) == getattr(other, name) for name in self.__slots__
+        )
+
+    def __hash__(self):
+        return hash(tuple(getattr(self, name) for name in self.__slots__))
+
+    def __repr__(self):
+        fields = ", ".join(f"{name}={getattr(self, name)!r}" for name in self.__slots__)
+        return f"{type(self).__name__}({fields})"
+
+
+class MQTT_Settings(_Frozen):
+    """
+    Broker connection settings
+    """
+    __slots__ = (
+        'broker', 'port', 'username', 'password', 'keepalive', 'client_id',
+        'reconnect_min_delay', 'reconnect_max_delay', 'outbox_size', 'heartbeat_interval',
+    )
+
+
+class Metrics_Settings(_Frozen):
+    """
+    Prometheus endpoint and MQTT metrics topic settings
+    """
+    __slots__ = ('host', 'port', 'interval')
+
+
+class Control_Settings(_Frozen):
+    """
+    Local control socket settings
+    """
+    __slots__ = ('socket',)
+
+
+class Logging_Settings(_Frozen):
+    """
+    Log levels, output format and queue size
+
+    levels holds (component, level) pairs overriding the level per logger.
+    """
+    __slots__ = ('level', 'format', 'queue_size', 'levels')
+
+
+class Door_Config(_Frozen):
+    """
+    Settings for a single garage door
+    """
+    __slots__ = (
+        'id', 'version', 'garage_door_pin', 'door_sensor_pin', 'door_sensor_bounce_time',
+        'pulse_duration', 'pulse_gap',
+    )
+
+
+class Config_Snapshot(_Frozen):
+    """
+    Validated, immutable view of config.yaml
+    """
+    __slots__ = (
+        'path', 'mtime_ns', 'mqtt', 'metrics', 'control', 'logging', 'version', 'gpio_backend', 'devices',
+    )
+
+
+def _require(node, key, kind, where, default=None, required=True):
+    value = node.get(key) if isinstance(node, dict) else None
+    if value is None:
+        if required and default is None:
+            raise Config_Error(f"{where}.{key} is required")
+        return default
+    if kind is int and isinstance(value, bool) or not isinstance(value, kind):
+        raise Config_Error(f"{where}.{key} must be {getattr(kind, '__name__', kind)}, got {value!r}")
+    return value
+
+
+def _parse_mqtt(node):
+    if not isinstance(node, dict):
+        raise Config_Error("mqtt section is required")
+    port = _require(node, 'port', int, 'mqtt', DEFAULT_PORT)
+    if not 0 < port < 65536:
+        raise Config_Error(f"mqtt.port must be between 1 and 65535, got {port}")
+    keepalive = _require(node, 'keepalive', int, 'mqtt', DEFAULT_KEEPALIVE)
+    if keepalive <= 0:
+        raise Config_Error(f"mqtt.keepalive must be positive, got {keepalive}")
+    min_delay = float(_require(node, 'reconnect_min_delay', (int, float), 'mqtt', DEFAULT_RECONNECT_MIN_DELAY))
+    max_delay = float(_require(node, 'reconnect_max_delay', (int, float), 'mqtt', DEFAULT_RECONNECT_MAX_DELAY))
+    if not 0 < min_delay <= max_delay:
+        raise Config_Error("mqtt.reconnect_min_delay must be positive and not above mqtt.reconnect_max_delay")
+    outbox_size = _require(node, 'outbox_size', int, 'mqtt', DEFAULT_OUTBOX_SIZE)
+    if outbox_size <= 0:
+        raise Config_Error(f"mqtt.outbox_size must be positive, got {outbox_size}")
+    heartbeat_interval = float(_require(node, 'heartbeat_interval', (int, float), 'mqtt', DEFAULT_HEARTBEAT_INTERVAL))
+    if heartbeat_interval < 0:
+        raise Config_Error(f"mqtt.heartbeat_interval must not be negative, got {heartbeat_interval}")
+    return MQTT_Settings(
+        broker=str(_require(node, 'broker', (str, int), 'mqtt')),
+        port=port,
+        username=_require(node, 'username', str, 'mqtt', required=False),
+        password=_require(node, 'password', (str, int), 'mqtt', required=False),
+        keepalive=keepalive,
+        # The broker keeps the session of this id while the Pi is offline
+        client_id=str(_require(node, 'client_id', (str, int), 'mqtt', f"genie_garage_opener-{socket.gethostname()}")),
+        reconnect_min_delay=min_delay,
+        reconnect_max_delay=max_delay,
+        outbox_size=outbox_size,
+        heartbeat_interval=heartbeat_interval,
+    )
+
+
+def _parse_metrics(node):
+    if node is not None and not isinstance(node, dict):
+        raise Config_Error("metrics must be a mapping")
+    node = node or {}
+    port = _require(node, 'port', int, 'metrics', DEFAULT_METRICS_PORT)
+    if not 0 <= port < 65536:
+        raise Config_Error(f"metrics.port must be between 0 and 65535, got {port}")
+    interval = float(_require(node, 'interval', (int, float), 'metrics', DEFAULT_METRICS_INTERVAL))
+    if interval < 0:
+        raise Config_Error(f"metrics.interval must not be negative, got {interval}")
+    return Metrics_Settings(
+        host=str(_require(node, 'host', str, 'metrics', DEFAULT_METRICS_HOST)),
+        port=port,
+        interval=interval,
+    )
+
+
+def _parse_control(node, path):
+    if node is not None and not isinstance(node, dict):
+        raise Config_Error("control must be a mapping")
+    socket_path = _require(node or {}, 'socket', str, 'control', required=False)
+    if socket_path:
+        # Relative to the directory of config.yaml
+        socket_path = os.path.join(os.path.dirname(os.path.abspath(path)), socket_path)
+    return Control_Settings(socket=socket_path or None)
+
+
+def _parse_log_level(node, key, where):
+    level = _require(node, key, str, where, DEFAULT_LOG_LEVEL).lower()
+    if level not in LOG_LEVELS:
+        raise Config_Error(f"{where}.{key} must be one of {list(LOG_LEVELS)}, got {level!r}")
+    return level
+
+
+def _parse_logging(node):
+    if node is not None and not isinstance(node, dict):
+        raise Config_Error("logging must be a mapping")
+    node = node or {}
+    output_format = _require(node, 'format', str, 'logging', DEFAULT_LOG_FORMAT)
+    if output_format not in LOG_FORMATS:
+        raise Config_Error(f"logging.format must be one of {list(LOG_FORMATS)}, got {output_format!r}")
+    queue_size = _require(node, 'queue_size', int, 'logging', DEFAULT_LOG_QUEUE_SIZE)
+    if queue_size <= 0:
+        raise Config_Error(f"logging.queue_size must be positive, got {queue_size}")
+    overrides = node.get('levels') or {}
+    if not isinstance(overrides, dict):
+        raise Config_Error("logging.levels must be a mapping of component to level")
+    for component in overrides:
+        if component not in LOG_COMPONENTS:
+            raise Config_Error(f"logging.levels keys must be among {list(LOG_COMPONENTS)}, got {component!r}")
+    return Logging_Settings(
+        level=_parse_log_level(node, 'level', 'logging'),
+        format=output_format,
+        queue_size=queue_size,
+        levels=tuple(sorted(
+            (component, _parse_log_level(overrides, component, 'logging.levels')) for component in overrides
+        )),
+    )
+
+
+def _parse_version(node, where, default):
+    version = _require(node, 'version', (str, int), where, default)
+    if not _DOOR_ID.match(str(version)):
+        raise Config_Error(f"{where}.version may only contain letters, digits, '_' and '-', got {version!r}")
+    return version
+
+
+def _parse_pin(entry, key, where, required=True):
+    pin = _require(entry, key, int, where, required=required)
+    if pin is not None and not 0 <= pin <= MAX_GPIO_PIN:
+        raise Config_Error(f"{where}.{key} must be a GPIO pin between 0 and {MAX_GPIO_PIN}, got {pin}")
+    return pin
+
+
+def _parse_door(entry, where, version):
+    door_id = str(_require(entry, 'id', (str, int), where))
+    if not _DOOR_ID.match(door_id):
+        raise Config_Error(f"{where}.id may only contain letters, digits, '_' and '-', got {door_id!r}")
+    bounce_time = float(_require(entry, 'door_sensor_bounce_time', (int, float), where, DEFAULT_BOUNCE_TIME))
+    if bounce_time < 0:
+        raise Config_Error(f"{where}.door_sensor_bounce_time must not be negative")
+    pulse_duration = float(_require(entry, 'pulse_duration', (int, float), where, DEFAULT_PULSE_DURATION))
+    if not 0 < pulse_duration <= 10:
+        raise Config_Error(f"{where}.pulse_duration must be above 0 and at most 10 seconds, got {pulse_duration}")
+    pulse_gap = float(_require(entry, 'pulse_gap', (int, float), where, DEFAULT_PULSE_GAP))
+    if pulse_gap < 0:
+        raise Config_Error(f"{where}.pulse_gap must not be negative, got {pulse_gap}")
+    return Door_Config(
+        id=door_id,
+        version=_parse_version(entry, where, version),
+        garage_door_pin=_parse_pin(entry, 'garage_door_pin', where),
+        door_sensor_pin=_parse_pin(entry, 'door_sensor_pin', where, required=False),
+        door_sensor_bounce_time=bounce_time,
+        pulse_duration=pulse_duration,
+        pulse_gap=pulse_gap,
+    )
+
+
+def parse_snapshot(config, path='', mtime_ns=0):
+    """
+    Validate a parsed config.yaml document
+
+    Args:
+        config (dict): Parsed YAML document
+        path (str): File the document came from
+        mtime_ns (int): Modification time of that file
+
+    Returns:
+        Config_Snapshot: The validated configuration
+
+    Raises:
+        Config_Error: If a required value is missing or invalid
+    """
+    if not isinstance(config, dict):
+        raise Config_Error("config must be a YAML mapping")
+
+    device = config.get('device') or {}
+    gpio = config.get('gpio') or {}
+    version = _parse_version(device, 'device', 1)
+
+    gpio_backend = gpio.get('backend') or None
+    if gpio_backend is not None and gpio_backend not in BACKENDS:
+        raise Config_Error(f"gpio.backend must be one of {sorted(BACKENDS)}, got {gpio_backend!r}")
+
+    entries = config.get('devices')
+    if entries is None:
+        # Legacy single door layout
+        entries = [{
+            'id': device.get('id'),
+            'garage_door_pin': gpio.get('garage_door_pin'),
+        }]
+        where = 'device/gpio'
+    elif not isinstance(entries, list) or not entries:
+        raise Config_Error("devices must be a non-empty list")
+    else:
+        where = 'devices'
+
+    devices = tuple(
+        _parse_door(entry if isinstance(entry, dict) else {}, f"{where}[{index}]", version)
+        for index, entry in enumerate(entries)
+    )
+
+    ids = [door_config.id for door_config in devices]
+    if len(set(ids)) != len(ids):
+        raise Config_Error(f"device ids must be unique, got {ids}")
+    pins = [door_config.garage_door_pin for door_config in devices]
+    pins += [door_config.door_sensor_pin for door_config in devices if door_config.door_sensor_pin is not None]
+    if len(set(pins)) != len(pins):
+        raise Config_Error(f"GPIO pins must not be shared between doors or sensors, got {pins}")
+
+    return Config_Snapshot(
+        path=path,
+        mtime_ns=mtime_ns,
+        mqtt=_parse_mqtt(config.get('mqtt')),
+        metrics=_parse_metrics(config.get('metrics')),
+        control=_parse_control(config.get('control'), path),
+        logging=_parse_logging(config.get('logging')),
+        version=version,
+        gpio_backend=gpio_backend,
+        devices=devices,
+    )
+
+
+def resolve_config_path(config_file=None):
+    """
+    Return the config file path
+
+    Args:
+        config_file (str): Path, relative paths are resolved against src/.
+            Defaults to the genie_config_file environment variable, then
+            ./config.yaml.
+    """
+    config_file = config_file or os.environ.get('genie_config_file', './config.yaml')
+    return os.path.join(os.path.dirname(os.path.abspath(__file__)), config_file)
+
+
+def load_snapshot(config_file=None):
+    """
+    Load and validate config.yaml
+
+    Environment variables from src/.env are loaded first so that !ENV tags
+    resolve.
+
+    Args:
+        config_file (str): See resolve_config_path
+
+    Returns:
+        Config_Snapshot: The validated configuration
+
+    Raises:
+        Config_Error: If the file is missing, unreadable or invalid
+    """
+    load_dotenv(os.path.join(os.path.dirname(os.path.abspath(__file__)), '.env'))
+    path = resolve_config_path(config_file)
+    try:
+        mtime_ns = os.stat(path).st_mtime_ns
+        config = parse_config(path)
+    except FileNotFoundError:
+        raise Config_Error(f"Config file not found: {path}")
+    except Exception as e:
+        raise Config_Error(f"Error parsing YAML config {path}: {e}")
+    return parse_snapshot(config, path, mtime_ns)
+
+
+def _with_mtime(snapshot, mtime_ns):
+    """Return the same snapshot stamped with a new file modification time"""
+    fields = {name: getattr(snapshot, name) for name in Config_Snapshot.__slots__}
+    fields['mtime_ns'] = mtime_ns
+    return Config_Snapshot(**fields)
+
+
+class Config_Watcher:
+    """
+    Poll config.yaml and swap in new snapshots
+
+    The current snapshot is a single attribute, so readers always see either
+    the old or the new configuration, never a mix. Invalid edits are reported
+    and ignored; the previous snapshot stays active.
+    """
+    def __init__(self, snapshot, on_change, interval=2.0):
+        """
+        Args:
+            snapshot (Config_Snapshot): The snapshot loaded at startup
+            on_change (callable): Called with (old, new) after each swap
+            interval (float): Seconds between file checks
+        """
+        self.snapshot = snapshot
+        self.on_change = on_change
+        self.interval = interval
+        self._stop = threading.Event()
+        self.thread = threading.Thread(target=self._run, name="config-watcher", daemon=True)
+
+    def start(self):
+        """Start watching the file"""
+        self.thread.start()
+
+    def stop(self):
+        """Stop watching the file"""
+        self._stop.set()
+        if self.thread.is_alive():
+            self.thread.join()
+
+    def check(self):
+        """
+        Reload the file if it changed
+
+        Returns:
+            bool: True if a new snapshot was swapped in
+        """
+        try:
+            mtime_ns = os.stat(self.snapshot.path).st_mtime_ns
+        except OSError as e:
+            LOGGER.warning("Cannot read config: %s", e, extra={'path': self.snapshot.path})
+            return False
+        if mtime_ns == self.snapshot.mtime_ns:
+            return False
+        try:
+            snapshot = load_snapshot(self.snapshot.path)
+        except Config_Error as e:
+            LOGGER.error("Keeping previous config, new one is invalid: %s", e, extra={'path': self.snapshot.path})
+            # Do not retry the same broken file on every poll
+            self.snapshot = _with_mtime(self.snapshot, mtime_ns)
+            return False
+        old, self.snapshot = self.snapshot, snapshot
+        LOGGER.info("Config reloaded", extra={'path': snapshot.path})
+        self.on_change(old, snapshot)
+        return True
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.check()
+            except Exception as e:
+                LOGGER.error("Error applying config: %s", e)
+
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Local control socket for the garage opener
+
+Other processes on the Pi (a button bridge, a cron job, a shell) trigger
+doors through a Unix socket instead of the MQTT broker. Commands go into the
+same pulse path as MQTT commands, so they keep working while the broker is
+unreachable.
+
+The protocol is line based, one command per line, one reply line each:
+
+    trigger <door id>   ->  ok | error unknown door <door id>
+    list                ->  ok <door id> <door id> ...
+    ping                ->  ok
+"""
+
+import os
+import socket
+import socketserver
+import stat
+import threading
+
+# Group members of the daemon's user may trigger doors
+SOCKET_MODE = 0o660
+
+
+class Control_Server:
+    """
+    Serve the control protocol on a Unix socket from a background thread
+    """
+    def __init__(self, path, on_trigger, list_doors):
+        """
+        Args:
+            path (str): Socket file to create, a stale one is replaced
+            on_trigger (callable): Called with a door id, returns False if
+                the door is unknown
+            list_doors (callable): Returns the configured door ids
+        """
+        self.path = path
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                for line in self.rfile:
+                    reply = handle_command(line.decode(errors='replace').split())
+                    self.wfile.write(reply.encode() + b"\n")
+
+        def handle_command(words):
+            if not words:
+                return "error empty command"
+            command, args = words[0], words[1:]
+            if command == 'trigger' and len(args) == 1:
+                if on_trigger(args[0]):
+                    return "ok"
+                return f"error unknown door {args[0]}"
+            if command == 'list' and not args:
+                return " ".join(["ok", *list_doors()])
+            if command == 'ping' and not args:
+                return "ok"
+            return f"error unknown command {' '.join(words)}"
+
+        _remove_stale_socket(path)
+        self.server = socketserver.ThreadingUnixStreamServer(path, Handler)
+        self.server.daemon_threads = True
+        os.chmod(path, SOCKET_MODE)
+        self.thread = threading.Thread(target=self.server.serve_forever, name="control-server", daemon=True)
+
+    def start(self):
+        """Start serving"""
+        self.thread.start()
+
+    def stop(self):
+        """Stop serving and remove the socket file"""
+        if self.thread.is_alive():
+            self.server.shutdown()
+        self.server.server_close()
+        _remove_stale_socket(self.path)
+
+
+class Control_Client:
+    """
+    Send commands to a running daemon over one persistent connection
+    """
+    def __init__(self, path, timeout=5.0):
+        """
+        Args:
+            path (str): Socket file of the daemon
+            timeout (float): Seconds to wait for a reply
+        """
+        self.socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.socket.settimeout(timeout)
+        self.socket.connect(path)
+        self.reader = self.socket.makefile('rb')
+
+    def command(self, line):
+        """
+        Send one command
+
+        Returns:
+            str: The reply line, without the newline
+        """
+        self.socket.sendall(line.encode() + b"\n")
+        return self.reader.readline().decode().rstrip("\n")
+
+    def trigger(self, door_id):
+        """
+        Trigger a door
+
+        Returns:
+            bool: True if the daemon accepted the command
+        """
+        return self.command(f"trigger {door_id}") == "ok"
+
+    def close(self):
+        self.reader.close()
+        self.socket.close()
+
+
+def _remove_stale_socket(path):
+    """Remove a socket file left behind by a previous run"""
+    try:
+        if stat.S_ISSOCK(os.stat(path).st_mode):
+            os.unlink(path)
+    except FileNotFoundError:
+        pass
@@ -3,40 +3,101 @@
 GPIO Utility Library for Series II Wall Push Console Button 34299R
 """
 
-from gpiozero import DigitalOutputDevice
-import time
+from gpio_backend_lib import GPIO_Backend, Mock_Pin_Backend, create_backend
+from log_lib import get_logger
+
+LOGGER = get_logger('door')
+
+DEFAULT_PULSE_DURATION = 1.0  # seconds
+DEFAULT_PULSE_GAP = 0.5  # seconds
 
 
 class Genie_Garage_Device:
-    def __init__(self, giopin: DigitalOutputDevice):
+    def __init__(self, giopin: int, backend: GPIO_Backend = None,
+                 pulse_duration=DEFAULT_PULSE_DURATION, pulse_gap=DEFAULT_PULSE_GAP):
         self.pin = giopin
+        self.backend = backend
         self.output_def = "Garage Door Opener"
-        self.delay = 1  # seconds
+        self.delay = pulse_duration  # seconds the button is held
+        self.pulse_gap = pulse_gap  # seconds released before the next press
         self.current_state = "OFF"
+        self.last_pulse_width = None  # seconds, measured on the backend clock
+        self._pulse_started = None
+        self.led = None
+        self.sensor = None
+        self.sensor_pin = None
+        self.on_state_change = None
 
     def initialize_GPIO(self):
         # Try to initialize GPIO, fallback to simulation if not on Pi
+        if self.backend is None:
+            self.backend = create_backend()
         try:
-            from gpiozero import LED
-            print(f"Setting {self.pin} GPIO as output for Garage Opener...")
-            self.led = LED(self.pin,active_high= False)
-            self.SIMULATION_MODE = False
-            print("Garage Opener GPIO initialized successfully")
+            LOGGER.info("Setting GPIO as output for Garage Opener", extra={'pin': self.pin, 'backend': self.backend.name})
+            self.led = self.backend.output(self.pin)
         except Exception as e:
-            print(f"Garage Opener GPIO failed: {e}")
-            print("Running in SIMULATION MODE - no actual GPIO control")
-            self.led = None
-            self.SIMULATION_MODE = True        
+            LOGGER.warning("Garage Opener GPIO failed, running in SIMULATION MODE - no actual GPIO control: %s", e,
+                           extra={'pin': self.pin})
+            self.backend = Mock_Pin_Backend()
+            self.led = self.backend.output(self.pin)
+        self.SIMULATION_MODE = self.backend.simulated
+
+    def initialize_sensor(self, sensor_pin: int, bounce_time: float, on_state_change=None):
+        """
+        Read the door state from a reed switch wired between the pin and GND
+
+        The reed switch is closed (input active) while the door is closed.
+        Edges are delivered by interrupt callbacks, debounced by bounce_time.
+
+        Args:
+            sensor_pin (int): GPIO pin of the reed switch
+            bounce_time (float): Debounce window in seconds
+            on_state_change (callable): Called with this device on every change
+        """
+        self.on_state_change = on_state_change
+        self.sensor_pin = sensor_pin
+        LOGGER.info("Setting GPIO as door sensor input", extra={'pin': sensor_pin})
+        self.sensor = self.backend.input(sensor_pin, self._sensor_changed, bounce_time)
+        self.current_state = "OFF" if self.sensor.is_active else "ON"
+
+    def _sensor_changed(self, door_closed):
+        self.current_state = "OFF" if door_closed else "ON"
+        LOGGER.info("%s sensor: %s", self.output_def, 'closed' if door_closed else 'open', extra={'pin': self.sensor_pin})
+        if self.on_state_change is not None:
+            self.on_state_change(self)
+
+    def close(self):
+        """Release the relay and sensor pins"""
+        for pin in (self.led, self.sensor):
+            if pin is not None:
+                pin.close()
+        self.sensor = None
+
+    def start_pulse(self):
+        """
+        Press the button without waiting for the pulse to end
+
+        Returns:
+            float: Backend time at which end_pulse() should be called
+        """
+        self._pulse_started = self.backend.monotonic()
+        self.led.on()
+        LOGGER.debug("%s event started", self.output_def, extra={'pin': self.pin, 'simulated': self.SIMULATION_MODE})
+        return self._pulse_started + self.delay
+
+    def end_pulse(self):
+        """Release the button and measure how long it was held"""
+        self.led.off()
+        if self._pulse_started is None:
+            return
+        self.last_pulse_width = self.backend.monotonic() - self._pulse_started
+        self._pulse_started = None
+        LOGGER.info("%s event completed", self.output_def, extra={
+            'pin': self.pin, 'simulated': self.SIMULATION_MODE, 'pulse_ms': round(self.last_pulse_width * 1000, 3),
+        })
 
     def door_up_down(self):
-        if self.SIMULATION_MODE:
-            print(f"SIMULATION: {self.output_def} event started")
-            time.sleep(self.delay)
-            print(f"SIMULATION: {self.output_def} event completed")
-        else:
-            print(f"{self.output_def} event started")
-            self.led.on()
-            time.sleep(self.delay)
-            self.led.off()
-            print(f"{self.output_def} event completed")
-        self.currentState = "OFF"
+        """Press the button for the pulse duration, blocking until released"""
+        release_at = self.start_pulse()
+        self.backend.sleep(max(0.0, release_at - self.backend.monotonic()))
+        self.end_pulse()
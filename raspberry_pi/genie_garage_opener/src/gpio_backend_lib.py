@@ -0,0 +1,307 @@
+#!/usr/bin/env python3
+"""
+GPIO backends for the garage opener
+
+A backend hands out output pins, edge-triggered input pins and owns the
+clock used to time pulses:
+- Gpiozero_Backend: real GPIO through gpiozero, wall clock
+- Mock_Pin_Backend: in-memory pins, wall clock
+- Simulation_Backend: in-memory pins driven by a Virtual_Clock, so pulses
+  take no wall-clock time and their timings are exact
+"""
+
+import queue
+import threading
+import time
+from abc import ABC, abstractmethod
+
+from log_lib import get_logger
+
+LOGGER = get_logger('gpio')
+
+# Timed waits overshoot by up to about a millisecond; the last stretch
+# before a pulse deadline is spun instead
+SPIN_MARGIN = 0.002
+
+
+class Pulse_Record:
+    """
+    One recorded output pulse
+    """
+    __slots__ = ('pin', 'start', 'end')
+
+    def __init__(self, pin, start, end):
+        self.pin = pin
+        self.start = start
+        self.end = end
+
+    @property
+    def width(self):
+        return self.end - self.start
+
+
+class Wall_Clock:
+    """
+    Clock for timing pulses on time.monotonic()
+    """
+    def monotonic(self):
+        """Return the backend clock in seconds"""
+        return time.monotonic()
+
+    def sleep(self, seconds):
+        """Wait on the backend clock"""
+        time.sleep(seconds)
+
+    def wait(self, commands, timeout):
+        """
+        Wait on the backend clock for an item of a queue
+
+        Args:
+            commands (queue.Queue): Queue to take the item from
+            timeout (float): Seconds to wait, None to wait forever
+
+        Raises:
+            queue.Empty: If no item arrived within the timeout
+        """
+        if timeout is None:
+            return commands.get()
+        deadline = time.monotonic() + timeout
+        if timeout > SPIN_MARGIN:
+            try:
+                return commands.get(timeout=timeout - SPIN_MARGIN)
+            except queue.Empty:
+                pass
+        while time.monotonic() < deadline:
+            try:
+                return commands.get_nowait()
+            except queue.Empty:
+                # Let the other threads run while spinning
+                time.sleep(0)
+        raise queue.Empty
+
+
+class GPIO_Backend(Wall_Clock, ABC):
+    """
+    Interface implemented by every GPIO backend, timed on the wall clock
+    unless a backend overrides the Wall_Clock methods
+
+    output() and input() are abstract, so a backend missing either fails
+    when it is created rather than on its first pulse.
+    """
+    name = "base"
+    simulated = False
+
+    @abstractmethod
+    def output(self, pin):
+        """
+        Return an output device for a pin
+
+        Args:
+            pin (int): GPIO pin number
+
+        Returns:
+            An object with on() and off() methods
+        """
+
+    @abstractmethod
+    def input(self, pin, on_change, bounce_time=None):
+        """
+        Return an edge-triggered input for a pin wired to ground (pull-up)
+
+        Args:
+            pin (int): GPIO pin number
+            on_change (callable): Called with True when the input becomes
+                active (pulled low) and False when it is released
+            bounce_time (float): Seconds to ignore further edges after one
+
+        Returns:
+            An object with an is_active property
+        """
+
+    def close(self):
+        """Release any pins held by the backend"""
+
+
+class Gpiozero_Backend(GPIO_Backend):
+    """
+    Real GPIO through gpiozero (relay inputs are active low)
+
+    The backend keeps no reference to the devices it creates, whoever asked
+    for a pin closes it, so doors dropped on a config reload release theirs.
+    """
+    name = "gpiozero"
+
+    def __init__(self):
+        from gpiozero import LED
+        self._led_class = LED
+
+    def output(self, pin):
+        return self._led_class(pin, active_high=False)
+
+    def input(self, pin, on_change, bounce_time=None):
+        from gpiozero import Button
+        button = Button(pin, pull_up=True, bounce_time=bounce_time)
+        # Edge callbacks run on gpiozero's interrupt thread
+        button.when_pressed = lambda: on_change(True)
+        button.when_released = lambda: on_change(False)
+        return button
+
+
+class Mock_Pin:
+    """
+    In-memory output pin that records its pulses
+    """
+    def __init__(self, pin, backend):
+        self.pin = pin
+        self.backend = backend
+        self.is_active = False
+        self._since = None
+
+    def on(self):
+        if not self.is_active:
+            self.is_active = True
+            self._since = self.backend.monotonic()
+
+    def off(self):
+        if self.is_active:
+            self.is_active = False
+            self.backend.record(Pulse_Record(self.pin, self._since, self.backend.monotonic()))
+
+    def close(self):
+        self.off()
+
+
+class Mock_Input:
+    """
+    In-memory input pin with software debounce
+
+    Call drive() to simulate the pin changing level.
+    """
+    def __init__(self, pin, backend, on_change, bounce_time):
+        self.pin = pin
+        self.backend = backend
+        self.on_change = on_change
+        self.bounce_time = bounce_time or 0
+        self.is_active = False
+        self._last_edge = None
+
+    def drive(self, active):
+        """Set the pin level, firing on_change for an accepted edge"""
+        active = bool(active)
+        if active == self.is_active:
+            return
+        now = self.backend.monotonic()
+        if self._last_edge is not None and now - self._last_edge < self.bounce_time:
+            return
+        self._last_edge = now
+        self.is_active = active
+        self.on_change(active)
+
+    def close(self):
+        self.on_change = lambda active: None
+
+
+class Mock_Pin_Backend(GPIO_Backend):
+    """
+    In-memory pins on the wall clock, for running without GPIO hardware
+    """
+    name = "mock"
+    simulated = True
+
+    def __init__(self, max_records=10000):
+        """
+        Args:
+            max_records (int): Pulse records kept, oldest are dropped first
+        """
+        self.max_records = max_records
+        self.pulses = []
+        self._lock = threading.Lock()
+
+    def output(self, pin):
+        return Mock_Pin(pin, self)
+
+    def input(self, pin, on_change, bounce_time=None):
+        return Mock_Input(pin, self, on_change, bounce_time)
+
+    def record(self, pulse):
+        with self._lock:
+            self.pulses.append(pulse)
+            if len(self.pulses) > self.max_records:
+                del self.pulses[:len(self.pulses) - self.max_records]
+
+
+class Virtual_Clock:
+    """
+    Monotonic clock that only moves when told to
+    """
+    def __init__(self, start=0.0):
+        self._now = start
+        self._lock = threading.Lock()
+
+    def monotonic(self):
+        return self._now
+
+    def advance(self, seconds):
+        with self._lock:
+            self._now += seconds
+            return self._now
+
+
+class Simulation_Backend(Mock_Pin_Backend):
+    """
+    In-memory pins driven by a Virtual_Clock
+
+    sleep() advances the virtual clock instead of blocking, so thousands of
+    pulses per second can be generated while every pulse width stays exact.
+    """
+    name = "simulation"
+
+    def __init__(self, clock=None, max_records=10000):
+        super().__init__(max_records)
+        self.clock = clock or Virtual_Clock()
+
+    def monotonic(self):
+        return self.clock.monotonic()
+
+    def sleep(self, seconds):
+        self.clock.advance(seconds)
+
+    def wait(self, commands, timeout):
+        # Nothing else happens on the virtual clock, jump to the deadline
+        # unless an item is already waiting
+        if timeout is None:
+            return commands.get()
+        try:
+            return commands.get_nowait()
+        except queue.Empty:
+            self.clock.advance(timeout)
+            raise
+
+
+BACKENDS = {
+    Gpiozero_Backend.name: Gpiozero_Backend,
+    Mock_Pin_Backend.name: Mock_Pin_Backend,
+    Simulation_Backend.name: Simulation_Backend,
+}
+
+
+def create_backend(name=None):
+    """
+    Create a GPIO backend by name
+
+    Args:
+        name (str): 'gpiozero', 'mock' or 'simulation'. When empty, gpiozero
+            is used if it can be imported, otherwise the mock backend.
+
+    Returns:
+        GPIO_Backend: The backend instance
+    """
+    if name:
+        if name not in BACKENDS:
+            raise ValueError(f"Unknown GPIO backend '{name}', expected one of {sorted(BACKENDS)}")
+        return BACKENDS[name]()
+    try:
+        return Gpiozero_Backend()
+    except ImportError as e:
+        LOGGER.warning("gpiozero unavailable, using the mock backend: %s", e)
+        return Mock_Pin_Backend()
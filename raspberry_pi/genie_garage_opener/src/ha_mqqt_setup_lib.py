@@ -3,86 +3,65 @@
 Home assitant and MQTT Configuration
 """
 
-import os
+import hashlib
 import json
-from pyaml_env import parse_config
-from dotenv import load_dotenv
+import math
+import os
+import threading
 
-class YamlConfigLoader:
-    """
-    Load configuration from YAML file
-    """
-    def __init__(self, config_file='./config.yaml'):
-        self.config_file = config_file
-        self.config = None
-        # Load environment variables from .env file
-        env_path = os.path.join(os.path.dirname(__file__), '.env')
-        load_dotenv(env_path)
-
-    def load_config(self):
-        """
-        Load configuration from YAML file
-        
-        Args:
-            config_file (str): Name of the config file (defaults to 'config.yaml')
-        
-        Returns:
-            dict: Loaded configuration
-        """
-        if self.config is None:
-            config_path = os.path.join(os.path.dirname(__file__), self.config_file)
-            try:
-                print(f"Loading config from: {config_path}")
-                # parse_config expects a file path, not a file object
-                self.config = parse_config(config_path)
-                print("Config loaded successfully")
-            except FileNotFoundError:
-                print(f"Config file not found: {config_path}")
-                raise
-            except Exception as e:
-                print(f"Error parsing YAML config: {e}")
-                raise
-        return self.config
-
-    def get_value(self, nodename, fieldname):
-        """
-        Get configuration value by nodename and fieldname
-        
-        Args:
-            nodename (str): The top-level node name (e.g., 'mqtt', 'device', 'gpio')
-            fieldname (str): The field name within the node (e.g., 'broker', 'username', 'pin')
-        
-        Returns:
-            The configuration value if found, None if not found
-        """
-        try:
-            config = self.load_config()
-            return config[nodename][fieldname]
-        except KeyError as e:
-            print(f"Configuration key not found: {e}")
-            return None    
+from log_lib import get_logger
+
+LOGGER = get_logger('discovery')
+
+# Switch states as published on the state topic
+STATE_PAYLOADS = {"ON": b"ON", "OFF": b"OFF"}
+# Payloads of the availability topic, Home Assistant's defaults
+PAYLOAD_ONLINE = b"online"
+PAYLOAD_OFFLINE = b"offline"
+
+
+def pi_device(node_id: str):
+    """Return the discovery device representing this Pi"""
+    return {
+        "identifiers": [node_id],
+        "name": f"Genie Garage Opener {node_id}",
+        "model": "ggo_daemon",
+        "manufacturer": "Jagel"
+    }
 
-# Global config variable to store loaded configuration
 
 class HA_MQTT_Config:
-    def __init__(self, device_id: str, version: str):
+    # Single subscription covering the command topic of every switch
+    command_wildcard = "homeassistant/switch/+/set"
+    # Home Assistant publishes "online" here when it (re)starts
+    status_topic = "homeassistant/status"
+
+    def __init__(self, device_id: str, version: str, availability_topic: str = None):
         """
         Initialize HA MQTT configuration
+
+        Topics and the discovery payload are built once here, so connecting
+        and publishing never serialize anything.
+
         Args:
             device_id (str): Unique device identifier
             version (str): Device version
+            availability_topic (str): Topic of the daemon's online/offline
+                payloads, the switch is always available when omitted
         """
         self.device_id = device_id
         self.device_name = "Genie Garage Opener"
         self.version = version
+        self.availability_topic = availability_topic
         self.unique_identifier = f"ggo_v{self.version}"
         self.command_topic = f"homeassistant/switch/{self.device_id}/set"
         self.state_topic = f"homeassistant/switch/{self.device_id}/state"
         self.discovery_topic = f"homeassistant/switch/{self.device_id}/config"
+        self.discovery_payload = json.dumps(self._discovery_config(), separators=(',', ':')).encode()
+        self.discovery_hash = hashlib.sha256(self.discovery_payload).hexdigest()
 
-    def get_discovery_payload(self):
-        """Generate Home Assistant MQTT Discovery configuration payload"""
-        discovery_payload = {
+    def _discovery_config(self):
+        config = {
             "name": self.device_name,
             "unique_id": self.device_id,
             "command_topic": self.command_topic,
@@ -100,49 +79,185 @@ class HA_MQTT_Config:
                 "manufacturer": "Jagel"
             }
         }
-        return json.dumps(discovery_payload)
+        if self.availability_topic is not None:
+            config["availability_topic"] = self.availability_topic
+            config["payload_available"] = PAYLOAD_ONLINE.decode()
+            config["payload_not_available"] = PAYLOAD_OFFLINE.decode()
+        return config
+
+    def get_discovery_payload(self):
+        """Return the Home Assistant MQTT Discovery configuration payload (bytes)"""
+        return self.discovery_payload
+
+
+class Discovery_Cache:
+    """
+    Hashes of the discovery payloads retained on the broker
 
-class Device_Config:
+    Persisted across restarts so a reconnect or reboot only republishes the
+    discovery configs that actually changed. The cache is tied to one
+    broker; connecting to another one starts from an empty cache.
+
+    Acks arrive on the network thread while the pulse worker may forget a
+    removed door, so the hashes are only touched under a lock and written
+    from a copy.
     """
-    Load MQTT configuration from JSON file
+    def __init__(self, path: str, broker_key: str):
+        """
+        Args:
+            path (str): JSON file holding the cache
+            broker_key (str): Identifies the broker, e.g. "host:port"
+        """
+        self.path = path
+        self.broker_key = broker_key
+        self.hashes = {}
+        self._lock = threading.Lock()
+        # Bumped on every change, so an older copy never overwrites a newer
+        # one written by another thread
+        self._version = 0
+        self._saved_version = 0
+        self._save_lock = threading.Lock()
+        try:
+            with open(path) as file:
+                data = json.load(file)
+            if data.get('broker') == broker_key:
+                self.hashes = dict(data.get('discovery', {}))
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, AttributeError) as e:
+            LOGGER.warning("Ignoring unreadable discovery cache: %s", e, extra={'path': path})
+
+    def is_published(self, topic: str, digest: str) -> bool:
+        """Return True if this payload hash is already retained on the broker"""
+        with self._lock:
+            return self.hashes.get(topic) == digest
+
+    def mark_published(self, topic: str, digest: str):
+        """Record a payload hash confirmed by the broker"""
+        with self._lock:
+            if self.hashes.get(topic) == digest:
+                return
+            self.hashes[topic] = digest
+            self._version += 1
+        self.save()
+
+    def forget(self, topic: str):
+        """Drop a topic whose retained config was cleared"""
+        with self._lock:
+            if self.hashes.pop(topic, None) is None:
+                return
+            self._version += 1
+        self.save()
+
+    def clear(self):
+        """Forget every hash so all discovery configs are republished"""
+        with self._lock:
+            if not self.hashes:
+                return
+            self.hashes = {}
+            self._version += 1
+        self.save()
+
+    def save(self):
+        """Write the cache atomically"""
+        with self._lock:
+            version = self._version
+            hashes = dict(self.hashes)
+        temp_path = f"{self.path}.tmp"
+        # One writer at a time, they share the temporary file
+        with self._save_lock:
+            if version < self._saved_version:
+                return
+            try:
+                with open(temp_path, 'w') as file:
+                    json.dump({'broker': self.broker_key, 'discovery': hashes}, file)
+                os.replace(temp_path, self.path)
+            except OSError as e:
+                LOGGER.warning("Cannot write discovery cache: %s", e, extra={'path': self.path})
+                return
+            self._saved_version = version
+
+
+class Metrics_MQTT_Config:
     """
-    def __init__(self, config_file: YamlConfigLoader):
-        self.config_file = config_file
-        #mqtt
-        self.broker = self.config_file.get_value('mqtt','broker') 
-        self.username = self.config_file.get_value('mqtt','username')
-        self.password = self.config_file.get_value('mqtt','password')
-        self.port = self.config_file.get_value('mqtt','port')
-        self.keepalive = self.config_file.get_value('mqtt','keepalive')
-        # device
-        self.version = self.config_file.get_value('device','version')
-        self.id = self.config_file.get_value('device','id')
-        # gpio
-        self.garage_door_pin = self.config_file.get_value('gpio','garage_door_pin')
-            
-
-
-class JGL_MQTT:
+    Topics and discovery configs of the daemon's metrics sensors
+
+    The metrics are published as one JSON document; every key becomes a
+    diagnostic sensor on a device representing this Pi.
+    """
+    def __init__(self, node_id: str, fields):
+        """
+        Args:
+            node_id (str): Identifies this Pi, used in topics and unique ids
+            fields (list): (key, unit, state_class) of every metrics key
+        """
+        self.node_id = node_id
+        self.state_topic = f"homeassistant/sensor/{node_id}/metrics/state"
+        device = pi_device(node_id)
+        # (discovery topic, payload, hash) per sensor, built once
+        self.discovery = []
+        for key, unit, state_class in fields:
+            config = {
+                "name": key.replace('_', ' ').capitalize(),
+                "unique_id": f"{node_id}_{key}",
+                "state_topic": self.state_topic,
+                "value_template": f"{{{{ value_json.{key} }}}}",
+                "state_class": state_class,
+                "entity_category": "diagnostic",
+                "device": device,
+            }
+            if unit is not None:
+                config["unit_of_measurement"] = unit
+            payload = json.dumps(config, separators=(',', ':')).encode()
+            self.discovery.append((
+                f"homeassistant/sensor/{node_id}/{key}/config",
+                payload,
+                hashlib.sha256(payload).hexdigest(),
+            ))
+
+
+class Availability_MQTT_Config:
     """
-    MQTT Configuration Loader
+    Availability and heartbeat topics of this Pi
+
+    The daemon publishes a retained "online" on the availability topic once
+    connected and sets "offline" as its Last Will, so the broker marks every
+    door switch unavailable as soon as it drops the connection. The
+    heartbeat feeds a connectivity sensor that Home Assistant expires by
+    itself when the heartbeats stop, e.g. when the network between the Pi
+    and the broker is cut and the broker has not noticed yet.
     """
-    def __init__(self, config_file='config.json'):
-        self.config_loader = YamlConfigLoader(config_file)
-        self.config = self.config_loader.load_config()
-        
-    def get_value(self, nodename, fieldname):
+    # Heartbeats that may be missed before the connectivity sensor expires
+    MISSED_HEARTBEATS = 3
+
+    def __init__(self, node_id: str, heartbeat_interval: float):
         """
-        Get configuration value by nodename and fieldname
-        
         Args:
-            nodename (str): The top-level node name (e.g., 'mqtt', 'device', 'gpio')
-            fieldname (str): The field name within the node (e.g., 'broker', 'username', 'pin')
-        
-        Returns:
-            The configuration value if found, None if not found
+            node_id (str): Identifies this Pi, used in topics and unique ids
+            heartbeat_interval (float): Seconds between heartbeats, 0 disables
+                them and the connectivity sensor
         """
-        try:
-            return self.config[nodename][fieldname]
-        except KeyError as e:
-            print(f"Configuration key not found: {e}")
-            return None
\ No newline at end of file
+        self.node_id = node_id
+        self.heartbeat_interval = heartbeat_interval
+        self.topic = f"homeassistant/sensor/{node_id}/availability"
+        self.heartbeat_topic = f"homeassistant/binary_sensor/{node_id}/connectivity/state"
+        # (discovery topic, payload, hash), like Metrics_MQTT_Config
+        self.discovery = []
+        if heartbeat_interval:
+            config = {
+                "name": "Connectivity",
+                "unique_id": f"{node_id}_connectivity",
+                "state_topic": self.heartbeat_topic,
+                "payload_on": STATE_PAYLOADS["ON"].decode(),
+                "device_class": "connectivity",
+                "entity_category": "diagnostic",
+                "expire_after": math.ceil(heartbeat_interval * self.MISSED_HEARTBEATS),
+                "availability_topic": self.topic,
+                "device": pi_device(node_id),
+            }
+            payload = json.dumps(config, separators=(',', ':')).encode()
+            self.discovery.append((
+                f"homeassistant/binary_sensor/{node_id}/connectivity/config",
+                payload,
+                hashlib.sha256(payload).hexdigest(),
+            ))
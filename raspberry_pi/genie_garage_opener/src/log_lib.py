@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Logging for the garage opener
+
+Every module logs to a child of the "genie" logger. Records go into a
+bounded queue and a background thread writes them to stdout, so the MQTT
+network thread, the pulse worker and GPIO callbacks never wait on an SD
+card or a slow journald pipe. When the writer falls behind, records are
+dropped and counted instead of blocking the caller.
+
+Structured fields are passed with extra=, e.g.
+    LOGGER.info("Received command", extra={'device_id': door_id, 'topic': topic})
+and written as key=value pairs after the message, or as JSON fields.
+"""
+
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+
+ROOT_LOGGER = "genie"
+LEVELS = {
+    'debug': logging.DEBUG,
+    'info': logging.INFO,
+    'warning': logging.WARNING,
+    'error': logging.ERROR,
+}
+FORMATS = ('text', 'json')
+# Loggers of the daemon, the keys of logging.levels in config.yaml
+COMPONENTS = ('main', 'pulse', 'door', 'gpio', 'config', 'discovery', 'metrics')
+
+DEFAULT_LEVEL = 'info'
+DEFAULT_FORMAT = 'text'
+DEFAULT_QUEUE_SIZE = 1000
+
+# Attributes every LogRecord has; anything else came in through extra=
+_RECORD_ATTRS = frozenset(logging.makeLogRecord({}).__dict__) | {'message', 'asctime'}
+
+
+def get_logger(component):
+    """
+    Return the logger of a daemon component
+
+    Args:
+        component (str): One of COMPONENTS
+    """
+    return logging.getLogger(f"{ROOT_LOGGER}.{component}")
+
+
+class Structured_Formatter(logging.Formatter):
+    """
+    Format a record with its extra= fields, as text or as one JSON object
+    """
+    def __init__(self, output_format=DEFAULT_FORMAT):
+        super().__init__('%(asctime)s %(levelname)s %(name)s: %(message)s')
+        self.output_format = output_format
+
+    def format(self, record):
+        fields = {name: value for name, value in record.__dict__.items() if name not in _RECORD_ATTRS}
+        if self.output_format == 'json':
+            entry = {
+                'time': record.created,
+                'level': record.levelname.lower(),
+                'logger': record.name,
+                'message': record.getMessage(),
+                **fields,
+            }
+            if record.exc_info:
+                entry['exception'] = self.formatException(record.exc_info)
+            return json.dumps(entry, default=str)
+        text = super().format(record)
+        if fields:
+            text += " " + " ".join(f"{name}={value}" for name, value in fields.items())
+        return text
+
+
+class _Queue_Handler(logging.handlers.QueueHandler):
+    """
+    Put records on a bounded queue, dropping them when it is full
+    """
+    def __init__(self, records):
+        super().__init__(records)
+        self.dropped = 0
+
+    def prepare(self, record):
+        # Records never leave the process, the writer formats them so the
+        # calling thread does not have to
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class _Queue_Listener(logging.handlers.QueueListener):
+    """
+    Queue listener that waits for room for its stop sentinel
+    """
+    def enqueue_sentinel(self):
+        # The queue is detached and drained by the listener, the put returns
+        self.queue.put(self._sentinel)
+
+
+class Log_Queue:
+    """
+    Route the daemon's loggers through a queue to a background writer
+
+    Logging threads only put records on the queue; a QueueListener thread
+    formats them and writes them out.
+    """
+    def __init__(self, settings, stream=None):
+        """
+        Args:
+            settings (Logging_Settings): Levels, output format and queue size
+            stream: Where records are written, defaults to stdout
+        """
+        records = queue.Queue(settings.queue_size)
+        self.handler = _Queue_Handler(records)
+        self.writer = logging.StreamHandler(stream or sys.stdout)
+        self.listener = _Queue_Listener(records, self.writer)
+        self.logger = logging.getLogger(ROOT_LOGGER)
+        self.settings = None
+        self.started = False
+        self.apply(settings)
+
+    @property
+    def dropped(self):
+        """Number of records dropped because the writer fell behind"""
+        return self.handler.dropped
+
+    def start(self):
+        """Start the writer thread and attach the queue to the loggers"""
+        self.listener.start()
+        self.started = True
+        self.logger.addHandler(self.handler)
+        # Records stop here instead of also reaching the root logger
+        self.logger.propagate = False
+
+    def apply(self, settings):
+        """
+        Apply levels and output format, e.g. after a config reload
+
+        The queue size only takes effect on the next start of the daemon.
+        """
+        self.writer.setFormatter(Structured_Formatter(settings.format))
+        self.logger.setLevel(LEVELS[settings.level])
+        previous = dict(self.settings.levels) if self.settings is not None else {}
+        for component in previous:
+            # Components without an override follow the root level again
+            get_logger(component).setLevel(logging.NOTSET)
+        for component, level in settings.levels:
+            get_logger(component).setLevel(LEVELS[level])
+        self.settings = settings
+
+    def stop(self):
+        """Detach the queue, write the records still queued and stop the writer"""
+        self.logger.removeHandler(self.handler)
+        self.logger.propagate = True
+        if self.started:
+            self.listener.stop()
+            self.started = False
+        self.writer.flush()
@@ -3,81 +3,545 @@
 MQTT Garage opener
 """
 
-import paho.mqtt.client as mqtt
+from startup_timer_lib import Startup_Timer
+
+startup = Startup_Timer()
+
+import json
+import logging
+import os
+import re
+import threading
+import time
+from config_lib import Config_Watcher, load_snapshot
+from control_socket_lib import Control_Server
 from genie_wall_console_lib import Genie_Garage_Device
-from ha_mqqt_setup_lib import HA_MQTT_Config, Device_Config, YamlConfigLoader
+from gpio_backend_lib import create_backend
+from ha_mqqt_setup_lib import (
+    PAYLOAD_OFFLINE, PAYLOAD_ONLINE, STATE_PAYLOADS, Availability_MQTT_Config, Discovery_Cache, HA_MQTT_Config,
+    Metrics_MQTT_Config,
+)
+from log_lib import Log_Queue, get_logger
+from metrics_lib import DURATION_BUCKETS, Metrics_Registry, Metrics_Server, Periodic_Task
+from mqtt_session_lib import Outbox, Reconnect_Backoff
+from pulse_worker_lib import Pulse_Worker
+
+startup.mark("imports")
+
+LOGGER = get_logger('main')
+
+
+class Garage_Door:
+    """
+    GPIO device and MQTT topics for one configured door
+
+    The object lives as long as its door id stays configured, so pulses
+    queued before a config reload run against the reloaded pins.
+    """
+    def __init__(self, config, genie_garage: Genie_Garage_Device, ha_mqtt: HA_MQTT_Config):
+        self.config = config
+        self.genie_garage = genie_garage
+        self.ha_mqtt = ha_mqtt
+
+    @property
+    def pulse_gap(self):
+        return self.config.pulse_gap
+
+    def start_pulse(self):
+        """Press the door button, returning when to release it (None if removed)"""
+        if self.genie_garage is None:
+            LOGGER.warning("Skipping pulse for removed door", extra={'device_id': self.ha_mqtt.device_id})
+            return None
+        return self.genie_garage.start_pulse()
+
+    def end_pulse(self):
+        """Release the door button"""
+        if self.genie_garage is not None:
+            self.genie_garage.end_pulse()
+
+    def close(self):
+        """Release the GPIO pins of the door"""
+        if self.genie_garage is not None:
+            self.genie_garage.close()
+            self.genie_garage = None
+
+
+client = None
+
+def on_sensor_change(door):
+    """Publish a door state change reported by the reed switch"""
+    # Before the first connection, on_connect publishes the initial state
+    if client is not None:
+        publish_state(door)
+
+def build_ha_mqtt(door_config):
+    """Create the MQTT topics and discovery config of a door"""
+    return HA_MQTT_Config(door_config.id, door_config.version, availability.topic)
 
-# Configuration
-config = YamlConfigLoader()
-device = Device_Config(config)
+def mqtt_node_id(client_id):
+    """Return the id of this Pi in topics and unique ids"""
+    return re.sub(r'[^A-Za-z0-9_-]', '_', client_id)
+
+def build_device(door_config, door):
+    """Create and initialize the GPIO device for a door"""
+    genie_garage = Genie_Garage_Device(
+        door_config.garage_door_pin, gpio_backend, door_config.pulse_duration, door_config.pulse_gap,
+    )
+    genie_garage.initialize_GPIO()
+    if door_config.door_sensor_pin is not None:
+        # Publish door state from the reed switch edges as they happen
+        genie_garage.initialize_sensor(
+            door_config.door_sensor_pin,
+            door_config.door_sensor_bounce_time,
+            lambda _device: on_sensor_change(door),
+        )
+    return genie_garage
+
+def build_door(door_config):
+    """Create a door and its GPIO device from its config"""
+    door = Garage_Door(door_config, None, build_ha_mqtt(door_config))
+    door.genie_garage = build_device(door_config, door)
+    return door
+
+# Configuration (genie_config_file overrides the default ./config.yaml)
+snapshot = load_snapshot()
+# Log records are written by a background thread from here on
+log_queue = Log_Queue(snapshot.logging)
+log_queue.start()
+startup.mark("config")
 
 # Initialization
-genie_garage = Genie_Garage_Device(device.garage_door_pin)
-genie_garage.initialize_GPIO()
+gpio_backend = create_backend(snapshot.gpio_backend)
+# Fixed for the life of the process, the discovery configs of every door
+# point at it
+availability = Availability_MQTT_Config(mqtt_node_id(snapshot.mqtt.client_id), snapshot.mqtt.heartbeat_interval)
+# Door id -> door and command topic -> door. Both are replaced as a whole on
+# reload, so the network thread never sees a half-updated mapping.
+doors = {door_config.id: build_door(door_config) for door_config in snapshot.devices}
+doors_by_topic = {door.ha_mqtt.command_topic: door for door in doors.values()}
+startup.mark("gpio")
+
+# Hashes of the discovery configs retained on the broker, next to config.yaml
+DISCOVERY_CACHE_FILE = os.path.join(os.path.dirname(snapshot.path), '.discovery_cache.json')
+discovery_cache = None
+# Message id -> (publish time, topic, discovery hash or None) of QoS 1
+# publishes awaiting the broker's ack, and ids acked before they were
+# recorded. The lock is never held while calling into paho: paho runs
+# on_publish under its own message lock, which client.publish also takes.
+pending_publishes = {}
+early_acks = set()
+publish_lock = threading.Lock()
+
+def mqtt_publish(topic, payload, qos=1, retain=True, discovery_hash=None):
+    """Publish through the current client, timing QoS 1 publishes until acked"""
+    published_at = time.monotonic()
+    info = client.publish(topic, payload, qos=qos, retain=retain)
+    with publish_lock:
+        # QoS 0 publishes are "acked" by paho as soon as they are written
+        acked = info.mid in early_acks
+        early_acks.discard(info.mid)
+        if qos and not acked:
+            pending_publishes[info.mid] = (published_at, topic, discovery_hash)
+    if qos and acked:
+        on_publish_acked(published_at, topic, discovery_hash)
+    return info
+
+# State publishes made while offline are flushed on reconnect
+outbox = Outbox(snapshot.mqtt.outbox_size, mqtt_publish)
+backoff = Reconnect_Backoff(snapshot.mqtt.reconnect_min_delay, snapshot.mqtt.reconnect_max_delay)
+# Set to skip the backoff wait, e.g. when the MQTT settings changed
+reconnect_now = threading.Event()
+shutting_down = threading.Event()
+
+# Metrics, served to Prometheus and published to Home Assistant
+metrics = Metrics_Registry()
+commands_received = metrics.counter("commands_received", "Commands received over MQTT")
+local_commands = metrics.counter("local_commands", "Commands received on the control socket")
+reconnects = metrics.counter("reconnects", "Reconnections to the MQTT broker")
+command_to_pulse = metrics.histogram("command_to_pulse_seconds", "Time from command receipt to pulse start")
+pulse_duration = metrics.histogram("pulse_duration_seconds", "Relay pulse width", DURATION_BUCKETS)
+pulse_jitter = metrics.histogram("pulse_jitter_seconds", "Deviation of the pulse width from the configured delay")
+publish_latency = metrics.histogram("publish_latency_seconds", "Time from a QoS 1 publish to the broker's ack")
+metrics.gauge("queue_depth", "Commands waiting for the pulse worker", lambda: pulse_worker.pending())
+metrics.gauge("outbox_depth", "Messages waiting for the broker connection", lambda: len(outbox))
+metrics.gauge("log_records_dropped", "Log records dropped because the log writer fell behind", lambda: log_queue.dropped)
+metrics_mqtt = None
+
+def is_connected():
+    return client is not None and client.is_connected()
+
+def apply_config(new_snapshot):
+    """
+    Bring the doors in line with a reloaded config snapshot
+
+    Runs on the pulse worker thread, so it never races a pulse and commands
+    queued before the reload are not dropped.
+
+    Args:
+        new_snapshot (Config_Snapshot): The snapshot to apply
+    """
+    global doors, doors_by_topic
+    new_doors = {}
+    for door_config in new_snapshot.devices:
+        door = doors.get(door_config.id)
+        if door is not None and door.config == door_config:
+            new_doors[door_config.id] = door
+            continue
+        if door is None:
+            door = build_door(door_config)
+            LOGGER.info("Added door", extra={'device_id': door_config.id})
+        else:
+            door.close()
+            door.config = door_config
+            door.ha_mqtt = build_ha_mqtt(door_config)
+            door.genie_garage = build_device(door_config, door)
+            LOGGER.info("Reconfigured door", extra={'device_id': door_config.id})
+        new_doors[door_config.id] = door
+        if is_connected():
+            publish_discovery(door)
+        publish_state(door)
+
+    for door_id, door in doors.items():
+        if door_id not in new_doors:
+            door.close()
+            # An empty retained config removes the entity from Home Assistant
+            outbox.publish(door.ha_mqtt.discovery_topic, b"")
+            if discovery_cache is not None:
+                discovery_cache.forget(door.ha_mqtt.discovery_topic)
+            LOGGER.info("Removed door", extra={'device_id': door_id})
+
+    doors = new_doors
+    doors_by_topic = {door.ha_mqtt.command_topic: door for door in new_doors.values()}
+
+def on_config_change(old, new):
+    """Apply a reloaded config.yaml"""
+    if new.gpio_backend != old.gpio_backend:
+        LOGGER.warning("gpio.backend changed, restart the daemon to switch backends")
+    if new.metrics != old.metrics:
+        LOGGER.warning("metrics settings changed, restart the daemon to apply them")
+    if new.control != old.control:
+        LOGGER.warning("control settings changed, restart the daemon to apply them")
+    if new.mqtt.heartbeat_interval != old.mqtt.heartbeat_interval:
+        LOGGER.warning("mqtt.heartbeat_interval changed, restart the daemon to apply it")
+    if new.mqtt.client_id != old.mqtt.client_id:
+        LOGGER.warning("mqtt.client_id changed, restart the daemon to move the availability topic")
+    if new.logging != old.logging:
+        if new.logging.queue_size != old.logging.queue_size:
+            LOGGER.warning("logging.queue_size changed, restart the daemon to apply it")
+        log_queue.apply(new.logging)
+    pulse_worker.call(lambda: apply_config(new))
+    if new.mqtt != old.mqtt and client is not None:
+        # The network loop returns and main() reconnects with the new settings
+        LOGGER.info("MQTT settings changed, reconnecting")
+        reconnect_now.set()
+        disconnect()
 
-ha_mqtt = HA_MQTT_Config(device.id,device.version)
+def on_pulse_start(door, waited):
+    """Record how long a command waited for the pulse worker"""
+    command_to_pulse.observe(waited)
+    LOGGER.debug("Pulse started", extra={'device_id': door.ha_mqtt.device_id, 'latency_ms': round(waited * 1000, 3)})
+
+def on_pulse_done(door):
+    """Publish the door state once a pulse has finished"""
+    genie_garage = door.genie_garage
+    if genie_garage is None:
+        return
+    if genie_garage.last_pulse_width is not None:
+        pulse_duration.observe(genie_garage.last_pulse_width)
+        pulse_jitter.observe(abs(genie_garage.last_pulse_width - genie_garage.delay))
+    # Doors with a sensor publish from the sensor edges instead
+    if genie_garage.sensor is None:
+        publish_state(door)
+
+def publish_metrics():
+    """Publish the metrics summary for the Home Assistant sensors"""
+    if metrics_mqtt is None:
+        return
+    outbox.publish(metrics_mqtt.state_topic, json.dumps(metrics.summary()).encode())
+
+def publish_heartbeat():
+    """Keep the connectivity sensor from expiring"""
+    # Not queued while offline, a late heartbeat would claim the Pi was online
+    if is_connected():
+        mqtt_publish(availability.heartbeat_topic, STATE_PAYLOADS["ON"], qos=0, retain=False)
+
+# Pulses are timed on the GPIO backend clock (virtual for the simulation)
+pulse_worker = Pulse_Worker(on_pulse_done, on_pulse_start, gpio_backend)
+config_watcher = Config_Watcher(snapshot, on_config_change)
+metrics_task = Periodic_Task(snapshot.metrics.interval, publish_metrics, name="metrics-publisher")
+heartbeat_task = Periodic_Task(availability.heartbeat_interval, publish_heartbeat, name="heartbeat")
 
 def on_connect(client, userdata, flags, rc):
     """Callback for when client connects to MQTT broker"""
     if rc == 0:
-        print("Connected to MQTT broker successfully")
-        client.subscribe(ha_mqtt.command_topic)
-        publish_discovery()
-        # Publish initial state
-        publish_state()
+        session_present = bool(flags.get('session present'))
+        LOGGER.info("Connected to MQTT broker", extra={'session_present': session_present})
+        backoff.reset()
+        if startup.reported:
+            reconnects.inc()
+        # QoS 1: the broker queues commands for this session while offline
+        client.subscribe(HA_MQTT_Config.command_wildcard, qos=1)
+        client.subscribe(HA_MQTT_Config.status_topic)
+        if not session_present:
+            # New or lost session, the broker may not hold our retained
+            # messages either
+            discovery_cache.clear()
+        for door in doors.values():
+            publish_discovery(door)
+        publish_pi_discovery()
+        flushed = outbox.online()
+        if flushed:
+            LOGGER.info("Flushed %d messages published while offline", flushed)
+        if not session_present:
+            for door in doors.values():
+                # Publish initial state
+                publish_state(door)
+        # Last, so Home Assistant sees the switches online with their state
+        mqtt_publish(availability.topic, PAYLOAD_ONLINE, qos=1, retain=True)
+        publish_heartbeat()
+        if not startup.reported:
+            startup.mark("connect")
+            startup.reported = True
+            LOGGER.info(startup.report())
     else:
-        print(f"on_connect : Failed to connect to MQTT broker: {rc}")
+        LOGGER.error("Failed to connect to MQTT broker", extra={'rc': rc})
+
+def on_disconnect(client, userdata, rc):
+    """Keep state publishes in the outbox until the next connection"""
+    outbox.offline()
+    # rc 0 is a disconnect we asked for
+    LOGGER.log(logging.WARNING if rc else logging.INFO, "Disconnected from MQTT broker", extra={'rc': rc})
 
 def on_message(client, userdata, msg):
     """Handle incoming MQTT messages"""
-    
+
     try:
-        payload = msg.payload.decode()
-        print(f"Received command: {payload}")
-        genie_garage.door_up_down()
-        publish_state()
-            
+        if msg.topic == HA_MQTT_Config.status_topic:
+            if msg.payload == b"online" and not msg.retain:
+                # Home Assistant restarted, make sure it sees every switch
+                LOGGER.info("Home Assistant is online, republishing discovery")
+                for door in doors.values():
+                    publish_discovery(door, force=True)
+                publish_pi_discovery(force=True)
+            return
+        door = doors_by_topic.get(msg.topic)
+        if door is None:
+            # Command for a switch that is not driven by this process
+            return
+        commands_received.inc()
+        LOGGER.info("Received command", extra={
+            'device_id': door.ha_mqtt.device_id, 'topic': msg.topic, 'payload': msg.payload.decode(errors='replace'),
+        })
+        # Hand the pulse to the worker so the network thread is never blocked
+        pulse_worker.submit(door)
+
     except Exception as e:
-        print(f"on_message : Error processing message: {e}")
+        LOGGER.error("Error processing message: %s", e, extra={'topic': msg.topic})
 
-def publish_state():
+def on_local_trigger(door_id):
+    """
+    Handle a trigger from the control socket
+
+    Returns:
+        bool: False if no door has this id
+    """
+    door = doors.get(door_id)
+    if door is None:
+        return False
+    local_commands.inc()
+    LOGGER.info("Received local command", extra={'device_id': door_id})
+    # Same pulse path as MQTT commands, independent of the broker
+    pulse_worker.submit(door)
+    return True
+
+def publish_state(door):
     """Publish current switch state to Home Assistant"""
-    client.publish(ha_mqtt.state_topic, genie_garage.current_state, retain=True)
-    print(f"Published state: {genie_garage.current_state}")
+    genie_garage = door.genie_garage
+    if genie_garage is None:
+        # Door was removed by a config reload
+        return
+    fields = {'device_id': door.ha_mqtt.device_id, 'state': genie_garage.current_state}
+    if outbox.publish(door.ha_mqtt.state_topic, STATE_PAYLOADS[genie_garage.current_state]):
+        LOGGER.debug("Published state", extra=fields)
+    else:
+        LOGGER.info("Offline, queued state", extra=fields)
+
+def publish_discovery(door, force=False):
+    """
+    Publish Home Assistant MQTT Discovery configuration
+
+    Skipped when the broker already retains this exact payload.
+
+    Args:
+        door (Garage_Door): Door to publish
+        force (bool): Publish even if the payload is unchanged
+    """
+    ha_mqtt = door.ha_mqtt
+    fields = {'device_id': ha_mqtt.device_id, 'topic': ha_mqtt.discovery_topic}
+    if publish_discovery_config(ha_mqtt.discovery_topic, ha_mqtt.get_discovery_payload(), ha_mqtt.discovery_hash, force):
+        LOGGER.info("Published discovery config", extra=fields)
+    else:
+        LOGGER.debug("Discovery config unchanged", extra=fields)
 
-def publish_discovery():
-    """Publish Home Assistant MQTT Discovery configuration"""
-    discovery_payload = ha_mqtt.get_discovery_payload()
-    
-    client.publish(ha_mqtt.discovery_topic, discovery_payload, retain=True)
-    print(f"Published discovery config to: {ha_mqtt.discovery_topic}")
+def publish_pi_discovery(force=False):
+    """Publish the discovery configs of the metrics and connectivity sensors"""
+    configs = availability.discovery + (metrics_mqtt.discovery if metrics_mqtt is not None else [])
+    published = sum(
+        publish_discovery_config(topic, payload, digest, force)
+        for topic, payload, digest in configs
+    )
+    if published:
+        LOGGER.info("Published %d Pi sensor discovery configs", published)
+
+def publish_discovery_config(topic, payload, digest, force=False):
+    """
+    Publish a retained discovery config unless the broker already has it
+
+    Returns:
+        bool: True if the config was published
+    """
+    if not force and discovery_cache.is_published(topic, digest):
+        return False
+    # QoS 1 so the hash is only cached once the broker has stored the payload
+    mqtt_publish(topic, payload, qos=1, retain=True, discovery_hash=digest)
+    return True
+
+def on_publish(client, userdata, mid):
+    """Match a broker ack to its publish"""
+    with publish_lock:
+        pending = pending_publishes.pop(mid, None)
+        if pending is None:
+            # Acked before mqtt_publish recorded it, it finishes the match
+            early_acks.add(mid)
+            return
+    on_publish_acked(*pending)
+
+def on_publish_acked(published_at, topic, discovery_hash):
+    """Record publish latency and cache acknowledged discovery hashes"""
+    latency = time.monotonic() - published_at
+    publish_latency.observe(latency)
+    LOGGER.debug("Publish acknowledged", extra={'topic': topic, 'latency_ms': round(latency * 1000, 3)})
+    if discovery_hash is not None:
+        discovery_cache.mark_published(topic, discovery_hash)
+
+def disconnect():
+    """
+    Mark the doors offline and disconnect from the broker
+
+    The broker only sends the Last Will when the connection is lost, a
+    clean disconnect has to publish "offline" itself.
+    """
+    if is_connected():
+        mqtt_publish(availability.topic, PAYLOAD_OFFLINE, qos=1, retain=True)
+    client.disconnect()
+
+def shutdown():
+    """Disconnect and make main() return, e.g. from another thread"""
+    shutting_down.set()
+    reconnect_now.set()
+    if client is not None:
+        disconnect()
 
 def main():
     """Main function"""
-    global client
-    
-    # Create MQTT client
-    client = mqtt.Client()
-    client.username_pw_set(device.username,device.password)
-    client.on_connect = on_connect
-    client.on_message = on_message
-    
-    # Connect to broker
+    global client, discovery_cache, metrics_mqtt
+
+    # Imported here so config and GPIO errors surface before paho is loaded
+    import paho.mqtt.client as mqtt
+    startup.mark("mqtt import")
+
+    metrics_server = None
+    if snapshot.metrics.port:
+        try:
+            metrics_server = Metrics_Server(metrics, snapshot.metrics.host, snapshot.metrics.port)
+            metrics_server.start()
+            LOGGER.info("Serving metrics on http://%s:%d/metrics", snapshot.metrics.host, metrics_server.port)
+        except OSError as e:
+            LOGGER.error("Metrics endpoint unavailable: %s", e)
+            metrics_server = None
+
+    control_server = None
+    if snapshot.control.socket:
+        try:
+            control_server = Control_Server(snapshot.control.socket, on_local_trigger, lambda: list(doors))
+            control_server.start()
+            LOGGER.info("Listening for local commands", extra={'path': snapshot.control.socket})
+        except OSError as e:
+            LOGGER.error("Control socket unavailable: %s", e, extra={'path': snapshot.control.socket})
+            control_server = None
+
     try:
-        print(f"Connecting to MQTT broker {device.broker}:{device.port}")
-        client.connect(device.broker, device.port, device.keepalive)
-        print(f"Listening for commands on: {ha_mqtt.command_topic}")
-        print(f"Publishing state to: {ha_mqtt.state_topic}")
-        
-        # Start the loop
-        client.loop_forever()
-        
+        pulse_worker.start()
+        config_watcher.start()
+        if snapshot.metrics.interval:
+            metrics_task.start()
+        if availability.heartbeat_interval:
+            heartbeat_task.start()
+        settings = None
+        while not shutting_down.is_set():
+            if config_watcher.snapshot.mqtt != settings:
+                settings = config_watcher.snapshot.mqtt
+                # Persistent session: subscriptions and QoS 1 commands survive
+                # a disconnect as long as the client id stays the same
+                client = mqtt.Client(client_id=settings.client_id, clean_session=False)
+                client.on_connect = on_connect
+                client.on_disconnect = on_disconnect
+                client.on_message = on_message
+                client.on_publish = on_publish
+                client.username_pw_set(settings.username, settings.password)
+                # Sent by the broker when it loses the connection, marking
+                # every door unavailable within 1.5 keepalives
+                client.will_set(availability.topic, PAYLOAD_OFFLINE, qos=1, retain=True)
+                discovery_cache = Discovery_Cache(DISCOVERY_CACHE_FILE, f"{settings.broker}:{settings.port}")
+                if snapshot.metrics.interval:
+                    metrics_mqtt = Metrics_MQTT_Config(mqtt_node_id(settings.client_id), metrics.summary_fields())
+                with publish_lock:
+                    pending_publishes.clear()
+                    early_acks.clear()
+                outbox.max_size = settings.outbox_size
+                backoff.min_delay = settings.reconnect_min_delay
+                backoff.max_delay = settings.reconnect_max_delay
+                backoff.reset()
+                reconnect_now.clear()
+
+            LOGGER.info("Connecting to MQTT broker %s:%d", settings.broker, settings.port)
+            try:
+                client.connect(settings.broker, settings.port, settings.keepalive)
+            except OSError as e:
+                LOGGER.error("Connecting to MQTT broker failed: %s", e)
+            else:
+                LOGGER.info("Listening for commands", extra={'topic': HA_MQTT_Config.command_wildcard})
+                # Run the network loop until the connection is lost
+                while client.loop(timeout=1.0) == mqtt.MQTT_ERR_SUCCESS:
+                    pass
+                outbox.offline()
+
+            if shutting_down.is_set() or config_watcher.snapshot.mqtt != settings:
+                continue
+            delay = backoff.next_delay()
+            LOGGER.info("Reconnecting in %.1f seconds", delay)
+            reconnect_now.wait(delay)
+
     except KeyboardInterrupt:
-        print("\nShutting down...")
-        client.disconnect()
+        LOGGER.info("Shutting down")
+        if client is not None:
+            disconnect()
     except Exception as e:
-        client.disconnect()
-        print(f"Error __main__: {e}")
+        if client is not None:
+            disconnect()
+        LOGGER.exception("Error in main: %s", e)
+    finally:
+        # Drain pending pulses, also after shutdown() ended the loop
+        config_watcher.stop()
+        pulse_worker.stop()
+        metrics_task.stop()
+        heartbeat_task.stop()
+        if metrics_server is not None:
+            metrics_server.stop()
+        if control_server is not None:
+            control_server.stop()
+        # Write out what is still queued before the process exits
+        log_queue.stop()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
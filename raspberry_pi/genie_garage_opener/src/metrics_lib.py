@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+"""
+Metrics for the garage opener
+
+Counters, gauges and histograms kept in a Metrics_Registry and exposed two
+ways:
+- Metrics_Server: Prometheus text format on a local HTTP port
+- Metrics_Registry.summary(): flat dict published as JSON on a retained
+  MQTT topic, with one Home Assistant sensor per key
+"""
+
+import bisect
+import threading
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from log_lib import get_logger
+
+LOGGER = get_logger('metrics')
+
+# Seconds, suited to command and publish latencies on a LAN
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+# Seconds, suited to relay pulse widths
+DURATION_BUCKETS = (0.1, 0.25, 0.5, 0.75, 0.9, 1.0, 1.1, 1.25, 1.5, 2.0, 3.0, 5.0)
+
+
+class Counter:
+    """
+    Monotonically increasing count
+    """
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help_text = help_text
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+    def samples(self):
+        return [(f"{self.name}_total", self.value)]
+
+    def summary(self):
+        return {self.name: self.value}
+
+    def summary_fields(self):
+        return [(self.name, None, "total_increasing")]
+
+
+class Gauge:
+    """
+    Value read from a function when the metrics are collected
+    """
+    kind = "gauge"
+
+    def __init__(self, name: str, help_text: str, read):
+        """
+        Args:
+            read (callable): Returns the current value
+        """
+        self.name = name
+        self.help_text = help_text
+        self.read = read
+
+    def samples(self):
+        return [(self.name, self.read())]
+
+    def summary(self):
+        return {self.name: self.read()}
+
+    def summary_fields(self):
+        return [(self.name, None, "measurement")]
+
+
+class Histogram:
+    """
+    Distribution of observed values in seconds
+
+    Cumulative buckets are kept for Prometheus. The most recent samples are
+    kept as well, so the MQTT summary reports percentiles of current
+    behaviour rather than of the whole uptime.
+    """
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, buckets=LATENCY_BUCKETS, window=256):
+        """
+        Args:
+            buckets (tuple): Sorted upper bounds in seconds
+            window (int): Number of recent samples used for percentiles
+        """
+        self.name = name
+        self.help_text = help_text
+        # Summary keys carry their unit as a suffix of their own
+        self.summary_name = name[:-len("_seconds")] if name.endswith("_seconds") else name
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.recent = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float):
+        with self._lock:
+            self.counts[bisect.bisect_left(self.buckets, seconds)] += 1
+            self.count += 1
+            self.sum += seconds
+            self.recent.append(seconds)
+
+    def percentile(self, fraction: float):
+        """Return a percentile of the recent samples in seconds, or None"""
+        with self._lock:
+            ordered = sorted(self.recent)
+        if not ordered:
+            return None
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+    def samples(self):
+        with self._lock:
+            counts = list(self.counts)
+            count, total = self.count, self.sum
+        samples = []
+        cumulative = 0
+        for bound, bucket_count in zip(self.buckets, counts):
+            cumulative += bucket_count
+            samples.append((f'{self.name}_bucket{{le="{bound}"}}', cumulative))
+        samples.append((f'{self.name}_bucket{{le="+Inf"}}', count))
+        samples.append((f"{self.name}_sum", total))
+        samples.append((f"{self.name}_count", count))
+        return samples
+
+    def summary(self):
+        result = {f"{self.summary_name}_count": self.count}
+        for label, fraction in (("p50", 0.50), ("p95", 0.95)):
+            value = self.percentile(fraction)
+            result[f"{self.summary_name}_{label}_ms"] = None if value is None else round(value * 1000, 3)
+        return result
+
+    def summary_fields(self):
+        return [
+            (f"{self.summary_name}_count", None, "total_increasing"),
+            (f"{self.summary_name}_p50_ms", "ms", "measurement"),
+            (f"{self.summary_name}_p95_ms", "ms", "measurement"),
+        ]
+
+
+class Metrics_Registry:
+    """
+    All metrics of the process
+    """
+    def __init__(self, prefix="genie_garage"):
+        """
+        Args:
+            prefix (str): Prepended to every metric name
+        """
+        self.prefix = prefix
+        self.metrics = []
+
+    def _add(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, help_text: str) -> Counter:
+        return self._add(Counter(f"{self.prefix}_{name}", help_text))
+
+    def gauge(self, name: str, help_text: str, read) -> Gauge:
+        return self._add(Gauge(f"{self.prefix}_{name}", help_text, read))
+
+    def histogram(self, name: str, help_text: str, buckets=LATENCY_BUCKETS) -> Histogram:
+        return self._add(Histogram(f"{self.prefix}_{name}", help_text, buckets))
+
+    def render_prometheus(self) -> str:
+        """Return every metric in the Prometheus text exposition format"""
+        lines = []
+        for metric in self.metrics:
+            lines.append(f"# HELP {metric.name} {metric.help_text}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, value in metric.samples():
+                lines.append(f"{name} {value}")
+        return "\n".join(lines) + "\n"
+
+    def summary(self) -> dict:
+        """Return a flat dict of current values, keyed without the prefix"""
+        result = {}
+        for metric in self.metrics:
+            for key, value in metric.summary().items():
+                result[key[len(self.prefix) + 1:]] = value
+        return result
+
+    def summary_fields(self) -> list:
+        """Return (key, unit, state_class) for every key of summary()"""
+        return [
+            (key[len(self.prefix) + 1:], unit, state_class)
+            for metric in self.metrics
+            for key, unit, state_class in metric.summary_fields()
+        ]
+
+
+class Metrics_Server:
+    """
+    Serve /metrics in the Prometheus text format from a background thread
+    """
+    def __init__(self, registry: Metrics_Registry, host: str, port: int):
+        """
+        Args:
+            registry (Metrics_Registry): Metrics to serve
+            host (str): Address to bind, keep it local unless scraped remotely
+            port (int): Port to bind
+        """
+        self.registry = registry
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?', 1)[0] != '/metrics':
+                    self.send_error(404)
+                    return
+                body = registry.render_prometheus().encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, name="metrics-server", daemon=True)
+
+    @property
+    def port(self):
+        return self.server.server_address[1]
+
+    def start(self):
+        """Start serving"""
+        self.thread.start()
+
+    def stop(self):
+        """Stop serving and close the socket"""
+        if self.thread.is_alive():
+            self.server.shutdown()
+        self.server.server_close()
+
+
+class Periodic_Task:
+    """
+    Call a function every interval seconds on a background thread
+    """
+    def __init__(self, interval: float, func, name="periodic-task"):
+        self.interval = interval
+        self.func = func
+        self._stop = threading.Event()
+        self.thread = threading.Thread(target=self._run, name=name, daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self.thread.is_alive():
+            self.thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.func()
+            except Exception as e:
+                LOGGER.error("Error in %s: %s", self.thread.name, e)
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+MQTT session helpers for the garage opener
+
+- Reconnect_Backoff: jittered exponential delays between reconnect attempts,
+  so a broker restart does not make every Pi reconnect at the same moment
+- Outbox: bounded store for publishes made while the client is offline
+"""
+
+import random
+import threading
+from collections import OrderedDict
+
+
+class Reconnect_Backoff:
+    """
+    Exponential backoff with full jitter
+
+    The n-th consecutive delay is drawn uniformly between min_delay / 2 and
+    min(max_delay, min_delay * 2 ** n).
+    """
+    def __init__(self, min_delay: float, max_delay: float):
+        """
+        Args:
+            min_delay (float): Upper bound of the first delay in seconds
+            max_delay (float): Cap on every delay in seconds
+        """
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.attempts = 0
+
+    def next_delay(self) -> float:
+        """Return the delay before the next attempt and count the attempt"""
+        ceiling = min(self.max_delay, self.min_delay * 2 ** self.attempts)
+        self.attempts += 1
+        return random.uniform(min(self.min_delay / 2, ceiling), ceiling)
+
+    def reset(self):
+        """Start over after a successful connection"""
+        self.attempts = 0
+
+
+class Outbox:
+    """
+    Publish through the client while online, store while offline
+
+    Messages are kept per topic, so only the latest payload of a retained
+    state topic is sent after reconnecting. When more than max_size topics
+    are waiting, the oldest is dropped.
+
+    The lock is never held while publishing: with the network loop driven
+    by hand, paho runs on_disconnect inside a publish that hits a dead
+    socket, and on_disconnect calls offline(). Publishes made while the
+    stored messages are being flushed are stored behind them, so a newer
+    payload is never overtaken by an older one.
+    """
+    def __init__(self, max_size: int, publish):
+        """
+        Args:
+            max_size (int): Maximum number of topics kept while offline
+            publish (callable): Sends a message, called with
+                (topic, payload, qos, retain)
+        """
+        self.max_size = max_size
+        self._publish = publish
+        self.is_online = False
+        self.dropped = 0
+        self._messages = OrderedDict()
+        self._flushing = False
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._messages)
+
+    def publish(self, topic: str, payload: bytes, qos=1, retain=True):
+        """
+        Publish now if online, otherwise keep the message for later
+
+        Returns:
+            bool: True if the message was handed to the client, or will be
+                by the flush in progress
+        """
+        with self._lock:
+            if not self.is_online or self._flushing:
+                self._store(topic, payload, qos, retain)
+                return self.is_online
+        self._publish(topic, payload, qos, retain)
+        return True
+
+    def online(self):
+        """
+        Flush stored messages and publish directly from now on
+
+        Returns:
+            int: Number of messages flushed
+        """
+        with self._lock:
+            self.is_online = True
+            self._flushing = True
+        flushed = 0
+        while True:
+            with self._lock:
+                if not self.is_online or not self._messages:
+                    self._flushing = False
+                    return flushed
+                messages, self._messages = self._messages, OrderedDict()
+            for topic, (payload, qos, retain) in messages.items():
+                self._publish(topic, payload, qos, retain)
+            flushed += len(messages)
+
+    def offline(self):
+        """Store publishes until the next call to online()"""
+        with self._lock:
+            self.is_online = False
+
+    def _store(self, topic, payload, qos, retain):
+        # Called with the lock held
+        self._messages.pop(topic, None)
+        self._messages[topic] = (payload, qos, retain)
+        if len(self._messages) > self.max_size:
+            self._messages.popitem(last=False)
+            self.dropped += 1
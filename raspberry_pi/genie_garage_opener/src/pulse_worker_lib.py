@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Pulse worker for the garage opener
+
+Runs door pulses on a dedicated thread so the MQTT network thread never
+blocks on GPIO timing. A pulse switches the relay on and returns; the
+worker switches it off again at a monotonic deadline, so pulses of
+different doors run side by side instead of queueing behind each other.
+"""
+
+import heapq
+import itertools
+import queue
+import threading
+import time
+from collections import deque
+
+from gpio_backend_lib import Wall_Clock
+from log_lib import get_logger
+
+LOGGER = get_logger('pulse')
+
+_STOP = object()
+# Timer kinds: switch the relay off / let the door take its next press
+_RELEASE = 0
+_READY = 1
+
+
+class _Call:
+    __slots__ = ('func',)
+
+    def __init__(self, func):
+        self.func = func
+
+
+class Pulse_Worker:
+    """
+    Schedule door pulses on a background thread
+
+    Presses for a door that is still pulsing, or within its release gap
+    after the pulse, wait for it. Every press therefore stays a separate
+    pulse the opener can register.
+    """
+    def __init__(self, on_pulse_done=None, on_pulse_start=None, clock=None):
+        """
+        Initialize the pulse worker
+
+        Args:
+            on_pulse_done (callable): Called with the device after each pulse
+            on_pulse_start (callable): Called with the device and the seconds
+                it waited, right before each pulse
+            clock: Times the pulses, anything with monotonic() and
+                wait(queue, timeout) such as a GPIO backend. Defaults to
+                the wall clock.
+        """
+        self.on_pulse_done = on_pulse_done
+        self.on_pulse_start = on_pulse_start
+        self.clock = clock or Wall_Clock()
+        self.queue = queue.Queue()
+        # (backend time, sequence, kind, device), earliest first
+        self._timers = []
+        self._sequence = itertools.count()
+        # Device -> submit times of its presses waiting for the door
+        self._waiting = {}
+        # Devices pulsing or within their release gap
+        self._busy = set()
+        self._stopping = False
+        self.thread = threading.Thread(target=self._run, name="pulse-worker", daemon=True)
+
+    def start(self):
+        """Start the worker thread"""
+        self.thread.start()
+
+    def submit(self, device):
+        """
+        Queue a pulse for a device and return immediately
+
+        Args:
+            device: Door to pulse, with start_pulse() returning the backend
+                time to end the pulse (None to skip it), end_pulse() and a
+                pulse_gap in seconds
+        """
+        self.queue.put((device, time.monotonic()))
+
+    def call(self, func):
+        """
+        Run a function on the worker thread, in order with queued pulses
+
+        Args:
+            func (callable): Function taking no arguments
+        """
+        self.queue.put(_Call(func))
+
+    def pending(self):
+        """Return the number of pulses waiting to run"""
+        return self.queue.qsize() + sum(len(presses) for presses in list(self._waiting.values()))
+
+    def stop(self, timeout=None):
+        """
+        Stop the worker after finishing the pulses already queued
+
+        Args:
+            timeout (float): Seconds to wait for the worker to finish
+        """
+        if not self.thread.is_alive():
+            return
+        self.queue.put(_STOP)
+        self.thread.join(timeout)
+
+    def _run(self):
+        while True:
+            self._run_due_timers()
+            if self._stopping and not self._timers and self.queue.empty():
+                return
+            timeout = None
+            if self._timers:
+                timeout = max(0.0, self._timers[0][0] - self.clock.monotonic())
+            try:
+                item = self.clock.wait(self.queue, timeout)
+            except queue.Empty:
+                continue
+            try:
+                if item is _STOP:
+                    self._stopping = True
+                elif type(item) is _Call:
+                    item.func()
+                else:
+                    device, submitted_at = item
+                    if device in self._busy:
+                        self._waiting.setdefault(device, deque()).append(submitted_at)
+                    else:
+                        self._start(device, submitted_at)
+            except Exception as e:
+                LOGGER.error("Error running pulse: %s", e)
+            finally:
+                self.queue.task_done()
+
+    def _run_due_timers(self):
+        while self._timers and self._timers[0][0] <= self.clock.monotonic():
+            _, _, kind, device = heapq.heappop(self._timers)
+            try:
+                if kind == _RELEASE:
+                    self._release(device)
+                else:
+                    self._ready(device)
+            except Exception as e:
+                self._busy.discard(device)
+                LOGGER.error("Error running pulse: %s", e)
+
+    def _schedule(self, at, kind, device):
+        heapq.heappush(self._timers, (at, next(self._sequence), kind, device))
+
+    def _start(self, device, submitted_at):
+        if self.on_pulse_start is not None:
+            self.on_pulse_start(device, time.monotonic() - submitted_at)
+        self._busy.add(device)
+        try:
+            release_at = device.start_pulse()
+        except Exception:
+            self._busy.discard(device)
+            raise
+        if release_at is None:
+            self._ready(device)
+            return
+        self._schedule(release_at, _RELEASE, device)
+
+    def _release(self, device):
+        device.end_pulse()
+        if self.on_pulse_done is not None:
+            self.on_pulse_done(device)
+        if device.pulse_gap > 0:
+            self._schedule(self.clock.monotonic() + device.pulse_gap, _READY, device)
+        else:
+            self._ready(device)
+
+    def _ready(self, device):
+        presses = self._waiting.get(device)
+        if not presses:
+            self._waiting.pop(device, None)
+            self._busy.discard(device)
+            return
+        self._start(device, presses.popleft())
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Startup time report for the garage opener
+"""
+
+import os
+import time
+
+
+def process_age():
+    """
+    Return the seconds since this process was started, or None
+
+    Covers the interpreter startup that happens before any of our code
+    runs. Only available on Linux.
+    """
+    try:
+        with open('/proc/self/stat') as file:
+            # The command name may contain spaces, fields resume after ')'
+            fields = file.read().rsplit(')', 1)[1].split()
+        with open('/proc/uptime') as file:
+            uptime = float(file.read().split()[0])
+        started = int(fields[19]) / os.sysconf('SC_CLK_TCK')
+        return max(0.0, uptime - started)
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class Startup_Timer:
+    """
+    Record the duration of each startup phase
+    """
+    def __init__(self):
+        self.created = time.monotonic()
+        self.before_main = process_age()
+        self.phases = []
+        self._last = self.created
+        self.reported = False
+
+    def mark(self, phase: str):
+        """
+        End the current phase
+
+        Args:
+            phase (str): Name of the phase that just finished
+        """
+        now = time.monotonic()
+        self.phases.append((phase, now - self._last))
+        self._last = now
+
+    def report(self) -> str:
+        """Return a one line summary of the startup phases"""
+        parts = []
+        total = self._last - self.created
+        if self.before_main is not None:
+            parts.append(f"interpreter {self.before_main * 1000:.0f} ms")
+            total += self.before_main
+        parts += [f"{phase} {seconds * 1000:.1f} ms" for phase, seconds in self.phases]
+        return f"Startup: ready in {total * 1000:.0f} ms ({', '.join(parts)})"
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Tests for config validation and the config watcher
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+SRC_DIR = os.path.join(TESTS_DIR, '..', 'src')
+sys.path.insert(0, SRC_DIR)
+
+from config_lib import Config_Error, Config_Watcher, load_snapshot, parse_snapshot
+
+VALID_CONFIG = """
+mqtt:
+  broker: broker.local
+devices:
+  - id: left
+    garage_door_pin: 17
+    door_sensor_pin: 27
+  - id: right
+    garage_door_pin: 18
+"""
+
+
+def config(**overrides):
+    """Return a valid parsed config with some top-level sections replaced"""
+    document = {
+        'mqtt': {'broker': 'broker.local'},
+        'devices': [{'id': 'left', 'garage_door_pin': 17}],
+    }
+    document.update(overrides)
+    return document
+
+
+def door(**fields):
+    entry = {'id': 'left', 'garage_door_pin': 17}
+    entry.update(fields)
+    return entry
+
+
+class Parse_Snapshot_Test(unittest.TestCase):
+    def assertInvalid(self, document, message):
+        with self.assertRaises(Config_Error) as raised:
+            parse_snapshot(document)
+        self.assertIn(message, str(raised.exception))
+
+    def test_defaults(self):
+        snapshot = parse_snapshot(config())
+        (left,) = snapshot.devices
+        self.assertEqual(left.id, 'left')
+        self.assertEqual(left.version, 1)
+        self.assertIsNone(left.door_sensor_pin)
+        self.assertEqual(snapshot.mqtt.port, 1883)
+
+    def test_legacy_single_door_layout(self):
+        snapshot = parse_snapshot({
+            'mqtt': {'broker': 'broker.local'},
+            'device': {'id': 'garage', 'version': 2},
+            'gpio': {'garage_door_pin': 17},
+        })
+        (garage,) = snapshot.devices
+        self.assertEqual((garage.id, garage.version, garage.garage_door_pin), ('garage', 2, 17))
+
+    def test_missing_keys(self):
+        self.assertInvalid({'devices': [door()]}, "mqtt section is required")
+        self.assertInvalid(config(mqtt={}), "mqtt.broker is required")
+        self.assertInvalid(config(devices=[{'id': 'left'}]), "devices[0].garage_door_pin is required")
+        self.assertInvalid(config(devices=[{'garage_door_pin': 17}]), "devices[0].id is required")
+        self.assertInvalid(config(devices=[]), "devices must be a non-empty list")
+
+    def test_bad_pins(self):
+        self.assertInvalid(config(devices=[door(garage_door_pin=-1)]), "devices[0].garage_door_pin")
+        self.assertInvalid(config(devices=[door(garage_door_pin=40)]), "devices[0].garage_door_pin")
+        self.assertInvalid(config(devices=[door(door_sensor_pin=28)]), "devices[0].door_sensor_pin")
+        self.assertInvalid(
+            config(devices=[door(), door(id='right', garage_door_pin=17)]), "must not be shared")
+        self.assertInvalid(config(devices=[door(door_sensor_pin=17)]), "must not be shared")
+
+    def test_duplicate_ids(self):
+        self.assertInvalid(
+            config(devices=[door(), door(garage_door_pin=18)]), "device ids must be unique")
+
+    def test_bad_types(self):
+        self.assertInvalid(config(devices=[door(garage_door_pin='17')]), "must be int")
+        self.assertInvalid(config(devices=[door(garage_door_pin=True)]), "must be int")
+        self.assertInvalid(config(devices=[door(pulse_duration='long')]), "must be")
+        self.assertInvalid(config(mqtt={'broker': 'b', 'port': 1883.5}), "mqtt.port must be int")
+        self.assertInvalid(config(metrics=[]), "metrics must be a mapping")
+        self.assertInvalid(['not', 'a', 'mapping'], "config must be a YAML mapping")
+
+    def test_bad_values(self):
+        self.assertInvalid(config(devices=[door(id='left door')]), "devices[0].id")
+        self.assertInvalid(config(devices=[door(pulse_duration=0)]), "pulse_duration")
+        self.assertInvalid(config(mqtt={'broker': 'b', 'port': 70000}), "mqtt.port")
+        self.assertInvalid(config(gpio={'backend': 'pigpio'}), "gpio.backend")
+
+    def test_versions(self):
+        snapshot = parse_snapshot(config(device={'version': 3}, devices=[door(), door(
+            id='right', garage_door_pin=18, version='2b')]))
+        self.assertEqual([door_config.version for door_config in snapshot.devices], [3, '2b'])
+        self.assertInvalid(config(devices=[door(version=1.5)]), "devices[0].version must be")
+        self.assertInvalid(config(devices=[door(version='v 2')]), "devices[0].version")
+        self.assertInvalid(config(device={'version': ['1']}), "device.version must be")
+
+
+class Config_Watcher_Test(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp(prefix="genie_test_")
+        self.path = os.path.join(self.directory, 'config.yaml')
+        self.write(VALID_CONFIG, 1)
+        self.changes = []
+        self.watcher = Config_Watcher(load_snapshot(self.path), lambda *change: self.changes.append(change))
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def write(self, text, mtime):
+        with open(self.path, 'w') as file:
+            file.write(text)
+        # Explicit modification times, file systems may round them
+        os.utime(self.path, ns=(mtime * 10 ** 9, mtime * 10 ** 9))
+
+    def test_unchanged_file_is_not_reloaded(self):
+        self.assertFalse(self.watcher.check())
+        self.assertEqual(self.changes, [])
+
+    def test_valid_change_is_swapped_in(self):
+        old = self.watcher.snapshot
+        self.write(VALID_CONFIG.replace("garage_door_pin: 18", "garage_door_pin: 22"), 2)
+        self.assertTrue(self.watcher.check())
+        self.assertEqual(self.changes, [(old, self.watcher.snapshot)])
+        self.assertEqual(self.watcher.snapshot.devices[1].garage_door_pin, 22)
+
+    def test_invalid_change_keeps_the_old_snapshot(self):
+        old = self.watcher.snapshot
+        self.write(VALID_CONFIG.replace("id: right", "id: left"), 2)
+        self.assertFalse(self.watcher.check())
+        self.assertEqual(self.changes, [])
+        self.assertEqual(self.watcher.snapshot.devices, old.devices)
+        # The broken file is not parsed again on the next poll
+        self.assertFalse(self.watcher.check())
+
+        self.write("mqtt: [unclosed", 3)
+        self.assertFalse(self.watcher.check())
+        self.assertEqual(self.watcher.snapshot.devices, old.devices)
+
+        self.write(VALID_CONFIG, 4)
+        self.assertTrue(self.watcher.check())
+        self.assertEqual(len(self.changes), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
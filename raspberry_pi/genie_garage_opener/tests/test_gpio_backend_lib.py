@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Tests for the GPIO backends
+
+Run from this directory's parent with:
+    python -m unittest discover -s tests
+"""
+
+import os
+import queue
+import sys
+import types
+import unittest
+from unittest import mock
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+SRC_DIR = os.path.join(TESTS_DIR, '..', 'src')
+sys.path.insert(0, SRC_DIR)
+
+from genie_wall_console_lib import Genie_Garage_Device
+from gpio_backend_lib import (
+    BACKENDS, GPIO_Backend, Gpiozero_Backend, Mock_Pin_Backend, Simulation_Backend, Virtual_Clock,
+    create_backend,
+)
+
+
+class Fake_Device:
+    """Stands in for a gpiozero LED or Button"""
+    created = []
+
+    def __init__(self, pin, **kwargs):
+        self.pin = pin
+        self.is_active = False
+        self.closed = 0
+        Fake_Device.created.append(self)
+
+    def on(self):
+        self.is_active = True
+
+    def off(self):
+        self.is_active = False
+
+    def close(self):
+        self.closed += 1
+
+
+FAKE_GPIOZERO = types.SimpleNamespace(LED=Fake_Device, Button=Fake_Device)
+
+
+class GPIO_Backend_Test(unittest.TestCase):
+    def test_incomplete_backend_fails_on_creation(self):
+        class Output_Only(GPIO_Backend):
+            def output(self, pin):
+                return None
+
+        with self.assertRaises(TypeError):
+            Output_Only()
+
+    def test_base_backend_cannot_be_created(self):
+        with self.assertRaises(TypeError):
+            GPIO_Backend()
+
+
+class Create_Backend_Test(unittest.TestCase):
+    def test_named_backends(self):
+        self.assertIsInstance(create_backend('mock'), Mock_Pin_Backend)
+        self.assertIsInstance(create_backend('simulation'), Simulation_Backend)
+
+    def test_unknown_backend(self):
+        with self.assertRaises(ValueError):
+            create_backend('pigpio')
+
+    def test_falls_back_to_mock_without_gpiozero(self):
+        # None in sys.modules makes the import raise ImportError
+        with mock.patch.dict(sys.modules, {'gpiozero': None}):
+            backend = create_backend()
+        self.assertIs(type(backend), Mock_Pin_Backend)
+
+    def test_backend_names(self):
+        self.assertEqual(sorted(BACKENDS), ['gpiozero', 'mock', 'simulation'])
+
+
+class Gpiozero_Backend_Test(unittest.TestCase):
+    def setUp(self):
+        Fake_Device.created = []
+        patcher = mock.patch.dict(sys.modules, {'gpiozero': FAKE_GPIOZERO})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_closed_door_releases_its_devices(self):
+        backend = Gpiozero_Backend()
+        for _ in range(3):
+            # A config reload closes the old door and builds a new one
+            door = Genie_Garage_Device(17, backend)
+            door.initialize_GPIO()
+            door.initialize_sensor(27, 0.05)
+            door.close()
+        self.assertEqual(len(Fake_Device.created), 6)
+        self.assertTrue(all(device.closed == 1 for device in Fake_Device.created))
+        backend.close()
+        self.assertTrue(all(device.closed == 1 for device in Fake_Device.created))
+
+
+class Mock_Pin_Backend_Test(unittest.TestCase):
+    def test_pulse_is_recorded_once_released(self):
+        backend = Simulation_Backend()
+        pin = backend.output(17)
+        pin.on()
+        backend.sleep(0.25)
+        pin.on()  # Already pressed, not a new pulse
+        self.assertEqual(backend.pulses, [])
+        pin.off()
+        pin.off()
+        self.assertEqual(len(backend.pulses), 1)
+        self.assertEqual(backend.pulses[0].pin, 17)
+        self.assertAlmostEqual(backend.pulses[0].width, 0.25)
+
+    def test_records_are_bounded(self):
+        backend = Simulation_Backend(max_records=3)
+        pin = backend.output(17)
+        for _ in range(5):
+            pin.on()
+            backend.sleep(1)
+            pin.off()
+        self.assertEqual(len(backend.pulses), 3)
+        self.assertEqual(backend.pulses[0].start, 2)
+
+    def test_input_debounce(self):
+        backend = Simulation_Backend()
+        edges = []
+        sensor = backend.input(27, edges.append, bounce_time=0.05)
+        sensor.drive(True)
+        backend.sleep(0.01)
+        sensor.drive(False)  # Within the bounce window, ignored
+        self.assertTrue(sensor.is_active)
+        backend.sleep(0.05)
+        sensor.drive(False)
+        sensor.drive(False)  # Same level, no edge
+        self.assertEqual(edges, [True, False])
+
+    def test_closed_input_stops_reporting(self):
+        backend = Simulation_Backend()
+        edges = []
+        sensor = backend.input(27, edges.append)
+        sensor.close()
+        sensor.drive(True)
+        self.assertEqual(edges, [])
+
+
+class Simulation_Backend_Test(unittest.TestCase):
+    def test_sleep_advances_the_virtual_clock(self):
+        clock = Virtual_Clock(10.0)
+        backend = Simulation_Backend(clock)
+        backend.sleep(2.5)
+        self.assertEqual(backend.monotonic(), 12.5)
+
+    def test_wait_returns_a_queued_item_without_advancing(self):
+        backend = Simulation_Backend()
+        commands = queue.Queue()
+        commands.put('press')
+        self.assertEqual(backend.wait(commands, 1.0), 'press')
+        self.assertEqual(backend.monotonic(), 0.0)
+
+    def test_wait_jumps_to_the_deadline(self):
+        backend = Simulation_Backend()
+        with self.assertRaises(queue.Empty):
+            backend.wait(queue.Queue(), 1.5)
+        self.assertEqual(backend.monotonic(), 1.5)
+
+
+if __name__ == '__main__':
+    unittest.main()
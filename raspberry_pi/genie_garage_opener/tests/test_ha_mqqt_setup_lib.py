@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Tests for the discovery cache
+"""
+
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import unittest
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+SRC_DIR = os.path.join(TESTS_DIR, '..', 'src')
+sys.path.insert(0, SRC_DIR)
+
+from ha_mqqt_setup_lib import Discovery_Cache
+
+
+class Discovery_Cache_Test(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp(prefix="genie_test_")
+        self.path = os.path.join(self.directory, '.discovery_cache.json')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_hashes_persist_per_broker(self):
+        cache = Discovery_Cache(self.path, "broker:1883")
+        cache.mark_published("homeassistant/switch/a/config", "hash-a")
+        self.assertTrue(Discovery_Cache(self.path, "broker:1883").is_published(
+            "homeassistant/switch/a/config", "hash-a"))
+        self.assertFalse(Discovery_Cache(self.path, "other:1883").is_published(
+            "homeassistant/switch/a/config", "hash-a"))
+
+    def test_forget_and_clear(self):
+        cache = Discovery_Cache(self.path, "broker:1883")
+        cache.mark_published("a", "1")
+        cache.mark_published("b", "2")
+        cache.forget("a")
+        self.assertFalse(cache.is_published("a", "1"))
+        self.assertTrue(cache.is_published("b", "2"))
+        cache.clear()
+        self.assertEqual(Discovery_Cache(self.path, "broker:1883").hashes, {})
+
+    def test_unreadable_cache_starts_empty(self):
+        with open(self.path, 'w') as file:
+            file.write("not json")
+        self.assertEqual(Discovery_Cache(self.path, "broker:1883").hashes, {})
+
+    def test_concurrent_updates(self):
+        cache = Discovery_Cache(self.path, "broker:1883")
+        errors = []
+
+        def publish(prefix):
+            try:
+                for index in range(200):
+                    cache.mark_published(f"{prefix}/{index}", str(index))
+                    if index % 10 == 0:
+                        cache.forget(f"{prefix}/{index}")
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=publish, args=(f"door{n}",)) for n in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        # The last write holds the final state of every thread
+        with open(self.path) as file:
+            saved = json.load(file)['discovery']
+        self.assertEqual(saved, cache.hashes)
+        self.assertEqual(len(saved), 4 * 180)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Tests for the queued, structured logging
+"""
+
+import io
+import json
+import logging
+import os
+import sys
+import unittest
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+SRC_DIR = os.path.join(TESTS_DIR, '..', 'src')
+sys.path.insert(0, SRC_DIR)
+
+from config_lib import Logging_Settings
+from log_lib import Log_Queue, get_logger
+
+
+def settings(output_format='text', queue_size=100, level='info', levels=()):
+    return Logging_Settings(level=level, format=output_format, queue_size=queue_size, levels=levels)
+
+
+class Log_Queue_Test(unittest.TestCase):
+    def setUp(self):
+        self.stream = io.StringIO()
+        self.logger = get_logger('main')
+
+    def start(self, **kwargs):
+        log_queue = Log_Queue(settings(**kwargs), self.stream)
+        log_queue.start()
+        self.addCleanup(log_queue.stop)
+        return log_queue
+
+    def test_records_are_written_with_their_fields(self):
+        log_queue = self.start()
+        self.logger.info("Received command", extra={'device_id': 'left', 'topic': 'a/b'})
+        log_queue.stop()
+        line = self.stream.getvalue()
+        self.assertIn("INFO genie.main: Received command device_id=left topic=a/b", line)
+
+    def test_json_format_keeps_the_exception(self):
+        log_queue = self.start(output_format='json')
+        try:
+            raise RuntimeError("relay gone")
+        except RuntimeError:
+            self.logger.exception("Pulse failed", extra={'pin': 17})
+        log_queue.stop()
+        entry = json.loads(self.stream.getvalue())
+        self.assertEqual((entry['level'], entry['message'], entry['pin']), ('error', "Pulse failed", 17))
+        self.assertIn("relay gone", entry['exception'])
+
+    def test_full_queue_drops_and_counts(self):
+        log_queue = Log_Queue(settings(queue_size=2), self.stream)
+        # Attached without the writer running, nothing drains the queue
+        log_queue.logger.addHandler(log_queue.handler)
+        try:
+            for index in range(5):
+                self.logger.warning("record %d", index)
+        finally:
+            log_queue.logger.removeHandler(log_queue.handler)
+        self.assertEqual(log_queue.dropped, 3)
+
+    def test_levels_per_component(self):
+        log_queue = self.start(level='warning', levels=(('pulse', 'debug'),))
+        self.logger.info("hidden")
+        get_logger('pulse').debug("shown")
+        log_queue.stop()
+        self.assertEqual(self.stream.getvalue().count("\n"), 1)
+        self.assertIn("shown", self.stream.getvalue())
+
+    def test_does_not_change_process_wide_logging(self):
+        flags = (logging.logThreads, logging.logProcesses, logging.logMultiprocessing)
+        log_queue = self.start()
+        log_queue.stop()
+        self.assertEqual((logging.logThreads, logging.logProcesses, logging.logMultiprocessing), flags)
+
+    def test_stop_before_start(self):
+        Log_Queue(settings(), self.stream).stop()
+
+
+if __name__ == '__main__':
+    unittest.main()
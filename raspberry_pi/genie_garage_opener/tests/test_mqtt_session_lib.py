@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Tests for the reconnect backoff and the offline outbox
+"""
+
+import os
+import random
+import sys
+import threading
+import unittest
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+SRC_DIR = os.path.join(TESTS_DIR, '..', 'src')
+sys.path.insert(0, SRC_DIR)
+
+from mqtt_session_lib import Outbox, Reconnect_Backoff
+
+# Seconds to wait for a call that deadlocks if the outbox holds its lock
+DEADLOCK_TIMEOUT = 2.0
+
+
+def run_with_timeout(test, func):
+    """Run func on a thread and fail the test if it does not return"""
+    result = []
+    thread = threading.Thread(target=lambda: result.append(func()), daemon=True)
+    thread.start()
+    thread.join(DEADLOCK_TIMEOUT)
+    if thread.is_alive():
+        test.fail("Outbox call deadlocked")
+    return result[0]
+
+
+class Reconnect_Backoff_Test(unittest.TestCase):
+    def setUp(self):
+        random.seed(1)
+
+    def test_delays_grow_up_to_the_cap(self):
+        backoff = Reconnect_Backoff(1.0, 8.0)
+        for attempt in range(8):
+            ceiling = min(8.0, 2.0 ** attempt)
+            delay = backoff.next_delay()
+            self.assertGreaterEqual(delay, 0.5)
+            self.assertLessEqual(delay, ceiling)
+
+    def test_reset_starts_over(self):
+        backoff = Reconnect_Backoff(1.0, 60.0)
+        for _ in range(5):
+            backoff.next_delay()
+        backoff.reset()
+        self.assertLessEqual(backoff.next_delay(), 1.0)
+
+    def test_cap_below_half_the_minimum(self):
+        backoff = Reconnect_Backoff(4.0, 1.0)
+        self.assertEqual(backoff.next_delay(), 1.0)
+
+
+class Outbox_Test(unittest.TestCase):
+    def setUp(self):
+        self.sent = []
+        self.outbox = Outbox(3, lambda *message: self.sent.append(message))
+
+    def test_publishes_directly_while_online(self):
+        self.outbox.online()
+        self.assertTrue(self.outbox.publish("a", b"1"))
+        self.assertEqual(self.sent, [("a", b"1", 1, True)])
+        self.assertEqual(len(self.outbox), 0)
+
+    def test_keeps_the_latest_payload_per_topic_while_offline(self):
+        self.assertFalse(self.outbox.publish("a", b"1"))
+        self.assertFalse(self.outbox.publish("b", b"1"))
+        self.assertFalse(self.outbox.publish("a", b"2", qos=0, retain=False))
+        self.assertEqual(self.sent, [])
+        self.assertEqual(self.outbox.online(), 2)
+        self.assertEqual(self.sent, [("b", b"1", 1, True), ("a", b"2", 0, False)])
+
+    def test_drops_the_oldest_topic_when_full(self):
+        for topic in "abcd":
+            self.outbox.publish(topic, b"1")
+        self.assertEqual(self.outbox.dropped, 1)
+        self.outbox.online()
+        self.assertEqual([message[0] for message in self.sent], ["b", "c", "d"])
+
+    def test_offline_stores_again(self):
+        self.outbox.online()
+        self.outbox.offline()
+        self.assertFalse(self.outbox.publish("a", b"1"))
+        self.assertEqual(self.sent, [])
+
+    def test_offline_from_inside_publish(self):
+        # paho runs on_disconnect inside a publish that hits a dead socket
+        outbox = Outbox(10, lambda *message: outbox.offline())
+        outbox.online()
+        self.assertTrue(run_with_timeout(self, lambda: outbox.publish("a", b"1")))
+        self.assertFalse(outbox.is_online)
+        self.assertFalse(run_with_timeout(self, lambda: outbox.publish("b", b"1")))
+        self.assertEqual(len(outbox), 1)
+
+    def test_offline_from_inside_flush(self):
+        sent = []
+
+        def publish(topic, payload, qos, retain):
+            sent.append(topic)
+            outbox.offline()
+
+        outbox = Outbox(10, publish)
+        outbox.publish("a", b"1")
+        outbox.publish("b", b"1")
+        run_with_timeout(self, outbox.online)
+        self.assertFalse(outbox.is_online)
+        # Both were handed to the client before the disconnect was seen
+        self.assertEqual(sent, ["a", "b"])
+        self.assertFalse(outbox.publish("c", b"1"))
+
+    def test_publish_during_flush_is_not_overtaken(self):
+        sent = []
+
+        def publish(topic, payload, qos, retain):
+            sent.append((topic, payload))
+            if payload == b"old":
+                # Another thread publishing while the flush is running
+                self.assertTrue(outbox.publish("a", b"new"))
+
+        outbox = Outbox(10, publish)
+        outbox.publish("a", b"old")
+        self.assertEqual(run_with_timeout(self, outbox.online), 2)
+        self.assertEqual(sent, [("a", b"old"), ("a", b"new")])
+        self.assertEqual(len(outbox), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
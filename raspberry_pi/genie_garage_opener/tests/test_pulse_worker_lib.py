@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Tests for the pulse worker, timed on the simulation backend's virtual clock
+"""
+
+import os
+import sys
+import unittest
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+SRC_DIR = os.path.join(TESTS_DIR, '..', 'src')
+sys.path.insert(0, SRC_DIR)
+
+from genie_wall_console_lib import Genie_Garage_Device
+from gpio_backend_lib import Simulation_Backend
+from pulse_worker_lib import Pulse_Worker
+
+
+class Removed_Door:
+    """Door whose GPIO device is gone, start_pulse() skips the pulse"""
+    pulse_gap = 0.0
+
+    def __init__(self):
+        self.released = False
+
+    def start_pulse(self):
+        return None
+
+    def end_pulse(self):
+        self.released = True
+
+
+class Broken_Door(Removed_Door):
+    def start_pulse(self):
+        raise RuntimeError("relay gone")
+
+
+class Pulse_Worker_Test(unittest.TestCase):
+    def setUp(self):
+        self.backend = Simulation_Backend()
+        self.done = []
+        self.worker = Pulse_Worker(self.done.append, clock=self.backend)
+
+    def tearDown(self):
+        self.worker.stop(timeout=5)
+
+    def door(self, pin, pulse_duration=1.0, pulse_gap=0.5):
+        device = Genie_Garage_Device(pin, self.backend, pulse_duration, pulse_gap)
+        device.initialize_GPIO()
+        return device
+
+    def pulses(self, pin):
+        return [pulse for pulse in self.backend.pulses if pulse.pin == pin]
+
+    def run_worker(self):
+        """Run everything queued so far and wait until the worker is done"""
+        self.worker.start()
+        self.worker.stop(timeout=5)
+        self.assertFalse(self.worker.thread.is_alive())
+
+    def test_pulse_width_is_exact(self):
+        door = self.door(17, pulse_duration=0.4)
+        self.worker.submit(door)
+        self.run_worker()
+        (pulse,) = self.pulses(17)
+        self.assertAlmostEqual(pulse.width, 0.4)
+        self.assertAlmostEqual(door.last_pulse_width, 0.4)
+        self.assertEqual(self.done, [door])
+
+    def test_presses_of_one_door_keep_the_release_gap(self):
+        door = self.door(17)
+        self.worker.submit(door)
+        self.worker.submit(door)
+        self.run_worker()
+        first, second = self.pulses(17)
+        self.assertAlmostEqual(first.width, 1.0)
+        self.assertAlmostEqual(second.width, 1.0)
+        self.assertGreaterEqual(second.start - first.end, 0.5 - 1e-9)
+
+    def test_doors_pulse_side_by_side(self):
+        left = self.door(17)
+        right = self.door(18)
+        self.worker.submit(left)
+        self.worker.submit(right)
+        self.run_worker()
+        (left_pulse,) = self.pulses(17)
+        (right_pulse,) = self.pulses(18)
+        # The second door does not wait for the first pulse to end
+        self.assertLess(right_pulse.start, left_pulse.end)
+
+    def test_call_runs_in_order_with_pulses(self):
+        door = self.door(17)
+        order = []
+        self.worker.submit(door)
+        self.worker.call(lambda: order.append(len(self.backend.pulses)))
+        self.run_worker()
+        # The pulse started but was not released yet when the call ran
+        self.assertEqual(order, [0])
+        self.assertEqual(len(self.pulses(17)), 1)
+
+    def test_skipped_and_failed_pulses_do_not_stop_the_worker(self):
+        removed = Removed_Door()
+        door = self.door(17)
+        self.worker.submit(removed)
+        self.worker.submit(Broken_Door())
+        self.worker.submit(door)
+        self.run_worker()
+        self.assertFalse(removed.released)
+        self.assertEqual(len(self.pulses(17)), 1)
+
+    def test_pending_counts_queued_presses(self):
+        door = self.door(17)
+        self.worker.submit(door)
+        self.worker.submit(door)
+        self.assertEqual(self.worker.pending(), 2)
+        self.run_worker()
+        self.assertEqual(self.worker.pending(), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()